@@ -4,5 +4,7 @@ API modules for endpoints and schemas.
 
 from .v1.embedding import router as embedding_router
 from .v1.rerank import router as rerank_router
+from .v1.jobs import router as jobs_router
+from .v1.collections import router as collections_router
 
-__all__ = ["embedding_router", "rerank_router"]
+__all__ = ["embedding_router", "rerank_router", "jobs_router", "collections_router"]
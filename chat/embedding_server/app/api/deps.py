@@ -2,10 +2,14 @@
 Dependency injection for API endpoints.
 """
 
+import time
+from typing import AsyncIterator, Callable
 from .v1.schemas import ErrorResponse
 from ..services.embedding_service import EmbeddingService
 from ..services.rerank_service import RerankService
-from ..core.exceptions import EmbeddingError, RerankError, ValidationError
+from ..core.admission import admission_controller
+from ..core.lifecycle import model_loader
+from ..core.exceptions import EmbeddingError, RerankError, ValidationError, OverloadedError
 from fastapi import HTTPException
 
 
@@ -19,6 +23,50 @@ def get_rerank_service() -> RerankService:
     return RerankService()
 
 
+def require_model(service: str) -> Callable[[], None]:
+    """
+    Dependency factory rejecting requests until a service's model is loaded.
+    
+    Models load in the background after startup; until then inference
+    endpoints answer 503 with a Retry-After header.
+    """
+    def dependency() -> None:
+        if not model_loader.is_loaded(service):
+            raise HTTPException(
+                status_code=503,
+                detail=f"The {service} model is not ready",
+                headers={"Retry-After": "5"}
+            )
+    
+    return dependency
+
+
+def admit(endpoint: str) -> Callable[[], AsyncIterator[None]]:
+    """
+    Dependency factory enforcing admission control for an endpoint.
+    
+    Requests wait in a bounded queue for a free slot and are rejected
+    with 429 and a Retry-After header once the queue is full.
+    """
+    async def dependency() -> AsyncIterator[None]:
+        try:
+            await admission_controller.acquire(endpoint)
+        except OverloadedError as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            admission_controller.release(endpoint, time.monotonic() - start_time)
+    
+    return dependency
+
+
 def handle_embedding_error(error: Exception) -> ErrorResponse:
     """Handle embedding service errors."""
     if isinstance(error, ValidationError):
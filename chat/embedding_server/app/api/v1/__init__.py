@@ -4,5 +4,7 @@ API v1 endpoints.
 
 from .embedding import router as embedding_router
 from .rerank import router as rerank_router
+from .jobs import router as jobs_router
+from .collections import router as collections_router
 
-__all__ = ["embedding_router", "rerank_router"]
+__all__ = ["embedding_router", "rerank_router", "jobs_router", "collections_router"]
@@ -0,0 +1,173 @@
+"""
+Vector collection API endpoints.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+
+from ..deps import admit, require_model, handle_embedding_error
+from .schemas import (
+    CollectionCreateRequest,
+    CollectionResponse,
+    CollectionUpsertRequest,
+    CollectionUpsertResponse,
+    CollectionSearchRequest,
+    CollectionSearchResponse
+)
+from ...core.vector_collection import VectorCollection
+from ...services.collection_service import collection_manager
+
+
+router = APIRouter(prefix="/collections", tags=["collections"])
+
+
+def get_collection(name: str) -> VectorCollection:
+    """Look up a collection, answering 404 when it does not exist."""
+    try:
+        collection = collection_manager.get(name)
+    except Exception as e:
+        handle_embedding_error(e)
+    if collection is None:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {name}")
+    return collection
+
+
+@router.post("/", response_model=CollectionResponse)
+async def create_collection(request: CollectionCreateRequest) -> CollectionResponse:
+    """
+    Create an empty vector collection bound to an embedding model.
+
+    Args:
+        request: Collection name, model, storage type and index type
+
+    Returns:
+        CollectionResponse with the collection statistics
+    """
+    try:
+        collection = collection_manager.create(
+            request.name,
+            model=request.model,
+            dtype=request.dtype,
+            index=request.index
+        )
+        return CollectionResponse(**collection.get_stats())
+
+    except Exception as e:
+        handle_embedding_error(e)
+
+
+@router.get("/", response_model=List[CollectionResponse])
+async def list_collections() -> List[CollectionResponse]:
+    """
+    List vector collections by name.
+
+    Returns:
+        List of collection statistics
+    """
+    return [CollectionResponse(**collection.get_stats()) for collection in collection_manager.list_collections()]
+
+
+@router.get("/{name}", response_model=CollectionResponse)
+async def get_collection_stats(name: str) -> CollectionResponse:
+    """
+    Get the statistics of a vector collection.
+
+    Args:
+        name: Collection name
+
+    Returns:
+        CollectionResponse with the collection statistics
+    """
+    return CollectionResponse(**get_collection(name).get_stats())
+
+
+@router.delete("/{name}")
+async def delete_collection(name: str):
+    """
+    Delete a vector collection and its files.
+
+    Args:
+        name: Collection name
+    """
+    try:
+        deleted = collection_manager.delete(name)
+    except Exception as e:
+        handle_embedding_error(e)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {name}")
+    return {"success": True, "message": f"Deleted collection {name}"}
+
+
+@router.post("/{name}/upsert", response_model=CollectionUpsertResponse, dependencies=[Depends(require_model("embedding")), Depends(admit("collection_upsert"))])
+async def upsert_items(name: str, request: CollectionUpsertRequest) -> CollectionUpsertResponse:
+    """
+    Embed items with the collection's model and store them.
+
+    Items whose id is already stored are replaced.
+
+    Args:
+        name: Collection name
+        request: Items with id, text and optional metadata
+
+    Returns:
+        CollectionUpsertResponse with the upserted count
+    """
+    collection = get_collection(name)
+    try:
+        result = await collection_manager.upsert_async(
+            collection, [item.model_dump() for item in request.items]
+        )
+        return CollectionUpsertResponse(**result)
+
+    except Exception as e:
+        handle_embedding_error(e)
+
+
+@router.post("/{name}/search", response_model=CollectionSearchResponse, dependencies=[Depends(require_model("embedding")), Depends(admit("collection_search"))])
+async def search_collection(name: str, request: CollectionSearchRequest) -> CollectionSearchResponse:
+    """
+    Embed query texts and return the nearest items.
+
+    The queries are embedded in this request with the collection's
+    model, so no vector leaves the server.
+
+    Args:
+        name: Collection name
+        request: Query text(s) and search parameters
+
+    Returns:
+        CollectionSearchResponse with the matches of each query
+    """
+    collection = get_collection(name)
+    try:
+        result = await collection_manager.search_async(
+            collection,
+            [request.query] if request.query is not None else request.queries,
+            top_k=request.top_k,
+            nprobe=request.nprobe,
+            ef=request.ef,
+            include_metadata=request.include_metadata
+        )
+        return CollectionSearchResponse(**result)
+
+    except Exception as e:
+        handle_embedding_error(e)
+
+
+@router.post("/{name}/build", response_model=CollectionResponse, dependencies=[Depends(admit("collection_build"))])
+async def build_collection(name: str) -> CollectionResponse:
+    """
+    Retrain a collection's IVF centroids, or update and save its HNSW graph.
+
+    Args:
+        name: Collection name
+
+    Returns:
+        CollectionResponse with the updated statistics
+    """
+    collection = get_collection(name)
+    try:
+        return CollectionResponse(**await collection_manager.build_async(collection))
+
+    except Exception as e:
+        handle_embedding_error(e)
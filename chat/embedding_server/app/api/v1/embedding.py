@@ -2,24 +2,112 @@
 Embedding API endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Dict, Any, List, Literal, Optional
+import numpy as np
 
-from ..deps import get_embedding_service, handle_embedding_error
+from ..deps import admit, require_model, get_embedding_service, handle_embedding_error
 from .schemas import (
     EmbeddingRequest,
     EmbeddingResponse,
     EmbeddingBatchRequest,
-    EmbeddingBatchResponse
+    EmbeddingBatchResponse,
+    EmbeddingLongRequest,
+    EmbeddingLongResponse,
+    EmbeddingMultiRequest,
+    EmbeddingMultiResponse,
+    EmbeddingDtype,
+    QuantizationMode
 )
 from ...services.embedding_service import EmbeddingService
 from ...core.exceptions import EmbeddingError, ValidationError
+from ...core.registry import model_registry
+from ...utils.encoding import encode_embeddings, encode_multi_vector, encode_sparse, raw_headers, to_array
+from ...utils.quantization import quantize
 
 
 router = APIRouter(prefix="/embedding", tags=["embedding"])
 
 
-@router.post("/", response_model=EmbeddingResponse)
+def needs_encoding(request) -> bool:
+    """Check whether a request asks for anything but plain float32 JSON."""
+    return (
+        request.encoding_format != "float"
+        or request.dtype != "float32"
+        or request.quantization != "none"
+    )
+
+
+def float_embedding_response(content: Dict[str, Any]) -> JSONResponse:
+    """
+    Build a plain float32 JSON response without per-element validation.
+    
+    Embedding arrays in ``content`` are converted to JSON lists once, at
+    serialization time.
+    """
+    content = {"success": True, "message": "Success", **content}
+    for field in ("embedding", "embeddings"):
+        if isinstance(content.get(field), np.ndarray):
+            content[field] = content[field].tolist()
+    return JSONResponse(content=content)
+
+
+def encoded_embedding_response(
+    embeddings: np.ndarray,
+    metadata: Dict[str, Any],
+    encoding_format: str,
+    dtype: str,
+    quantization: str = "none",
+    single: bool = False
+) -> Response:
+    """
+    Build a compact embedding response without per-element validation.
+    
+    Args:
+        embeddings: float32 embedding array of shape (count, dimension)
+        metadata: Response fields other than the embeddings
+        encoding_format: "float", "base64" or "raw"
+        dtype: "float32" or "float16" (ignored when quantized)
+        quantization: "none", "int8" or "binary"
+        single: Whether the response carries a single embedding
+        
+    Returns:
+        JSONResponse, or an application/octet-stream Response for raw
+    """
+    if quantization == "none":
+        array, scales = to_array(embeddings, dtype), None
+    else:
+        array, scales = quantize(to_array(embeddings), quantization)
+        dtype = "int8" if quantization == "int8" else "ubinary"
+    
+    if encoding_format == "raw":
+        headers = raw_headers(array, dtype, scales)
+        headers["X-Processing-Time"] = str(metadata["processing_time"])
+        return Response(content=array.tobytes(), media_type="application/octet-stream", headers=headers)
+    
+    encoded = encode_embeddings(array, encoding_format)
+    content = {
+        "success": True,
+        "message": "Success",
+        **metadata,
+        "encoding_format": encoding_format,
+        "dtype": dtype,
+        "quantization": quantization,
+        "shape": list(array.shape)
+    }
+    if single:
+        content["embedding"] = encoded[0]
+        if scales is not None:
+            content["scale"] = float(scales[0])
+    else:
+        content["embeddings"] = encoded
+        if scales is not None:
+            content["scales"] = scales.tolist()
+    return JSONResponse(content=content)
+
+
+@router.post("/", response_model=EmbeddingResponse, dependencies=[Depends(require_model("embedding")), Depends(admit("embedding"))])
 async def create_embedding(
     request: EmbeddingRequest,
     embedding_service: EmbeddingService = Depends(get_embedding_service)
@@ -35,15 +123,30 @@ async def create_embedding(
         EmbeddingResponse with embedding vector and metadata
     """
     try:
-        result = embedding_service.get_embedding(request.text)
-        
-        return EmbeddingResponse(
-            embedding=result["embedding"],
-            text_length=result["text_length"],
-            embedding_dimension=result["embedding_dimension"],
-            processing_time=result["processing_time"],
-            model_info=result["model_info"]
-        )
+        result = await embedding_service.get_embedding_async(request.text, model=request.model)
+        
+        if needs_encoding(request):
+            return encoded_embedding_response(
+                [result["embedding"]],
+                {
+                    "text_length": result["text_length"],
+                    "embedding_dimension": result["embedding_dimension"],
+                    "processing_time": result["processing_time"],
+                    "model_info": result["model_info"]
+                },
+                request.encoding_format,
+                request.dtype,
+                request.quantization,
+                single=True
+            )
+        
+        return float_embedding_response({
+            "processing_time": result["processing_time"],
+            "embedding": result["embedding"],
+            "text_length": result["text_length"],
+            "embedding_dimension": result["embedding_dimension"],
+            "model_info": result["model_info"]
+        })
         
     except (ValidationError, EmbeddingError) as e:
         handle_embedding_error(e)
@@ -51,7 +154,7 @@ async def create_embedding(
         handle_embedding_error(e)
 
 
-@router.post("/batch", response_model=EmbeddingBatchResponse)
+@router.post("/batch", response_model=EmbeddingBatchResponse, dependencies=[Depends(require_model("embedding")), Depends(admit("embedding_batch"))])
 async def create_embeddings_batch(
     request: EmbeddingBatchRequest,
     embedding_service: EmbeddingService = Depends(get_embedding_service)
@@ -67,22 +170,188 @@ async def create_embeddings_batch(
         EmbeddingBatchResponse with list of embedding vectors and metadata
     """
     try:
-        result = embedding_service.get_embeddings(request.texts)
-        
-        return EmbeddingBatchResponse(
-            embeddings=result["embeddings"],
-            text_count=result["text_count"],
-            embedding_dimension=result["embedding_dimension"],
-            processing_time=result["processing_time"],
-            model_info=result["model_info"]
+        result = await embedding_service.get_embeddings_async(request.texts, model=request.model)
+        
+        if needs_encoding(request):
+            return encoded_embedding_response(
+                result["embeddings"],
+                {
+                    "text_count": result["text_count"],
+                    "embedding_dimension": result["embedding_dimension"],
+                    "processing_time": result["processing_time"],
+                    "model_info": result["model_info"]
+                },
+                request.encoding_format,
+                request.dtype,
+                request.quantization
+            )
+        
+        return float_embedding_response({
+            "processing_time": result["processing_time"],
+            "embeddings": result["embeddings"],
+            "text_count": result["text_count"],
+            "embedding_dimension": result["embedding_dimension"],
+            "model_info": result["model_info"]
+        })
+        
+    except (ValidationError, EmbeddingError) as e:
+        handle_embedding_error(e)
+    except Exception as e:
+        handle_embedding_error(e)
+
+
+@router.post("/long", response_model=EmbeddingLongResponse, dependencies=[Depends(require_model("embedding")), Depends(admit("embedding_long"))])
+async def create_long_embeddings(
+    request: EmbeddingLongRequest,
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+) -> EmbeddingLongResponse:
+    """
+    Embed texts longer than the model's max_length.
+    
+    Each text is split into overlapping token windows, all windows are
+    embedded in one packed batch and pooled back into one vector per text.
+    
+    Args:
+        request: Long-text embedding request
+        embedding_service: Injected embedding service
+        
+    Returns:
+        EmbeddingLongResponse with pooled vectors and optional windows
+    """
+    try:
+        result = await embedding_service.get_long_embeddings_async(
+            request.texts,
+            model=request.model,
+            window_tokens=request.window_tokens,
+            overlap_tokens=request.overlap_tokens,
+            pooling=request.pooling,
+            return_windows=request.return_windows
         )
         
+        windows = result["windows"]
+        if windows is not None:
+            windows = [
+                [{**window, "embedding": window["embedding"].tolist()} for window in text_windows]
+                for text_windows in windows
+            ]
+        
+        return float_embedding_response({
+            "processing_time": result["processing_time"],
+            "embeddings": result["embeddings"],
+            "windows": windows,
+            "window_counts": result["window_counts"],
+            "text_count": result["text_count"],
+            "embedding_dimension": result["embedding_dimension"],
+            "pooling": result["pooling"],
+            "model_info": result["model_info"]
+        })
+        
     except (ValidationError, EmbeddingError) as e:
         handle_embedding_error(e)
     except Exception as e:
         handle_embedding_error(e)
 
 
+@router.post("/multi", response_model=EmbeddingMultiResponse, dependencies=[Depends(require_model("embedding")), Depends(admit("embedding_multi"))])
+async def create_multi_embeddings(
+    request: EmbeddingMultiRequest,
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+) -> EmbeddingMultiResponse:
+    """
+    Generate dense, sparse and/or multi-vector (ColBERT) outputs for texts.
+    
+    Any combination of outputs comes from a single encoder pass per
+    batch. Sparse vectors are parallel token-id/weight arrays and
+    multi-vectors are base64 float16 matrices.
+    
+    Args:
+        request: Multi-output embedding request
+        embedding_service: Injected embedding service
+        
+    Returns:
+        EmbeddingMultiResponse with the requested outputs per text
+    """
+    try:
+        result = await embedding_service.get_multi_embeddings_async(
+            request.texts,
+            request.outputs,
+            model=request.model
+        )
+        
+        content = {
+            "success": True,
+            "message": "Success",
+            "processing_time": result["processing_time"],
+            "outputs": result["outputs"],
+            "encoding_format": request.encoding_format,
+            "dtype": request.dtype,
+            "text_count": result["text_count"],
+            "model_info": result["model_info"]
+        }
+        if "dense" in result:
+            array = np.stack(result["dense"])
+            if request.encoding_format == "base64":
+                array = to_array(array, request.dtype)
+            content["dense"] = encode_embeddings(array, request.encoding_format)
+        if "sparse" in result:
+            content["sparse"] = [
+                encode_sparse(token_ids, weights, request.encoding_format)
+                for token_ids, weights in result["sparse"]
+            ]
+        if "colbert" in result:
+            content["colbert"] = [encode_multi_vector(vectors) for vectors in result["colbert"]]
+        return JSONResponse(content=content)
+        
+    except (ValidationError, EmbeddingError) as e:
+        handle_embedding_error(e)
+    except Exception as e:
+        handle_embedding_error(e)
+
+
+@router.post("/stream", dependencies=[Depends(require_model("embedding")), Depends(admit("embedding_stream"))])
+async def stream_embeddings(
+    request: Request,
+    encoding_format: Literal["float", "base64"] = Query("float", description="Embedding encoding"),
+    dtype: EmbeddingDtype = Query("float32", description="Element type of the encoded embeddings"),
+    quantization: QuantizationMode = Query("none", description="Quantization mode"),
+    model: Optional[str] = Query(None, description="Model name (the default model if omitted)"),
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+) -> StreamingResponse:
+    """
+    Embed an NDJSON upload of any size, streaming NDJSON results back.
+    
+    Each input line is a JSON string or an object with ``text`` and an
+    optional ``id``. Texts are batched internally with ``batch_size`` and
+    results are written as soon as each batch is computed.
+    
+    Args:
+        request: Raw request whose body is read as a stream
+        encoding_format: "float" or "base64"
+        dtype: "float32" or "float16"
+        quantization: "none", "int8" or "binary"
+        model: Registry model name (None for the default model)
+        embedding_service: Injected embedding service
+        
+    Returns:
+        StreamingResponse of application/x-ndjson lines
+    """
+    try:
+        model_registry.get("embedding", model)
+    except ValidationError as e:
+        handle_embedding_error(e)
+    
+    return StreamingResponse(
+        embedding_service.stream_embeddings(
+            request.stream(),
+            encoding_format=encoding_format,
+            dtype=dtype,
+            quantization=quantization,
+            model=model
+        ),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/status")
 async def get_embedding_status(
     embedding_service: EmbeddingService = Depends(get_embedding_service)
@@ -0,0 +1,84 @@
+"""
+Bulk embedding job API endpoints.
+"""
+
+from fastapi import APIRouter, HTTPException
+from typing import List
+
+from ..deps import handle_embedding_error
+from .schemas import EmbeddingJobRequest, EmbeddingJobResponse
+from ...services.job_service import job_manager
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.post("/", response_model=EmbeddingJobResponse)
+async def create_job(request: EmbeddingJobRequest) -> EmbeddingJobResponse:
+    """
+    Submit a bulk embedding job.
+    
+    Args:
+        request: Job request with the input file and its layout
+        
+    Returns:
+        EmbeddingJobResponse with the job id and initial state
+    """
+    try:
+        state = job_manager.submit(
+            input_path=request.input_path,
+            input_format=request.input_format,
+            text_field=request.text_field,
+            id_field=request.id_field,
+            batch_size=request.batch_size,
+            model=request.model
+        )
+        return EmbeddingJobResponse(**job_manager.describe(state))
+        
+    except Exception as e:
+        handle_embedding_error(e)
+
+
+@router.get("/", response_model=List[EmbeddingJobResponse])
+async def list_jobs() -> List[EmbeddingJobResponse]:
+    """
+    List bulk embedding jobs, newest first.
+    
+    Returns:
+        List of job states
+    """
+    return [EmbeddingJobResponse(**job_manager.describe(state)) for state in job_manager.list_jobs()]
+
+
+@router.get("/{job_id}", response_model=EmbeddingJobResponse)
+async def get_job(job_id: str) -> EmbeddingJobResponse:
+    """
+    Get the progress of a bulk embedding job.
+    
+    Args:
+        job_id: Job identifier
+        
+    Returns:
+        EmbeddingJobResponse with the current state
+    """
+    state = job_manager.get(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return EmbeddingJobResponse(**job_manager.describe(state))
+
+
+@router.post("/{job_id}/cancel", response_model=EmbeddingJobResponse)
+async def cancel_job(job_id: str) -> EmbeddingJobResponse:
+    """
+    Cancel a queued or running bulk embedding job.
+    
+    Args:
+        job_id: Job identifier
+        
+    Returns:
+        EmbeddingJobResponse with the updated state
+    """
+    state = job_manager.cancel(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return EmbeddingJobResponse(**job_manager.describe(state))
@@ -5,12 +5,14 @@ Rerank API endpoints.
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any
 
-from ..deps import get_rerank_service, handle_rerank_error
+from ..deps import admit, require_model, get_rerank_service, handle_rerank_error
 from .schemas import (
     RerankRequest,
     RerankResponse,
     RerankBatchRequest,
-    RerankBatchResponse
+    RerankBatchResponse,
+    RerankPassageRequest,
+    RerankPassageResponse
 )
 from ...services.rerank_service import RerankService
 from ...core.exceptions import RerankError, ValidationError
@@ -19,7 +21,7 @@ from ...core.exceptions import RerankError, ValidationError
 router = APIRouter(prefix="/rerank", tags=["rerank"])
 
 
-@router.post("/", response_model=RerankResponse)
+@router.post("/", response_model=RerankResponse, dependencies=[Depends(require_model("rerank")), Depends(admit("rerank"))])
 async def rerank_documents(
     request: RerankRequest,
     rerank_service: RerankService = Depends(get_rerank_service)
@@ -35,10 +37,11 @@ async def rerank_documents(
         RerankResponse with reranked results and metadata
     """
     try:
-        result = rerank_service.rerank_documents(
+        result = await rerank_service.rerank_documents_async(
             query=request.query,
             documents=request.documents,
-            top_k=request.top_k
+            top_k=request.top_k,
+            model=request.model
         )
         
         return RerankResponse(
@@ -47,6 +50,8 @@ async def rerank_documents(
             results=result["results"],
             top_k=result["top_k"],
             processing_time=result["processing_time"],
+            cache_hits=result["cache_hits"],
+            cache_misses=result["cache_misses"],
             model_info=result["model_info"]
         )
         
@@ -56,7 +61,7 @@ async def rerank_documents(
         handle_rerank_error(e)
 
 
-@router.post("/batch", response_model=RerankBatchResponse)
+@router.post("/batch", response_model=RerankBatchResponse, dependencies=[Depends(require_model("rerank")), Depends(admit("rerank_batch"))])
 async def rerank_documents_batch(
     request: RerankBatchRequest,
     rerank_service: RerankService = Depends(get_rerank_service)
@@ -72,10 +77,12 @@ async def rerank_documents_batch(
         RerankBatchResponse with batch rerank results and metadata
     """
     try:
-        result = rerank_service.rerank_batch(
+        result = await rerank_service.rerank_batch_async(
             queries=request.queries,
             documents=request.documents,
-            top_k=request.top_k
+            top_k=request.top_k,
+            query_documents=request.query_documents,
+            model=request.model
         )
         
         return RerankBatchResponse(
@@ -84,6 +91,8 @@ async def rerank_documents_batch(
             batch_results=result["batch_results"],
             top_k=result["top_k"],
             processing_time=result["processing_time"],
+            cache_hits=result["cache_hits"],
+            cache_misses=result["cache_misses"],
             model_info=result["model_info"]
         )
         
@@ -93,6 +102,43 @@ async def rerank_documents_batch(
         handle_rerank_error(e)
 
 
+@router.post("/passages", response_model=RerankPassageResponse, dependencies=[Depends(require_model("rerank")), Depends(admit("rerank_passages"))])
+async def rerank_passages(
+    request: RerankPassageRequest,
+    rerank_service: RerankService = Depends(get_rerank_service)
+) -> RerankPassageResponse:
+    """
+    Rerank long documents by their best passages.
+    
+    Args:
+        request: Passage rerank request with the query, documents and
+            passage options
+        rerank_service: Injected rerank service
+        
+    Returns:
+        RerankPassageResponse with reranked results and their best passage
+    """
+    try:
+        result = await rerank_service.rerank_passages_async(
+            query=request.query,
+            documents=request.documents,
+            top_k=request.top_k,
+            model=request.model,
+            window_tokens=request.window_tokens,
+            overlap_tokens=request.overlap_tokens,
+            aggregation=request.aggregation,
+            top_n=request.top_n,
+            early_stop_threshold=request.early_stop_threshold
+        )
+        
+        return RerankPassageResponse(**result)
+        
+    except (ValidationError, RerankError) as e:
+        handle_rerank_error(e)
+    except Exception as e:
+        handle_rerank_error(e)
+
+
 @router.get("/status")
 async def get_rerank_status(
     rerank_service: RerankService = Depends(get_rerank_service)
@@ -2,8 +2,8 @@
 Pydantic schemas for API v1 requests and responses.
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional, Dict, Any
 
 
 # Base Response Schema
@@ -15,9 +15,26 @@ class BaseResponse(BaseModel):
 
 
 # Embedding Schemas
+EncodingFormat = Literal["float", "base64", "raw"]
+EmbeddingDtype = Literal["float32", "float16"]
+QuantizationMode = Literal["none", "int8", "binary"]
+
+
 class EmbeddingRequest(BaseModel):
     """Request schema for single text embedding."""
     text: str = Field(..., min_length=1, max_length=10000, description="Text to embed")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
+    encoding_format: EncodingFormat = Field(
+        "float",
+        description="float: JSON numbers, base64: base64 of raw little-endian bytes, "
+                    "raw: application/octet-stream body with the shape in headers"
+    )
+    dtype: EmbeddingDtype = Field("float32", description="Element type of the encoded embedding")
+    quantization: QuantizationMode = Field(
+        "none",
+        description="int8: per-vector scaled int8 codes with scales, binary: packed sign bits "
+                    "(overrides dtype)"
+    )
 
 
 class EmbeddingResponse(BaseResponse):
@@ -31,6 +48,18 @@ class EmbeddingResponse(BaseResponse):
 class EmbeddingBatchRequest(BaseModel):
     """Request schema for batch text embedding."""
     texts: List[str] = Field(..., min_items=1, max_items=100, description="List of texts to embed")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
+    encoding_format: EncodingFormat = Field(
+        "float",
+        description="float: JSON numbers, base64: one base64 string per vector, "
+                    "raw: application/octet-stream body with the shape in headers"
+    )
+    dtype: EmbeddingDtype = Field("float32", description="Element type of the encoded embeddings")
+    quantization: QuantizationMode = Field(
+        "none",
+        description="int8: per-vector scaled int8 codes with scales, binary: packed sign bits "
+                    "(overrides dtype)"
+    )
 
 
 class EmbeddingBatchResponse(BaseResponse):
@@ -41,12 +70,88 @@ class EmbeddingBatchResponse(BaseResponse):
     model_info: Dict[str, Any] = Field(..., description="Model information")
 
 
+class EmbeddingLongRequest(BaseModel):
+    """Request schema for long-text embedding with sliding token windows."""
+    texts: List[str] = Field(..., min_items=1, max_items=100, description="List of texts to embed")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
+    window_tokens: Optional[int] = Field(
+        None, ge=16, description="Tokens per window (defaults to the model's max_length)"
+    )
+    overlap_tokens: Optional[int] = Field(
+        None, ge=0, description="Tokens shared by consecutive windows (defaults to long_text_overlap_tokens)"
+    )
+    pooling: Literal["mean", "max"] = Field(
+        "mean", description="mean: token-weighted mean of the window vectors, max: element-wise max"
+    )
+    return_windows: bool = Field(False, description="Also return each window's span and vector")
+
+
+class EmbeddingWindow(BaseModel):
+    """Schema for one window of a long text."""
+    start: int = Field(..., description="Start character offset in the text")
+    end: int = Field(..., description="End character offset in the text")
+    tokens: int = Field(..., description="Number of tokens in the window")
+    embedding: List[float] = Field(..., description="Window embedding vector")
+
+
+class EmbeddingLongResponse(BaseResponse):
+    """Response schema for long-text embedding."""
+    embeddings: List[List[float]] = Field(..., description="Pooled embedding vector per text")
+    windows: Optional[List[List[EmbeddingWindow]]] = Field(None, description="Windows of each text")
+    window_counts: List[int] = Field(..., description="Number of windows per text")
+    text_count: int = Field(..., description="Number of input texts")
+    embedding_dimension: int = Field(..., description="Dimension of embedding vectors")
+    pooling: str = Field(..., description="Pooling applied to the window vectors")
+    model_info: Dict[str, Any] = Field(..., description="Model information")
+
+
+class EmbeddingMultiRequest(BaseModel):
+    """Request schema for dense, sparse and multi-vector embedding in one pass."""
+    texts: List[str] = Field(..., min_items=1, max_items=100, description="List of texts to embed")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
+    outputs: List[Literal["dense", "sparse", "colbert"]] = Field(
+        ["dense", "sparse", "colbert"],
+        min_items=1,
+        description="dense: pooled vector, sparse: lexical token weights, colbert: per-token multi-vectors"
+    )
+    encoding_format: Literal["float", "base64"] = Field(
+        "float",
+        description="Encoding of dense vectors and sparse arrays (multi-vectors are always base64 float16)"
+    )
+    dtype: EmbeddingDtype = Field("float32", description="Element type of base64 dense vectors")
+
+
+class SparseEmbedding(BaseModel):
+    """Schema for a sparse lexical vector."""
+    indices: Any = Field(..., description="Token ids (list, or base64 little-endian int32)")
+    values: Any = Field(..., description="Token weights (list, or base64 little-endian float32)")
+
+
+class MultiVectorEmbedding(BaseModel):
+    """Schema for the multi-vectors of one text."""
+    shape: List[int] = Field(..., description="[tokens, dimension]")
+    data: str = Field(..., description="Base64 of row-major little-endian float16 values")
+
+
+class EmbeddingMultiResponse(BaseResponse):
+    """Response schema for multi-output embedding."""
+    outputs: List[str] = Field(..., description="Outputs present in the response")
+    dense: Optional[List[Any]] = Field(None, description="Dense vector per text")
+    sparse: Optional[List[SparseEmbedding]] = Field(None, description="Sparse lexical vector per text")
+    colbert: Optional[List[MultiVectorEmbedding]] = Field(None, description="Multi-vectors per text")
+    encoding_format: str = Field(..., description="Encoding of dense vectors and sparse arrays")
+    dtype: str = Field(..., description="Element type of base64 dense vectors")
+    text_count: int = Field(..., description="Number of input texts")
+    model_info: Dict[str, Any] = Field(..., description="Model information")
+
+
 # Rerank Schemas
 class RerankRequest(BaseModel):
     """Request schema for document reranking."""
     query: str = Field(..., min_length=1, max_length=5000, description="Search query")
     documents: List[str] = Field(..., min_items=1, max_items=100, description="Documents to rerank")
     top_k: Optional[int] = Field(None, ge=1, description="Number of top results to return")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
 
 
 class RerankResult(BaseModel):
@@ -63,14 +168,80 @@ class RerankResponse(BaseResponse):
     total_documents: int = Field(..., description="Total number of documents")
     results: List[RerankResult] = Field(..., description="Reranked results")
     top_k: Optional[int] = Field(None, description="Number of top results returned")
+    cache_hits: int = Field(0, description="Number of pair scores served from the cache")
+    cache_misses: int = Field(0, description="Number of pairs scored by the model")
+    model_info: Dict[str, Any] = Field(..., description="Model information")
+
+
+class RerankPassageRequest(BaseModel):
+    """Request schema for passage-level reranking of long documents."""
+    query: str = Field(..., min_length=1, max_length=5000, description="Search query")
+    documents: List[str] = Field(..., min_items=1, max_items=100, description="Documents to rerank")
+    top_k: Optional[int] = Field(None, ge=1, description="Number of top results to return")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
+    window_tokens: Optional[int] = Field(
+        None, ge=16, description="Tokens per passage (defaults to what fits next to the query)"
+    )
+    overlap_tokens: Optional[int] = Field(
+        None, ge=0, description="Tokens shared by consecutive passages (defaults to rerank_passage_overlap_tokens)"
+    )
+    aggregation: Literal["max", "mean_top_n"] = Field(
+        "max", description="max: best passage score, mean_top_n: mean of the top_n best passages"
+    )
+    top_n: int = Field(3, ge=1, description="Passages averaged by mean_top_n")
+    early_stop_threshold: Optional[float] = Field(
+        None, ge=0.0, le=1.0,
+        description="Score passages in rounds and stop a document once a passage reaches this score"
+    )
+
+
+class RerankPassage(BaseModel):
+    """Schema for the best passage of a document."""
+    start: int = Field(..., description="Start character offset in the document")
+    end: int = Field(..., description="End character offset in the document")
+    score: float = Field(..., description="Passage relevance score")
+
+
+class RerankPassageResult(RerankResult):
+    """Schema for a passage-level rerank result."""
+    best_passage: RerankPassage = Field(..., description="Highest scoring passage")
+    passage_count: int = Field(..., description="Number of passages in the document")
+    passages_scored: int = Field(..., description="Number of passages scored (fewer after an early stop)")
+
+
+class RerankPassageResponse(BaseResponse):
+    """Response schema for passage-level reranking."""
+    query: str = Field(..., description="Original search query")
+    total_documents: int = Field(..., description="Total number of input documents")
+    results: List[RerankPassageResult] = Field(..., description="Reranked results")
+    top_k: Optional[int] = Field(None, description="Number of top results requested")
+    aggregation: str = Field(..., description="Passage score aggregation")
+    passage_count: int = Field(..., description="Total number of passages")
+    passages_scored: int = Field(..., description="Number of passages scored")
+    cache_hits: int = Field(0, description="Number of pair scores served from the cache")
+    cache_misses: int = Field(0, description="Number of pairs scored by the model")
     model_info: Dict[str, Any] = Field(..., description="Model information")
 
 
 class RerankBatchRequest(BaseModel):
     """Request schema for batch document reranking."""
     queries: List[str] = Field(..., min_items=1, max_items=10, description="List of search queries")
-    documents: List[str] = Field(..., min_items=1, max_items=100, description="Documents to rerank")
+    documents: Optional[List[str]] = Field(None, min_items=1, max_items=100, description="Documents to rerank for every query")
+    query_documents: Optional[List[List[str]]] = Field(
+        None, min_items=1, max_items=10,
+        description="Per-query candidate documents, aligned with queries (instead of documents)"
+    )
     top_k: Optional[int] = Field(None, ge=1, description="Number of top results to return for each query")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
+    
+    @model_validator(mode="after")
+    def check_documents(self) -> "RerankBatchRequest":
+        """Require exactly one of documents or query_documents."""
+        if (self.documents is None) == (self.query_documents is None):
+            raise ValueError("Provide either documents or query_documents")
+        if self.query_documents is not None and len(self.query_documents) != len(self.queries):
+            raise ValueError("query_documents must have one list per query")
+        return self
 
 
 class RerankBatchResult(BaseModel):
@@ -85,9 +256,121 @@ class RerankBatchResponse(BaseResponse):
     total_documents: int = Field(..., description="Total number of documents")
     batch_results: List[RerankBatchResult] = Field(..., description="Rerank results for each query")
     top_k: Optional[int] = Field(None, description="Number of top results returned for each query")
+    cache_hits: int = Field(0, description="Number of pair scores served from the cache")
+    cache_misses: int = Field(0, description="Number of pairs scored by the model")
     model_info: Dict[str, Any] = Field(..., description="Model information")
 
 
+# Job Schemas
+class EmbeddingJobRequest(BaseModel):
+    """Request schema for a bulk embedding job."""
+    input_path: str = Field(..., min_length=1, description="Local path of the JSONL or Parquet input file")
+    input_format: Literal["jsonl", "parquet"] = Field("jsonl", description="Input file format")
+    text_field: str = Field("text", description="Field holding the text")
+    id_field: Optional[str] = Field("id", description="Field holding the record id (row number if missing)")
+    batch_size: Optional[int] = Field(None, ge=1, le=1024, description="Texts per batch")
+    model: Optional[str] = Field(None, description="Model name (the default model if omitted)")
+
+
+class EmbeddingJobResponse(BaseResponse):
+    """Response schema for a bulk embedding job."""
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(..., description="queued, running, completed, failed or cancelled")
+    input_path: str = Field(..., description="Input file path")
+    model: Optional[str] = Field(None, description="Model name (None for the default model)")
+    total_rows: Optional[int] = Field(None, description="Number of input rows")
+    completed_rows: int = Field(..., description="Number of rows embedded so far")
+    skipped_rows: int = Field(..., description="Number of rows without usable text")
+    progress: float = Field(..., description="Fraction of rows processed")
+    embedding_dimension: Optional[int] = Field(None, description="Dimension of embedding vectors")
+    embeddings_path: str = Field(..., description="Memory-mapped .npy output")
+    ids_path: str = Field(..., description="JSONL id column aligned with the output rows")
+    error: Optional[str] = Field(None, description="Error message for failed jobs")
+    created_at: float = Field(..., description="Creation timestamp")
+    updated_at: float = Field(..., description="Last checkpoint timestamp")
+    finished_at: Optional[float] = Field(None, description="Completion timestamp")
+
+
+# Collection Schemas
+class CollectionCreateRequest(BaseModel):
+    """Request schema for creating a vector collection."""
+    name: str = Field(..., pattern=r"^[A-Za-z0-9_-]{1,64}$", description="Collection name")
+    model: Optional[str] = Field(None, description="Embedding model name (the default model if omitted)")
+    dtype: Optional[Literal["float16", "int8"]] = Field(
+        None,
+        description="Vector storage type for ivf and flat (float16 if omitted); "
+                    "not accepted for hnsw, whose graph holds float32 vectors"
+    )
+    index: Literal["ivf", "hnsw", "flat"] = Field(
+        "ivf", description="ivf: inverted lists, hnsw: graph (requires hnswlib), flat: exact scan"
+    )
+
+
+class CollectionResponse(BaseResponse):
+    """Response schema for a vector collection."""
+    name: str = Field(..., description="Collection name")
+    model: str = Field(..., description="Embedding model used for upserts and queries")
+    dtype: str = Field(..., description="Vector storage type")
+    index: str = Field(..., description="Index type")
+    dimension: Optional[int] = Field(None, description="Vector dimension (set by the first upsert)")
+    count: int = Field(..., description="Number of stored items")
+    rows: int = Field(..., description="Number of stored rows, including replaced ones")
+    vectors_bytes: int = Field(..., description="Size of the vector file")
+    ivf_lists: int = Field(..., description="Number of trained IVF lists")
+    ivf_trained_rows: int = Field(..., description="Items present when the IVF index was trained")
+    hnsw_rows: int = Field(..., description="Rows in the in-memory HNSW graph")
+    searches: int = Field(..., description="Queries served by this worker")
+    upserts: int = Field(..., description="Items upserted by this worker")
+    created_at: Optional[float] = Field(None, description="Creation timestamp")
+
+
+class CollectionItem(BaseModel):
+    """Schema for an item to upsert."""
+    id: str = Field(..., min_length=1, description="Item id (replaces an existing item with the same id)")
+    text: str = Field(..., min_length=1, max_length=10000, description="Text to embed")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Metadata returned with search results")
+
+
+class CollectionUpsertRequest(BaseModel):
+    """Request schema for upserting items into a collection."""
+    items: List[CollectionItem] = Field(..., min_items=1, max_items=1000, description="Items to embed and store")
+
+
+class CollectionUpsertResponse(BaseResponse):
+    """Response schema for an upsert."""
+    upserted: int = Field(..., description="Number of items upserted")
+    rows: int = Field(..., description="Number of stored rows after the upsert")
+
+
+class CollectionSearchRequest(BaseModel):
+    """Request schema for searching a collection."""
+    query: Optional[str] = Field(None, min_length=1, max_length=10000, description="Query text")
+    queries: Optional[List[str]] = Field(None, min_items=1, max_items=100, description="Query texts")
+    top_k: int = Field(10, ge=1, le=1000, description="Results per query")
+    nprobe: Optional[int] = Field(None, ge=1, description="Inverted lists scanned per query (IVF)")
+    ef: Optional[int] = Field(None, ge=1, description="Candidate list size (HNSW)")
+    include_metadata: bool = Field(True, description="Return each item's metadata")
+    
+    @model_validator(mode="after")
+    def check_queries(self) -> "CollectionSearchRequest":
+        """Require exactly one of query or queries."""
+        if (self.query is None) == (self.queries is None):
+            raise ValueError("Provide exactly one of query or queries")
+        return self
+
+
+class CollectionMatch(BaseModel):
+    """Schema for one search result."""
+    id: str = Field(..., description="Item id")
+    score: float = Field(..., description="Cosine similarity to the query")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Item metadata")
+
+
+class CollectionSearchResponse(BaseResponse):
+    """Response schema for a search."""
+    results: List[List[CollectionMatch]] = Field(..., description="Matches per query, best first")
+
+
 # Error Response Schema
 class ErrorResponse(BaseModel):
     """Error response schema."""
@@ -12,6 +12,7 @@ from .exceptions import (
 )
 from .embedding_model import EmbeddingModel, embedding_model
 from .rerank_model import RerankModel, rerank_model
+from .registry import ModelRegistry, model_registry
 
 __all__ = [
     "settings",
@@ -23,5 +24,7 @@ __all__ = [
     "EmbeddingModel",
     "embedding_model",
     "RerankModel",
-    "rerank_model"
+    "rerank_model",
+    "ModelRegistry",
+    "model_registry"
 ]
@@ -0,0 +1,160 @@
+"""
+Admission control with bounded queueing for inference endpoints.
+"""
+
+import asyncio
+import math
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .config import settings
+from .exceptions import OverloadedError
+
+
+class AdmissionController:
+    """
+    Limit in-flight inference requests and queue the overflow.
+
+    A request runs when both the global limit (``max_concurrent_requests``)
+    and its endpoint limit have a free slot. Otherwise it waits in a single
+    FIFO queue of at most ``max_queue_size`` entries; once the queue is full
+    new requests are rejected immediately with an ``OverloadedError`` whose
+    ``retry_after`` is estimated from the queue depth and the recent mean
+    service time.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        endpoint_limits: Optional[Dict[str, int]] = None,
+        ewma_alpha: float = 0.2
+    ):
+        self.max_concurrent = max(1, max_concurrent or settings.max_concurrent_requests)
+        self.max_queue = max(0, max_queue if max_queue is not None else settings.max_queue_size)
+        self.endpoint_limits = dict(
+            endpoint_limits if endpoint_limits is not None else settings.endpoint_concurrency_limits
+        )
+        self.ewma_alpha = ewma_alpha
+
+        self._active = 0
+        self._active_by_endpoint: Counter = Counter()
+        self._waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+
+        # Statistics
+        self._service_time: Dict[str, float] = {}
+        self._admitted: Counter = Counter()
+        self._rejected: Counter = Counter()
+
+    def _can_run(self, endpoint: str) -> bool:
+        """Check whether a request for the endpoint may start now."""
+        if self._active >= self.max_concurrent:
+            return False
+        limit = self.endpoint_limits.get(endpoint)
+        return limit is None or self._active_by_endpoint[endpoint] < limit
+
+    def _start(self, endpoint: str):
+        """Account for a request that starts running."""
+        self._active += 1
+        self._active_by_endpoint[endpoint] += 1
+        self._admitted[endpoint] += 1
+
+    def _dispatch(self):
+        """Admit queued requests, in order, for which slots are free."""
+        for entry in list(self._waiters):
+            if self._active >= self.max_concurrent:
+                break
+            endpoint, future = entry
+            if future.done():
+                self._waiters.remove(entry)
+                continue
+            if self._can_run(endpoint):
+                self._waiters.remove(entry)
+                self._start(endpoint)
+                future.set_result(None)
+
+    def retry_after(self, endpoint: Optional[str] = None) -> int:
+        """Estimate seconds until a new request could be served."""
+        service_time = self._service_time.get(endpoint) if endpoint else None
+        if service_time is None:
+            known = list(self._service_time.values())
+            service_time = sum(known) / len(known) if known else 1.0
+        wait = service_time * (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, min(60, math.ceil(wait)))
+
+    async def acquire(self, endpoint: str):
+        """
+        Wait for a slot for the endpoint.
+
+        Raises:
+            OverloadedError: If the wait queue is full
+        """
+        # Requests already queued go first; _dispatch hands out slots in order
+        if not self._waiters and self._can_run(endpoint):
+            self._start(endpoint)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._rejected[endpoint] += 1
+            raise OverloadedError(
+                "Server is overloaded, please retry later",
+                retry_after=self.retry_after(endpoint)
+            )
+
+        entry = (endpoint, asyncio.get_running_loop().create_future())
+        self._waiters.append(entry)
+        self._dispatch()
+        try:
+            await entry[1]
+        except asyncio.CancelledError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            elif entry[1].done() and not entry[1].cancelled():
+                # Slot was granted just before cancellation; hand it back
+                self.release(endpoint)
+            raise
+
+    def release(self, endpoint: str, elapsed: Optional[float] = None):
+        """Free the endpoint's slot and admit waiting requests."""
+        self._active -= 1
+        self._active_by_endpoint[endpoint] -= 1
+
+        if elapsed is not None:
+            previous = self._service_time.get(endpoint)
+            self._service_time[endpoint] = (
+                elapsed if previous is None
+                else previous + self.ewma_alpha * (elapsed - previous)
+            )
+
+        self._dispatch()
+
+    def get_stats(self) -> dict:
+        """Get queue depth, in-flight and rejection counts."""
+        queued_by_endpoint = Counter(endpoint for endpoint, _ in self._waiters)
+        return {
+            "max_concurrent_requests": self.max_concurrent,
+            "max_queue_size": self.max_queue,
+            "endpoint_limits": self.endpoint_limits,
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "overloaded": (
+                self._active >= self.max_concurrent
+                and len(self._waiters) >= self.max_queue
+            ),
+            "retry_after": self.retry_after(),
+            "endpoints": {
+                endpoint: {
+                    "active": self._active_by_endpoint[endpoint],
+                    "queued": queued_by_endpoint[endpoint],
+                    "admitted": self._admitted[endpoint],
+                    "rejected": self._rejected[endpoint],
+                    "avg_service_time": self._service_time.get(endpoint)
+                }
+                for endpoint in sorted(set(self._admitted) | set(self._rejected) | set(queued_by_endpoint))
+            },
+            "rejected_total": sum(self._rejected.values())
+        }
+
+
+# Global instance
+admission_controller = AdmissionController()
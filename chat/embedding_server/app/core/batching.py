@@ -0,0 +1,253 @@
+"""
+Dynamic micro-batching for concurrent inference requests.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from .executor import inference_executor
+
+
+class _PendingRequest:
+    """A caller waiting for results of its submitted items."""
+
+    __slots__ = ("items", "costs", "future", "results", "dispatched", "remaining")
+
+    def __init__(self, items: List[Any], costs: List[int], future: asyncio.Future):
+        self.items = items
+        self.costs = costs
+        self.future = future
+        self.results: List[Any] = [None] * len(items)
+        self.dispatched = 0
+        self.remaining = len(items)
+
+
+class DynamicBatcher:
+    """
+    Coalesce items from concurrent callers into shared forward passes.
+
+    Callers submit a list of items and await their results. A single worker
+    task collects pending items until ``max_batch_size`` is reached or
+    ``max_wait_ms`` has elapsed since the first item arrived, runs one
+    forward call for the whole batch and routes each result back to the
+    caller that submitted it. Requests larger than one batch are split
+    across consecutive forwards.
+
+    When a ``cost`` function is given, batches are additionally bounded by
+    ``max_batch_cost`` (e.g. an estimated token budget per forward).
+    """
+
+    def __init__(
+        self,
+        forward: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = "batcher",
+        cost: Optional[Callable[[Any], int]] = None,
+        max_batch_cost: Optional[int] = None
+    ):
+        self._forward = forward
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._cost = cost
+        self.max_batch_cost = max_batch_cost if cost is not None else None
+
+        self._pending: Deque[_PendingRequest] = deque()
+        self._queued_items = 0
+        self._queued_cost = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.batch_count = 0
+        self.item_count = 0
+        self.request_count = 0
+
+    async def submit(self, items: List[Any]) -> List[Any]:
+        """
+        Queue items for batched inference and wait for their results.
+
+        Args:
+            items: Items to run through the forward function
+
+        Returns:
+            Results in the same order as the submitted items
+        """
+        if not items:
+            return []
+
+        self._ensure_worker()
+
+        items = list(items)
+        costs = [self._cost(item) for item in items] if self._cost else [0] * len(items)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingRequest(items, costs, future))
+        self._queued_items += len(items)
+        self._queued_cost += sum(costs)
+        self.request_count += 1
+        self._wakeup.set()
+
+        return await future
+
+    def _ensure_worker(self):
+        """Start the worker task on the running loop if needed."""
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the worker task and fail any callers still waiting."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        while self._pending:
+            pending = self._pending.popleft()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError(f"{self.name} stopped"))
+        self._queued_items = 0
+        self._queued_cost = 0
+
+    def close(self):
+        """
+        Cancel an idle worker task from any thread.
+
+        Used when the batcher is discarded with nothing queued; callers
+        still waiting should use ``stop`` instead.
+        """
+        worker = self._worker
+        if worker is not None and not worker.done():
+            worker.get_loop().call_soon_threadsafe(worker.cancel)
+        self._worker = None
+
+    async def _run(self):
+        """Worker loop: collect, run and dispatch batches."""
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            await self._collect()
+            batch, slices = self._take_batch()
+            if not batch:
+                continue
+
+            await self._execute(batch, slices)
+
+    async def _collect(self):
+        """Wait until a full batch is queued or the wait window closes."""
+        deadline = time.monotonic() + self.max_wait
+        while not self._batch_ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+
+    def _batch_ready(self) -> bool:
+        """Check whether enough work is queued to fill a batch."""
+        if self._queued_items >= self.max_batch_size:
+            return True
+        return self.max_batch_cost is not None and self._queued_cost >= self.max_batch_cost
+
+    def _take_batch(self) -> Tuple[List[Any], List[Tuple[_PendingRequest, int, int]]]:
+        """Pop up to one batch worth of items from the pending callers."""
+        batch: List[Any] = []
+        slices: List[Tuple[_PendingRequest, int, int]] = []
+        batch_cost = 0
+        full = False
+
+        while self._pending and not full:
+            pending = self._pending[0]
+            if pending.future.done():
+                # Caller went away (e.g. cancelled); drop what is left of it
+                self._drop(pending)
+                continue
+
+            start = end = pending.dispatched
+            while end < len(pending.items):
+                item_cost = pending.costs[end]
+                if len(batch) >= self.max_batch_size or (
+                    batch
+                    and self.max_batch_cost is not None
+                    and batch_cost + item_cost > self.max_batch_cost
+                ):
+                    full = True
+                    break
+                batch.append(pending.items[end])
+                batch_cost += item_cost
+                end += 1
+
+            if end > start:
+                slices.append((pending, start, end))
+                pending.dispatched = end
+                self._queued_items -= end - start
+                self._queued_cost -= sum(pending.costs[start:end])
+            if end == len(pending.items):
+                self._pending.popleft()
+
+        return batch, slices
+
+    async def _execute(self, batch: List[Any], slices: List[Tuple[_PendingRequest, int, int]]):
+        """Run one forward call and route results back to the callers."""
+        try:
+            outputs = await inference_executor.run(self._forward, batch)
+        except Exception as e:
+            for pending, _, _ in slices:
+                self._fail(pending, e)
+            return
+
+        self.batch_count += 1
+        self.item_count += len(batch)
+
+        offset = 0
+        for pending, start, end in slices:
+            count = end - start
+            pending.results[start:end] = outputs[offset:offset + count]
+            offset += count
+            pending.remaining -= count
+            if pending.remaining == 0 and not pending.future.done():
+                pending.future.set_result(pending.results)
+
+    def _drop(self, pending: _PendingRequest):
+        """Remove a caller from the queue along with its undispatched items."""
+        self._pending.remove(pending)
+        self._queued_items -= len(pending.items) - pending.dispatched
+        self._queued_cost -= sum(pending.costs[pending.dispatched:])
+
+    def _fail(self, pending: _PendingRequest, error: Exception):
+        """Fail a caller and drop its undispatched items."""
+        if pending in self._pending:
+            self._drop(pending)
+        if not pending.future.done():
+            pending.future.set_exception(error)
+
+    def get_stats(self) -> dict:
+        """Get batching statistics."""
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_cost": self.max_batch_cost,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queued_items": self._queued_items,
+            "queued_cost": self._queued_cost,
+            "pending_requests": len(self._pending),
+            "request_count": self.request_count,
+            "batch_count": self.batch_count,
+            "item_count": self.item_count,
+            "avg_batch_size": (
+                self.item_count / self.batch_count
+                if self.batch_count > 0 else 0.0
+            )
+        }
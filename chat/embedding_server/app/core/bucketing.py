@@ -0,0 +1,85 @@
+"""
+Length bucketing and windowing of model inputs by token count.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def token_budget_batches(
+    lengths: Sequence[int],
+    max_tokens: int,
+    max_batch_size: Optional[int] = None
+) -> List[np.ndarray]:
+    """
+    Group inputs of similar token length into batches.
+
+    Inputs are sorted longest first and cut into consecutive batches whose
+    padded size (rows × longest row) stays within ``max_tokens``, so short
+    inputs are never padded to the length of a long one. An input longer
+    than the budget gets a batch of its own.
+
+    Args:
+        lengths: Token length of each input
+        max_tokens: Padded token budget per batch
+        max_batch_size: Optional upper bound on rows per batch
+
+    Returns:
+        Arrays of input indices, one per batch
+    """
+    lengths = np.maximum(np.asarray(lengths, dtype=np.int64), 1)
+    order = np.argsort(-lengths, kind="stable")
+
+    batches: List[np.ndarray] = []
+    start = 0
+    for position in range(1, len(order) + 1):
+        if position == len(order):
+            batches.append(order[start:position])
+            break
+        rows = position - start + 1
+        # Sorted longest first, so the batch's first row sets its padded width
+        if rows * lengths[order[start]] > max_tokens or (max_batch_size and rows > max_batch_size):
+            batches.append(order[start:position])
+            start = position
+    return batches
+
+
+def padded_tokens(lengths: Sequence[int], batches: Sequence[np.ndarray]) -> int:
+    """Total tokens processed by the batches, padding included."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    return int(sum(len(batch) * lengths[batch].max() for batch in batches if len(batch)))
+
+
+def sliding_windows(
+    offsets: Sequence[Tuple[int, int]],
+    text_length: int,
+    window_tokens: int,
+    overlap_tokens: int = 0
+) -> List[Tuple[int, int, int]]:
+    """
+    Cut a tokenized text into overlapping windows of at most ``window_tokens``.
+
+    Args:
+        offsets: Character span of every token of the text
+        text_length: Length of the text in characters
+        window_tokens: Tokens per window
+        overlap_tokens: Tokens shared by consecutive windows
+
+    Returns:
+        (start_char, end_char, token_count) per window; a text that fits
+        in one window is returned whole
+    """
+    count = len(offsets)
+    if count <= window_tokens:
+        return [(0, text_length, count)]
+
+    stride = max(1, window_tokens - max(0, overlap_tokens))
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_tokens, count)
+        windows.append((offsets[start][0], offsets[end - 1][1], end - start))
+        if end == count:
+            return windows
+        start += stride
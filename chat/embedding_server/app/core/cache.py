@@ -0,0 +1,228 @@
+"""
+Content-addressed caches for model outputs.
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Approximate per-entry bookkeeping cost (key, dict slot, array header)
+_ENTRY_OVERHEAD_BYTES = 128
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keying (Unicode NFC, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(model_id: str, *texts: str) -> bytes:
+    """Build a content-addressed cache key for text(s) under a model."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_id.encode("utf-8"))
+    for text in texts:
+        digest.update(b"\0")
+        digest.update(normalize_text(text).encode("utf-8"))
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """
+    In-memory LRU cache of embedding vectors bounded by total bytes.
+
+    Vectors are stored as compact float32 arrays keyed by a hash of the
+    model id and the normalized text, so FAQ-style repeated queries skip
+    the model entirely.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Get a cached vector and mark it as recently used."""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: bytes, vector: Sequence[float]):
+        """Store a vector, evicting least recently used entries as needed."""
+        # Copy so a row of a batch (or of a memmap) does not keep the whole base alive
+        vector = np.array(vector, dtype=np.float32)
+        size = vector.nbytes + _ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes + _ENTRY_OVERHEAD_BYTES
+
+            self._entries[key] = vector
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes + _ENTRY_OVERHEAD_BYTES
+                self.evictions += 1
+
+    def lookup(
+        self,
+        model_id: str,
+        texts: List[str]
+    ) -> Tuple[List[bytes], List[Optional[np.ndarray]], List[int]]:
+        """
+        Split texts into cache hits and misses.
+
+        Args:
+            model_id: Identifier of the model producing the vectors
+            texts: Input texts
+
+        Returns:
+            Tuple of (keys, cached vectors with None for misses, miss indices)
+        """
+        keys = [make_key(model_id, text) for text in texts]
+        vectors = [self.get(key) for key in keys]
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        return keys, vectors, misses
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions
+            }
+
+
+class ScoreCache:
+    """
+    In-memory LRU cache of rerank scores with a time-to-live.
+
+    Scores are keyed by a fingerprint of the model id, the query and the
+    document, so retries and paginated calls with overlapping candidates
+    only send unseen pairs to the cross-encoder. The memory bound is
+    enforced as an entry budget derived from ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max(0, max_bytes)
+        self.max_entries = self.max_bytes // _ENTRY_OVERHEAD_BYTES
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[bytes, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(
+        self,
+        model_id: str,
+        pairs: List[Tuple[str, str]]
+    ) -> Tuple[List[bytes], List[Optional[float]], List[int]]:
+        """
+        Split (query, document) pairs into cached scores and misses.
+
+        Args:
+            model_id: Identifier of the model producing the scores
+            pairs: List of (query, document) pairs
+
+        Returns:
+            Tuple of (keys, cached scores with None for misses, miss indices)
+        """
+        keys = [make_key(model_id, query, document) for query, document in pairs]
+        now = time.monotonic()
+        scores: List[Optional[float]] = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    scores.append(None)
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    scores.append(entry[0])
+                    self.hits += 1
+
+        misses = [i for i, score in enumerate(scores) if score is None]
+        return keys, scores, misses
+
+    def put_many(self, keys: List[bytes], scores: Sequence[float]):
+        """Store scores, evicting expired then least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._entries[key] = (float(score), expires_at)
+                self._entries.move_to_end(key)
+
+            now = time.monotonic()
+            while self._entries:
+                oldest_key, (_, oldest_expiry) = next(iter(self._entries.items()))
+                if oldest_expiry < now:
+                    self.expirations += 1
+                elif len(self._entries) > self.max_entries:
+                    self.evictions += 1
+                else:
+                    break
+                del self._entries[oldest_key]
+
+    def clear(self):
+        """Drop all cached scores."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -3,7 +3,7 @@ Server settings and configuration management.
 """
 
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pathlib import Path
 
@@ -19,19 +19,98 @@ class Settings(BaseSettings):
     # Model paths (relative to app root)
     embedding_model_path: str = os.getenv("EMBEDDING_MODEL_PATH", "ai_models/ai_models/bge/BGE-m3-ko")
     rerank_model_path: str = os.getenv("RERANK_MODEL_PATH", "ai_models/bge/bge-reranker-v2-m3-ko")
+    embedding_model_name: str = "BGE-m3-ko"
+    rerank_model_name: str = "bge-reranker-v2-m3-ko"
+    
+    # Additional models selectable per request, by name (e.g. {"e5-small": "ai_models/e5-small"})
+    extra_embedding_models: Dict[str, str] = {}
+    extra_rerank_models: Dict[str, str] = {}
+    model_memory_budget_bytes: int = 0  # RAM budget for loaded models, 0 = unlimited
         
+    # Services loaded by this process: "embedding", "rerank" or both
+    enabled_services: str = os.getenv("ENABLED_SERVICES", "embedding,rerank")
+    
     # Model settings
     device: str = "cpu"  # "cpu" or "cuda"
+    embedding_backend: str = "sentence_transformers"  # "sentence_transformers", "langchain" or "onnx"
+    rerank_backend: str = "cross_encoder"  # "cross_encoder" or "onnx"
+    torch_precision: str = "fp32"  # "fp32", "int8" (dynamic) or "bf16" for torch backends
+    onnx_quantize: bool = False  # dynamic int8 weights for ONNX backends
+    onnx_threads: int = 0  # 0 follows torch_num_threads / runtime default
     max_length: int = 512
     
     # Performance settings
     batch_size: int = 32
+    max_batch_tokens: int = 16384  # padded token budget per embedding forward
     max_concurrent_requests: int = 10
     
+    # Dynamic batching settings
+    enable_dynamic_batching: bool = True
+    batch_max_wait_ms: float = 5.0
+    rerank_max_batch_pairs: int = 64
+    rerank_max_batch_tokens: int = 16384
+    rerank_chars_per_token: int = 2
+    
+    # Long-text embedding settings (sliding token windows, see /embedding/long)
+    long_text_overlap_tokens: int = 64
+    long_text_max_chars: int = 100000
+    long_text_max_windows: int = 512  # per request, across all texts
+    
+    # Passage-level rerank settings (see /rerank/passages)
+    rerank_passage_overlap_tokens: int = 32
+    rerank_max_passages: int = 1024  # per request, across all documents
+    
+    # Startup warmup settings (synthetic batches run before reporting ready)
+    warmup_enabled: bool = True
+    warmup_seq_lengths: List[int] = [16, 128, 512]
+    warmup_batch_sizes: List[int] = [1, 8, 32]
+    
+    # Multi-worker settings (pre-fork launcher, see app/core/prefork.py)
+    workers: int = 1
+    worker_torch_threads: int = 0  # 0 splits the cores evenly across workers
+    worker_id: int = 0  # set in each forked worker
+    
+    # Inference executor settings
+    inference_threads: int = 1
+    inference_process_workers: int = 0
+    torch_num_threads: int = 0  # 0 keeps the torch default
+    
+    # Cache settings
+    embedding_cache_max_bytes: int = 256 * 1024 * 1024
+    model_cache_dir: Optional[str] = os.getenv("MODEL_CACHE_DIR")
+    embedding_disk_cache_max_bytes: int = 4 * 1024 * 1024 * 1024
+    embedding_disk_cache_warm_bytes: int = 64 * 1024 * 1024
+    rerank_cache_max_bytes: int = 64 * 1024 * 1024
+    rerank_cache_ttl_seconds: float = 3600.0
+    
+    # Bulk embedding job settings
+    jobs_dir: str = os.getenv("JOBS_DIR", "jobs")
+    job_idle_wait_ms: float = 50.0
+    job_forward_batch_size: int = 8  # texts per job forward; interactive requests wait for at most one
+    
+    # Vector collection settings (see /collections)
+    collections_dir: str = os.getenv("COLLECTIONS_DIR", "collections")
+    collection_ivf_train_size: int = 50000  # live rows before IVF centroids are trained
+    collection_ivf_retrain_growth: float = 4.0  # retrain once the collection grows by this factor
+    collection_ivf_nlist: int = 0  # 0 = sqrt(rows)
+    collection_ivf_nprobe: int = 16
+    collection_ivf_train_per_list: int = 32  # k-means sample rows per list
+    collection_hnsw_m: int = 16
+    collection_hnsw_ef_construction: int = 200
+    collection_hnsw_ef_search: int = 64
+    
+    # Admission control settings
+    max_queue_size: int = 100
+    endpoint_concurrency_limits: Dict[str, int] = {}  # e.g. {"rerank_batch": 2}
+    
     # Logging
     log_level: str = "INFO"
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
+    def is_service_enabled(self, service: str) -> bool:
+        """Check whether a service ("embedding" or "rerank") is enabled."""
+        return service in [name.strip() for name in self.enabled_services.split(",")]
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,346 @@
+"""
+Persistent on-disk embedding store shared by workers on one host.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import EmbeddingCache
+
+
+# Index record: 16-byte content key followed by a little-endian uint64 row
+_KEY_BYTES = 16
+_INDEX_RECORD = np.dtype([("key", "u1", (_KEY_BYTES,)), ("row", "<u8")])
+
+
+def _keys_to_array(keys: Sequence[bytes]) -> np.ndarray:
+    """Pack content keys into an (n, 16) uint8 array for index records."""
+    return np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, _KEY_BYTES)
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only, memory-mapped store of float32 embedding vectors.
+
+    Each generation directory holds ``vectors.f32`` (raw rows) and
+    ``index.log`` (key → row records). Writers append under an exclusive
+    file lock; readers memory-map the vector file and tail the index log,
+    so every worker on the host sees vectors written by the others. When
+    the store outgrows ``max_bytes`` it is compacted into a new generation
+    that keeps the most recently written vectors, and ``CURRENT`` is
+    switched atomically.
+    """
+
+    def __init__(self, root: str, model_id: str, max_bytes: int, compact_ratio: float = 0.75):
+        model_hash = hashlib.blake2b(model_id.encode("utf-8"), digest_size=8).hexdigest()
+        self.root = os.path.join(root, f"embeddings-{model_hash}")
+        self.model_id = model_id
+        self.max_bytes = max(0, max_bytes)
+        self.compact_ratio = compact_ratio
+
+        self._lock = threading.Lock()
+        self._generation: Optional[str] = None
+        self._current_inode: Optional[int] = None
+        self._dim: Optional[int] = None
+        self._index: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._vectors: Optional[np.ndarray] = None
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            self._refresh()
+
+    # ------------------------------------------------------------------
+    # File layout helpers
+    # ------------------------------------------------------------------
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def _read_current(self) -> Tuple[Optional[str], Optional[int]]:
+        """Read the active generation and vector dimension."""
+        try:
+            with open(self._path("CURRENT"), "r", encoding="utf-8") as f:
+                current = json.load(f)
+            return current["generation"], current["dim"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None, None
+
+    def _write_current(self, generation: str, dim: int):
+        """Atomically point ``CURRENT`` at a generation."""
+        tmp_path = self._path("CURRENT.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "dim": dim, "model_id": self.model_id}, f)
+        os.replace(tmp_path, self._path("CURRENT"))
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by all processes using the store."""
+        with open(self._path("lock"), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _refresh(self):
+        """Pick up generation switches and records appended by other workers."""
+        try:
+            inode = os.stat(self._path("CURRENT")).st_ino
+        except FileNotFoundError:
+            return
+
+        if inode != self._current_inode or self._generation is None:
+            generation, dim = self._read_current()
+            if generation is None:
+                return
+            self._current_inode = inode
+        else:
+            generation, dim = self._generation, self._dim
+
+        if generation != self._generation:
+            self._generation = generation
+            self._dim = dim
+            self._index = {}
+            self._index_offset = 0
+            self._vectors = None
+
+        index_path = self._path(generation, "index.log")
+        try:
+            size = os.path.getsize(index_path)
+        except FileNotFoundError:
+            # Compacted away under us; the next refresh follows CURRENT
+            self._generation = None
+            return
+
+        complete = (size // _INDEX_RECORD.itemsize) * _INDEX_RECORD.itemsize
+        if complete > self._index_offset:
+            with open(index_path, "rb") as f:
+                f.seek(self._index_offset)
+                records = np.frombuffer(f.read(complete - self._index_offset), dtype=_INDEX_RECORD)
+            for key, row in zip(records["key"], records["row"].tolist()):
+                self._index[key.tobytes()] = row
+            self._index_offset = complete
+
+    def _map_vectors(self, min_rows: int) -> Optional[np.ndarray]:
+        """Memory-map the vector file, remapping when it has grown."""
+        if self._vectors is not None and len(self._vectors) >= min_rows:
+            return self._vectors
+
+        vectors_path = self._path(self._generation, "vectors.f32")
+        try:
+            rows = os.path.getsize(vectors_path) // (self._dim * 4)
+        except FileNotFoundError:
+            return None
+        if rows < min_rows:
+            return None
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._vectors
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """
+        Look up vectors for content keys.
+
+        Args:
+            keys: Content keys built with ``make_key``
+
+        Returns:
+            A float32 vector per key, or None where the key is not stored
+        """
+        with self._lock:
+            self._refresh()
+            if self._generation is None:
+                self.misses += len(keys)
+                return [None] * len(keys)
+
+            rows = [self._index.get(key) for key in keys]
+            known = [row for row in rows if row is not None]
+            vectors = self._map_vectors(max(known) + 1) if known else None
+
+            results: List[Optional[np.ndarray]] = []
+            for row in rows:
+                if row is None or vectors is None:
+                    results.append(None)
+                    self.misses += 1
+                else:
+                    results.append(np.array(vectors[row]))
+                    self.hits += 1
+            return results
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]):
+        """
+        Append vectors for keys that are not stored yet.
+
+        Args:
+            keys: Content keys built with ``make_key``
+            vectors: Embedding vector for each key
+        """
+        if not keys:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.nbytes > self.max_bytes:
+            return
+
+        with self._lock, self._file_lock():
+            self._refresh()
+
+            if self._generation is None:
+                self._generation = self._new_generation()
+                self._dim = matrix.shape[1]
+                self._write_current(self._generation, self._dim)
+            elif matrix.shape[1] != self._dim:
+                return
+
+            new_rows = [i for i, key in enumerate(keys) if key not in self._index]
+            # Drop duplicates within this call
+            seen = set()
+            new_rows = [i for i in new_rows if not (keys[i] in seen or seen.add(keys[i]))]
+            if not new_rows:
+                return
+
+            vectors_path = self._path(self._generation, "vectors.f32")
+            if os.path.getsize(vectors_path) + len(new_rows) * self._dim * 4 > self.max_bytes:
+                self._compact(keep_bytes=int(self.max_bytes * self.compact_ratio))
+                vectors_path = self._path(self._generation, "vectors.f32")
+
+            start_row = os.path.getsize(vectors_path) // (self._dim * 4)
+            records = np.zeros(len(new_rows), dtype=_INDEX_RECORD)
+            records["key"] = _keys_to_array([keys[i] for i in new_rows])
+            records["row"] = np.arange(start_row, start_row + len(new_rows), dtype=np.uint64)
+
+            # Vectors first, so an index record never points past the data
+            with open(vectors_path, "ab") as f:
+                f.write(matrix[new_rows].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._path(self._generation, "index.log"), "ab") as f:
+                f.write(records.tobytes())
+
+            self._refresh()
+
+    def _new_generation(self) -> str:
+        """Create an empty generation directory."""
+        generation = f"gen-{os.getpid()}-{os.urandom(4).hex()}"
+        os.makedirs(self._path(generation))
+        open(self._path(generation, "vectors.f32"), "wb").close()
+        open(self._path(generation, "index.log"), "wb").close()
+        return generation
+
+    def _compact(self, keep_bytes: int):
+        """
+        Rewrite the store keeping only the most recently written vectors.
+
+        Must be called with both locks held.
+        """
+        row_bytes = self._dim * 4
+        keep_rows = max(0, keep_bytes // row_bytes)
+
+        # Latest row per key, newest first
+        live = sorted(self._index.items(), key=lambda item: item[1], reverse=True)[:keep_rows]
+        live.reverse()
+
+        old_generation = self._generation
+        new_generation = self._new_generation()
+
+        if live:
+            vectors = self._map_vectors(live[-1][1] + 1)
+            records = np.zeros(len(live), dtype=_INDEX_RECORD)
+            records["key"] = _keys_to_array([key for key, _ in live])
+            records["row"] = np.arange(len(live), dtype=np.uint64)
+            with open(self._path(new_generation, "vectors.f32"), "wb") as f:
+                f.write(np.ascontiguousarray(vectors[[row for _, row in live]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._path(new_generation, "index.log"), "wb") as f:
+                f.write(records.tobytes())
+
+        self._write_current(new_generation, self._dim)
+        self._vectors = None
+        self._refresh()
+        self.compactions += 1
+
+        shutil.rmtree(self._path(old_generation), ignore_errors=True)
+
+    def compact(self):
+        """Compact the store down to ``compact_ratio`` of its size limit."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._generation is not None:
+                self._compact(keep_bytes=int(self.max_bytes * self.compact_ratio))
+
+    # ------------------------------------------------------------------
+    # Warm loading
+    # ------------------------------------------------------------------
+
+    def warm(self, cache: EmbeddingCache, max_bytes: Optional[int] = None) -> int:
+        """
+        Load the most recently written vectors into an in-memory cache.
+
+        Args:
+            cache: In-process cache to fill
+            max_bytes: Upper bound on bytes to load (defaults to the cache size)
+
+        Returns:
+            Number of vectors loaded
+        """
+        with self._lock:
+            self._refresh()
+            if self._generation is None or not self._index:
+                return 0
+
+            budget = cache.max_bytes if max_bytes is None else max_bytes
+            count = max(0, budget // (self._dim * 4 + 128))
+            newest = sorted(self._index.items(), key=lambda item: item[1])[-count:] if count else []
+            if not newest:
+                return 0
+            vectors = self._map_vectors(newest[-1][1] + 1)
+            if vectors is None:
+                return 0
+
+        # Oldest first so the newest end up most recently used
+        for key, row in newest:
+            cache.put(key, vectors[row])
+        return len(newest)
+
+    def get_stats(self) -> dict:
+        """Get store statistics."""
+        with self._lock:
+            vectors_bytes = 0
+            if self._generation is not None:
+                try:
+                    vectors_bytes = os.path.getsize(self._path(self._generation, "vectors.f32"))
+                except FileNotFoundError:
+                    pass
+            lookups = self.hits + self.misses
+            return {
+                "path": self.root,
+                "generation": self._generation,
+                "entries": len(self._index),
+                "bytes": vectors_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "compactions": self.compactions
+            }
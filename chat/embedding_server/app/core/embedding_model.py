@@ -1,80 +1,570 @@
 """
-BGE embedding model management with singleton pattern.
+Embedding model management and inference backends.
 """
 
+import json
 import os
-from typing import List
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+import numpy as np
 from .config import settings
-from .exceptions import ModelLoadError, ModelNotLoadedError
+from .exceptions import ConfigurationError, ModelLoadError, ModelNotLoadedError, ValidationError
+from .models import EmbeddingModelConfig, model_config
+from .bucketing import padded_tokens, sliding_windows, token_budget_batches
+from .m3_heads import M3Heads
+
+
+class EmbeddingBackend:
+    """
+    Inference backend producing L2-normalized float32 embeddings.
+    
+    Backends own the loaded model and its tokenizer; batching and length
+    bucketing are done by ``EmbeddingModel``.
+    """
+    
+    name = "base"
+    precision = "fp32"
+    
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts as one forward batch.
+        
+        Args:
+            texts: Input texts
+        
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        raise NotImplementedError
+    
+    def tokenize(self, texts: List[str]) -> Dict[str, List[List[int]]]:
+        """Unpadded input features of each text, truncated as ``encode`` would."""
+        raise NotImplementedError
+    
+    def encode_features(self, texts: List[str], features: Dict[str, List[List[int]]]) -> np.ndarray:
+        """
+        Embed one batch already tokenized by ``tokenize``.
+        
+        Backends that cannot take token ids embed ``texts`` instead.
+        """
+        return self.encode(texts)
+    
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Token count of each text, including special tokens, after truncation."""
+        return [len(ids) for ids in self.tokenize(texts)["input_ids"]]
+    
+    def hidden_states(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Run the encoder once and return its last hidden state.
+        
+        Args:
+            texts: Input texts
+        
+        Returns:
+            Tuple of (float32 hidden states (batch, tokens, hidden),
+            input ids, attention mask)
+        """
+        raise NotImplementedError(f"The {self.name} backend does not expose hidden states")
+    
+    def token_offsets(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """Character span of every token of each text, without truncation or special tokens."""
+        encoded = self.tokenizer(
+            texts,
+            add_special_tokens=False,
+            truncation=False,
+            return_offsets_mapping=True
+        )
+        return [[tuple(span) for span in offsets] for offsets in encoded["offset_mapping"]]
+    
+    def resident_bytes(self) -> int:
+        """Bytes held by the loaded weights (0 when unknown)."""
+        return 0
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    Backend calling ``SentenceTransformer.encode`` directly, or its forward
+    on batches tokenized once by ``EmbeddingModel``.
+    
+    Runs in the ``torch_precision`` mode (fp32, dynamic int8 or bf16),
+    falling back to fp32 when the mode is not supported.
+    """
+    
+    name = "sentence_transformers"
+    
+    def __init__(self, model_path: str, precision: Optional[str] = None):
+        super().__init__(model_path)
+        from sentence_transformers import SentenceTransformer
+        from .precision import apply_precision
+        
+        self.model = SentenceTransformer(model_path, device=settings.device)
+        self.model.max_seq_length = min(self.model.max_seq_length or settings.max_length, settings.max_length)
+        self.tokenizer = self.model.tokenizer
+        self.precision = apply_precision(self.model, precision or settings.torch_precision)
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        from .precision import precision_context
+        
+        with precision_context(self.precision):
+            embeddings = self.model.encode(
+                texts,
+                batch_size=len(texts),
+                normalize_embeddings=True,
+                convert_to_tensor=True,
+                show_progress_bar=False
+            )
+        return embeddings.float().cpu().numpy()
+    
+    def encode_features(self, texts: List[str], features: Dict[str, List[List[int]]]) -> np.ndarray:
+        import torch
+        from .precision import precision_context
+        
+        batch = self.tokenizer.pad(features, padding=True, return_tensors="pt").to(self.model.device)
+        with torch.inference_mode(), precision_context(self.precision):
+            embeddings = self.model(dict(batch))["sentence_embedding"]
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return embeddings.float().cpu().numpy()
+    
+    def hidden_states(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        import torch
+        from .precision import precision_context
+        
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_tensors="pt"
+        ).to(self.model.device)
+        with torch.inference_mode(), precision_context(self.precision):
+            hidden = self.model[0].auto_model(**encoded).last_hidden_state
+        return (
+            hidden.float().cpu().numpy(),
+            encoded["input_ids"].cpu().numpy(),
+            encoded["attention_mask"].cpu().numpy()
+        )
+    
+    def tokenize(self, texts: List[str]) -> Dict[str, List[List[int]]]:
+        # Same preprocessing as SentenceTransformer's own tokenization
+        texts = [str(text).strip() for text in texts]
+        if getattr(self.model[0], "do_lower_case", False):
+            texts = [text.lower() for text in texts]
+        return dict(self.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length
+        ))
+    
+    def resident_bytes(self) -> int:
+        from .precision import module_nbytes
+        
+        return module_nbytes(self.model)
+
+
+class LangChainBackend(EmbeddingBackend):
+    """Legacy backend going through LangChain ``HuggingFaceEmbeddings``."""
+    
+    name = "langchain"
+    
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        
+        self.model = HuggingFaceEmbeddings(
+            model_name=model_path,
+            model_kwargs={'device': settings.device},
+            encode_kwargs={'normalize_embeddings': True}
+        )
+        self.tokenizer = self.model.client.tokenizer
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.embed_documents(texts), dtype=np.float32)
+    
+    def tokenize(self, texts: List[str]) -> Dict[str, List[List[int]]]:
+        client = self.model.client
+        return dict(client.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=client.max_seq_length or settings.max_length
+        ))
+    
+    def resident_bytes(self) -> int:
+        from .precision import module_nbytes
+        
+        return module_nbytes(self.model.client)
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    ONNX Runtime CPU backend.
+    
+    The model is exported, graph-optimized and optionally int8-quantized
+    once (see ``onnx_runtime.prepare_model``); pooling follows the
+    sentence-transformers config of the model (CLS for BGE-m3).
+    """
+    
+    name = "onnx"
+    
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        from transformers import AutoTokenizer
+        from .onnx_runtime import create_session, prepare_model
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.onnx_path = prepare_model(model_path, "embedding")
+        self.session = create_session(self.onnx_path)
+        self.precision = "int8" if settings.onnx_quantize else "fp32"
+        self.pooling = self._read_pooling_mode(model_path)
+    
+    @staticmethod
+    def _read_pooling_mode(model_path: str) -> str:
+        """Pooling mode from the sentence-transformers config ("cls" or "mean")."""
+        try:
+            with open(os.path.join(model_path, "1_Pooling", "config.json"), "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            return "cls"
+        return "mean" if config.get("pooling_mode_mean_tokens") else "cls"
+    
+    def hidden_states(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=settings.max_length,
+            return_tensors="np"
+        )
+        return self._run(encoded)
+    
+    def _run(self, encoded) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Run the session on padded features."""
+        from .onnx_runtime import run_session
+        
+        hidden = run_session(self.session, encoded).astype(np.float32, copy=False)
+        return hidden, encoded["input_ids"], encoded["attention_mask"]
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self._pool(*self.hidden_states(texts))
+    
+    def encode_features(self, texts: List[str], features: Dict[str, List[List[int]]]) -> np.ndarray:
+        return self._pool(*self._run(self.tokenizer.pad(features, padding=True, return_tensors="np")))
+    
+    def _pool(self, hidden: np.ndarray, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Pooled, L2-normalized embeddings from the last hidden state."""
+        if self.pooling == "mean":
+            mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+            embeddings = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        else:
+            embeddings = hidden[:, 0]
+        
+        embeddings = embeddings.astype(np.float32, copy=False)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+    
+    def tokenize(self, texts: List[str]) -> Dict[str, List[List[int]]]:
+        return dict(self.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=settings.max_length
+        ))
+    
+    def resident_bytes(self) -> int:
+        from .onnx_runtime import artifact_nbytes
+        
+        return artifact_nbytes(self.onnx_path)
+
+
+# Available embedding backends by name
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    LangChainBackend.name: LangChainBackend,
+    OnnxEmbeddingBackend.name: OnnxEmbeddingBackend,
+}
 
 
 class EmbeddingModel:
-    """Singleton class for managing BGE embedding model."""
+    """
+    One embedding model described by an ``EmbeddingModelConfig``.
+    
+    Several instances can be served side by side; ``model_registry``
+    (see ``registry.py``) owns them and decides which ones stay loaded.
+    """
     
-    _instance = None
-    _model = None
-    _is_loaded = False
+    def __init__(self, config: Optional[EmbeddingModelConfig] = None):
+        self.config = config or model_config.embedding
+        self._backend: Optional[EmbeddingBackend] = None
+        self._m3_heads: Optional[M3Heads] = None
+        self._is_loaded = False
+        self._load_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+        self._tokens = 0
+        self._padded_tokens = 0
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(EmbeddingModel, cls).__new__(cls)
-        return cls._instance
+    @property
+    def name(self) -> str:
+        """Name requests use to select this model."""
+        return self.config.name
     
-    def __init__(self):
-        if not self._is_loaded:
-            self._load_model()
+    @property
+    def model_path(self) -> str:
+        """Model directory, resolved against the app root."""
+        return os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
+            self.config.path
+        )
+    
+    def load(self):
+        """
+        Load the model unless it is already loaded.
+        
+        Nothing is loaded at import time; the server calls this from a
+        background task at startup. Concurrent calls load only once.
+        """
+        with self._load_lock:
+            if not self._is_loaded:
+                self._load_model()
     
     def _load_model(self):
-        """Load the BGE embedding model."""
+        """Load the embedding model."""
         try:
-            model_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
-                settings.embedding_model_path
-            )
+            model_path = self.model_path
             
             if not os.path.exists(model_path):
                 raise ModelLoadError(f"Model path does not exist: {model_path}")
             
-            print(f"Loading BGE embedding model from: {model_path}")
+            backend_name = self.config.backend or settings.embedding_backend
+            backend_class = EMBEDDING_BACKENDS.get(backend_name)
+            if backend_class is None:
+                raise ConfigurationError(f"Unknown embedding backend: {backend_name}")
             
-            self._model = HuggingFaceEmbeddings(
-                model_name=model_path,
-                model_kwargs={'device': settings.device},
-                encode_kwargs={'normalize_embeddings': True}
-            )
+            print(f"Loading {self.name} embedding model from: {model_path} (backend: {backend_class.name})")
             
-            self._is_loaded = True
-            print("BGE embedding model loaded successfully")
+            self._backend = backend_class(model_path)
             
+            self._is_loaded = True
+            self._load_error = None
+            print(f"{self.name} embedding model loaded successfully")
+        
         except Exception as e:
-            print(f"Failed to load BGE embedding model: {str(e)}")
+            self._load_error = str(e)
+            print(f"Failed to load {self.name} embedding model: {str(e)}")
             raise ModelLoadError(f"Model loading failed: {str(e)}")
     
-    def get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for a single text."""
-        if not self._is_loaded:
-            raise ModelNotLoadedError("Embedding model is not loaded")
+    def unload(self):
+        """
+        Release the loaded backend.
         
-        try:
-            embedding = self._model.embed_query(text)
-            return embedding
-        except Exception as e:
-            print(f"Failed to generate embedding: {str(e)}")
-            raise ModelLoadError(f"Embedding generation failed: {str(e)}")
+        Forwards already running keep their own reference to the backend
+        and finish normally; the memory is freed once they return.
+        """
+        with self._load_lock:
+            self._backend = None
+            self._m3_heads = None
+            self._is_loaded = False
     
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts."""
-        if not self._is_loaded:
-            raise ModelNotLoadedError("Embedding model is not loaded")
+    def resident_bytes(self) -> int:
+        """Bytes held by the loaded weights (0 when not loaded or unknown)."""
+        backend = self._backend
+        return backend.resident_bytes() if backend is not None else 0
+    
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for multiple texts.
+        
+        Texts are tokenized once, bucketed by token length under the
+        ``max_batch_tokens`` padded budget, and each bucket's token ids go
+        to one backend forward without being tokenized again.
+        
+        Args:
+            texts: Input texts
+        
+        Returns:
+            float32 array of shape (len(texts), dimension), in input order
+        """
+        backend = self._backend
+        if backend is None:
+            raise ModelNotLoadedError(f"Embedding model {self.name} is not loaded")
         
         try:
-            embeddings = self._model.embed_documents(texts)
+            if len(texts) <= 1:
+                return backend.encode(texts)
+            
+            # Bucket by token length so short texts are not padded to long ones
+            features = backend.tokenize(texts)
+            lengths = [len(ids) for ids in features["input_ids"]]
+            batches = token_budget_batches(lengths, settings.max_batch_tokens, settings.batch_size)
+            self._tokens += int(sum(lengths))
+            self._padded_tokens += padded_tokens(lengths, batches)
+            
+            embeddings: Optional[np.ndarray] = None
+            for batch in batches:
+                vectors = backend.encode_features(
+                    [texts[i] for i in batch],
+                    {key: [values[i] for i in batch] for key, values in features.items()}
+                )
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+                embeddings[batch] = vectors
             return embeddings
         except Exception as e:
             print(f"Failed to generate embeddings: {str(e)}")
             raise ModelLoadError(f"Embeddings generation failed: {str(e)}")
     
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Token count of each text, including special tokens, after truncation."""
+        backend = self._backend
+        if backend is None:
+            raise ModelNotLoadedError(f"Embedding model {self.name} is not loaded")
+        return backend.token_lengths(texts)
+    
+    def split_windows(
+        self,
+        texts: List[str],
+        window_tokens: Optional[int] = None,
+        overlap_tokens: int = 0
+    ) -> List[List[Tuple[int, int, int]]]:
+        """
+        Split texts into overlapping token windows.
+        
+        Each text is tokenized once without truncation and cut into
+        windows of ``window_tokens`` tokens, consecutive windows sharing
+        ``overlap_tokens``. Windows are returned as character spans so
+        they can be embedded (and cached) as ordinary texts; a text that
+        fits in one window is returned whole.
+        
+        Args:
+            texts: Input texts
+            window_tokens: Tokens per window, excluding special tokens
+                (defaults to the model's max_length minus 2)
+            overlap_tokens: Tokens shared by consecutive windows
+        
+        Returns:
+            Per text, a list of (start_char, end_char, token_count) windows
+        """
+        backend = self._backend
+        if backend is None:
+            raise ModelNotLoadedError(f"Embedding model {self.name} is not loaded")
+        
+        window_tokens = min(window_tokens or self.config.max_length - 2, self.config.max_length - 2)
+        return [
+            sliding_windows(offsets, len(text), window_tokens, overlap_tokens)
+            for text, offsets in zip(texts, backend.token_offsets(texts))
+        ]
+    
+    @staticmethod
+    def pool_windows(vectors: np.ndarray, weights: Sequence[int], pooling: str = "mean") -> np.ndarray:
+        """
+        Pool the window vectors of one text into a single L2-normalized vector.
+        
+        Args:
+            vectors: float32 array of shape (windows, dimension)
+            weights: Token count of each window (weights for "mean")
+            pooling: "mean" (token-weighted) or "max" (element-wise)
+        
+        Returns:
+            float32 vector of shape (dimension,)
+        """
+        if pooling == "max":
+            pooled = vectors.max(axis=0)
+        else:
+            weights = np.asarray(weights, dtype=np.float32)
+            pooled = weights @ vectors / max(float(weights.sum()), 1e-9)
+        return (pooled / max(float(np.linalg.norm(pooled)), 1e-12)).astype(np.float32)
+    
+    def _get_m3_heads(self, backend: EmbeddingBackend) -> M3Heads:
+        """Load the BGE-M3 sparse and multi-vector heads on first use."""
+        if self._m3_heads is None:
+            with self._load_lock:
+                if self._m3_heads is None:
+                    if not M3Heads.available(self.model_path):
+                        raise ValidationError(
+                            f"Embedding model {self.name} has no sparse/multi-vector heads"
+                        )
+                    self._m3_heads = M3Heads(self.model_path, backend.tokenizer.all_special_ids)
+        return self._m3_heads
+    
+    def get_multi_embeddings(self, texts: List[str], outputs: Sequence[str]) -> Dict[str, list]:
+        """
+        Generate any combination of dense, sparse and multi-vector outputs.
+        
+        Each length bucket runs the encoder once; the requested BGE-M3
+        heads are applied to that single hidden state.
+        
+        Args:
+            texts: Input texts
+            outputs: Subset of "dense", "sparse" and "colbert"
+        
+        Returns:
+            Dict from output name to a per-text list, in input order:
+            dense float32 vectors, sparse (token ids, weights) pairs and
+            colbert float32 arrays of shape (tokens, dim)
+        
+        Raises:
+            ValidationError: If the model or backend cannot produce them
+        """
+        backend = self._backend
+        if backend is None:
+            raise ModelNotLoadedError(f"Embedding model {self.name} is not loaded")
+        
+        heads = None
+        if "sparse" in outputs or "colbert" in outputs:
+            heads = self._get_m3_heads(backend)
+        
+        try:
+            lengths = backend.token_lengths(texts)
+            batches = token_budget_batches(lengths, settings.max_batch_tokens, settings.batch_size)
+            self._tokens += int(sum(lengths))
+            self._padded_tokens += padded_tokens(lengths, batches)
+            
+            results: Dict[str, list] = {output: [None] * len(texts) for output in outputs}
+            for batch in batches:
+                hidden, input_ids, attention_mask = backend.hidden_states([texts[i] for i in batch])
+                computed = {}
+                if "dense" in outputs:
+                    computed["dense"] = M3Heads.dense(hidden)
+                if "sparse" in outputs:
+                    computed["sparse"] = heads.sparse(hidden, input_ids, attention_mask)
+                if "colbert" in outputs:
+                    computed["colbert"] = heads.colbert(hidden, attention_mask)
+                for output, values in computed.items():
+                    for position, index in enumerate(batch):
+                        results[output][index] = values[position]
+            return results
+        except NotImplementedError as e:
+            raise ValidationError(str(e))
+        except Exception as e:
+            print(f"Failed to generate multi embeddings: {str(e)}")
+            raise ModelLoadError(f"Multi embeddings generation failed: {str(e)}")
+    
+    @property
+    def model_id(self) -> str:
+        """
+        Stable identifier of the model, used for cache keys.
+        
+        Includes the backend and its effective precision (the configured
+        one until the model is loaded), so results of different runtimes,
+        precisions and ONNX quantization never share cache or disk-store
+        entries.
+        """
+        backend = self._backend
+        if backend is not None:
+            backend_name, precision = backend.name, backend.precision
+        else:
+            backend_name = self.config.backend or settings.embedding_backend
+            if backend_name == "onnx":
+                precision = "int8" if settings.onnx_quantize else "fp32"
+            elif backend_name == "sentence_transformers":
+                precision = settings.torch_precision
+            else:
+                precision = "fp32"
+        return f"{self.config.name}:{self.config.path}:{backend_name}:{precision}"
+    
     def is_loaded(self) -> bool:
         """Check if the model is loaded."""
         return self._is_loaded
@@ -82,12 +572,19 @@ class EmbeddingModel:
     def get_model_info(self) -> dict:
         """Get model information."""
         return {
-            "name": "BGE-m3-ko",
-            "path": settings.embedding_model_path,
-            "device": settings.device,
-            "is_loaded": self._is_loaded
+            "name": self.config.name,
+            "path": self.config.path,
+            "device": self.config.device,
+            "backend": self._backend.name if self._backend is not None else None,
+            "precision": self._backend.precision if self._backend is not None else None,
+            "max_batch_tokens": settings.max_batch_tokens,
+            "padding_efficiency": (
+                self._tokens / self._padded_tokens if self._padded_tokens else 1.0
+            ),
+            "is_loaded": self._is_loaded,
+            "load_error": self._load_error
         }
 
 
-# Global instance
-embedding_model = EmbeddingModel()
+# Default embedding model (registered in model_registry)
+embedding_model = EmbeddingModel(model_config.embedding)
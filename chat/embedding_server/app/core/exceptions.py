@@ -36,3 +36,11 @@ class ModelNotLoadedError(EmbeddingServerError):
 class ConfigurationError(EmbeddingServerError):
     """Raised when there's a configuration error."""
     pass
+
+
+class OverloadedError(EmbeddingServerError):
+    """Raised when a request is rejected because the server is at capacity."""
+    
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
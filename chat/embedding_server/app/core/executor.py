@@ -0,0 +1,119 @@
+"""
+Dedicated executors for running model inference off the event loop.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .config import settings
+
+
+def _configure_torch_threads(num_threads: int):
+    """Set the intra-op thread budget for torch, if torch is available."""
+    if num_threads <= 0:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(num_threads)
+
+
+class InferenceExecutor:
+    """
+    Executors used to keep blocking inference off the asyncio event loop.
+
+    Model forwards run in a small thread pool: torch releases the GIL and
+    parallelizes each forward internally, so a pool of one or two threads
+    avoids oversubscribing the cores while leaving the loop free for I/O.
+    An optional process pool is available for CPU-bound pure-Python work
+    that would otherwise hold the GIL.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        torch_threads: Optional[int] = None
+    ):
+        self.max_workers = max(1, max_workers if max_workers is not None else settings.inference_threads)
+        self.process_workers = (
+            process_workers if process_workers is not None else settings.inference_process_workers
+        )
+        self.torch_threads = torch_threads if torch_threads is not None else settings.torch_num_threads
+
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        """Create the inference thread pool on first use."""
+        if self._thread_pool is None:
+            _configure_torch_threads(self.torch_threads)
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Create the optional process pool on first use."""
+        if self.process_workers <= 0:
+            return None
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=min(self.process_workers, os.cpu_count() or 1)
+            )
+        return self._process_pool
+
+    async def _submit(self, executor: Executor, func: Callable, *args, **kwargs) -> Any:
+        """Run a callable on an executor and await its result."""
+        loop = asyncio.get_running_loop()
+        if kwargs:
+            func = functools.partial(func, **kwargs)
+        return await loop.run_in_executor(executor, func, *args)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking inference call on the inference thread pool.
+
+        Args:
+            func: Blocking callable (e.g. a model forward)
+
+        Returns:
+            The callable's return value
+        """
+        return await self._submit(self._get_thread_pool(), func, *args, **kwargs)
+
+    async def run_cpu(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run CPU-bound work on the process pool when enabled.
+
+        Falls back to the inference thread pool when no process pool is
+        configured. The callable and its arguments must be picklable.
+        """
+        executor = self._get_process_pool() or self._get_thread_pool()
+        return await self._submit(executor, func, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """Shut down all executors."""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
+
+    def get_stats(self) -> dict:
+        """Get executor configuration."""
+        return {
+            "inference_threads": self.max_workers,
+            "process_workers": self.process_workers,
+            "torch_threads": self.torch_threads
+        }
+
+
+# Global instance
+inference_executor = InferenceExecutor()
@@ -0,0 +1,146 @@
+"""
+Background model loading, warmup and readiness tracking.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .embedding_model import embedding_model
+from .executor import inference_executor
+from .registry import model_registry
+from .rerank_model import rerank_model
+
+
+# Default model of each service
+SERVICE_MODELS = {
+    "embedding": embedding_model,
+    "rerank": rerank_model,
+}
+
+# States in which a service's model can serve requests
+_SERVING_STATES = ("warming", "ready")
+
+
+def _synthetic_text(words: int) -> str:
+    """Text of roughly ``words`` tokens (one common word per token)."""
+    return " ".join(["hello"] * max(1, words))
+
+
+def _warmup_embedding(seq_length: int, batch_size: int) -> int:
+    """Run one synthetic embedding batch; returns the measured token length."""
+    texts = [_synthetic_text(seq_length)] * batch_size
+    embedding_model.get_embeddings(texts)
+    return max(embedding_model.token_lengths(texts[:1]))
+
+
+def _warmup_rerank(seq_length: int, batch_size: int) -> int:
+    """Run one synthetic rerank batch; returns the measured token length."""
+    pairs = [("hello world", _synthetic_text(seq_length))] * batch_size
+    rerank_model.score_pairs(pairs)
+    return max(rerank_model.token_lengths(pairs[:1]))
+
+
+_WARMUP_FUNCTIONS = {
+    "embedding": _warmup_embedding,
+    "rerank": _warmup_rerank,
+}
+
+
+class ModelLoader:
+    """
+    Load and warm up the models of the enabled services off the request path.
+
+    ``load_all`` loads every enabled model in its own thread so the models
+    load concurrently while the server is already accepting connections.
+    Each model then runs synthetic batches over the configured grid of
+    sequence lengths and batch sizes on the inference executor, so
+    allocator growth and kernel selection happen before real traffic.
+    The process is ready once every enabled model is loaded and warm.
+    """
+
+    def __init__(self):
+        self.services = [name for name in SERVICE_MODELS if settings.is_service_enabled(name)]
+        self._state: Dict[str, str] = {name: "pending" for name in self.services}
+        self._load_time: Dict[str, Optional[float]] = {name: None for name in self.services}
+        self._warmup_time: Dict[str, Optional[float]] = {name: None for name in self.services}
+        self._warmup_runs: Dict[str, List[Dict[str, Any]]] = {name: [] for name in self.services}
+        self._errors: Dict[str, Optional[str]] = {name: None for name in self.services}
+
+    async def _load(self, service: str):
+        """Load and warm up one service's model, recording the outcome."""
+        self._state[service] = "loading"
+        start_time = time.time()
+        try:
+            await asyncio.to_thread(model_registry.load, service)
+        except Exception as e:
+            self._state[service] = "failed"
+            self._errors[service] = str(e)
+            return
+        finally:
+            self._load_time[service] = time.time() - start_time
+
+        if settings.warmup_enabled:
+            self._state[service] = "warming"
+            start_time = time.time()
+            try:
+                await self._warmup(service)
+            except Exception as e:
+                self._state[service] = "failed"
+                self._errors[service] = f"Warmup failed: {str(e)}"
+                return
+            finally:
+                self._warmup_time[service] = time.time() - start_time
+
+        self._state[service] = "ready"
+
+    async def _warmup(self, service: str):
+        """Run the warmup grid, shortest inputs first, recording each timing."""
+        warmup = _WARMUP_FUNCTIONS[service]
+        for seq_length in sorted(settings.warmup_seq_lengths):
+            for batch_size in sorted(settings.warmup_batch_sizes):
+                start_time = time.perf_counter()
+                tokens = await inference_executor.run(warmup, seq_length, batch_size)
+                self._warmup_runs[service].append({
+                    "seq_length": seq_length,
+                    "tokens": tokens,
+                    "batch_size": batch_size,
+                    "seconds": time.perf_counter() - start_time
+                })
+
+    async def load_all(self):
+        """Load all enabled models concurrently; failures are recorded, not raised."""
+        await asyncio.gather(*(self._load(service) for service in self.services))
+
+    def is_enabled(self, service: str) -> bool:
+        """Check whether a service is served by this process."""
+        return service in self._state
+
+    def is_loaded(self, service: str) -> bool:
+        """Check whether a service's model is loaded (possibly still warming up)."""
+        return self._state.get(service) in _SERVING_STATES
+
+    def is_ready(self) -> bool:
+        """Check whether every enabled model is loaded and warmed up."""
+        return all(state == "ready" for state in self._state.values())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Per-service state, load and warmup timings, and error."""
+        return {
+            "ready": self.is_ready(),
+            "services": {
+                service: {
+                    "state": self._state[service],
+                    "load_time": self._load_time[service],
+                    "warmup_time": self._warmup_time[service],
+                    "warmup": self._warmup_runs[service],
+                    "error": self._errors[service]
+                }
+                for service in self.services
+            }
+        }
+
+
+# Global instance
+model_loader = ModelLoader()
@@ -0,0 +1,90 @@
+"""
+BGE-M3 sparse lexical and multi-vector (ColBERT) output heads.
+"""
+
+import os
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+
+# Representations a BGE-M3 forward pass can produce
+M3_OUTPUTS = ("dense", "sparse", "colbert")
+
+# Head weights shipped next to the BGE-M3 checkpoint
+_SPARSE_HEAD = "sparse_linear.pt"
+_COLBERT_HEAD = "colbert_linear.pt"
+
+
+class M3Heads:
+    """
+    The two extra linear heads of BGE-M3, applied to encoder hidden states.
+
+    The heads run in numpy on the last hidden state that the backend
+    already computed for the dense vector, so any combination of dense,
+    sparse and multi-vector outputs costs a single encoder pass.
+    """
+
+    def __init__(self, model_path: str, special_ids: Iterable[int]):
+        import torch
+
+        sparse = torch.load(os.path.join(model_path, _SPARSE_HEAD), map_location="cpu")
+        colbert = torch.load(os.path.join(model_path, _COLBERT_HEAD), map_location="cpu")
+
+        self.sparse_weight = sparse["weight"].float().numpy().T  # (hidden, 1)
+        self.sparse_bias = sparse["bias"].float().numpy()
+        self.colbert_weight = np.ascontiguousarray(colbert["weight"].float().numpy().T)  # (hidden, dim)
+        self.colbert_bias = colbert["bias"].float().numpy()
+        self.special_ids = np.array(sorted(set(special_ids)), dtype=np.int64)
+
+    @staticmethod
+    def available(model_path: str) -> bool:
+        """Check whether a model directory ships the BGE-M3 heads."""
+        return all(os.path.isfile(os.path.join(model_path, name)) for name in (_SPARSE_HEAD, _COLBERT_HEAD))
+
+    @staticmethod
+    def dense(hidden: np.ndarray) -> np.ndarray:
+        """L2-normalized CLS vectors, shape (batch, hidden)."""
+        cls = hidden[:, 0].astype(np.float32, copy=False)
+        return cls / np.maximum(np.linalg.norm(cls, axis=1, keepdims=True), 1e-12)
+
+    def sparse(
+        self,
+        hidden: np.ndarray,
+        input_ids: np.ndarray,
+        attention_mask: np.ndarray
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Lexical weight per distinct token of each text.
+
+        Token weights are ``relu(sparse_linear(h))``; repeated tokens keep
+        their largest weight and special tokens are dropped.
+
+        Returns:
+            Per text, (int32 token ids, float32 weights) sorted by token id
+        """
+        weights = np.maximum(hidden @ self.sparse_weight + self.sparse_bias, 0.0)[..., 0]
+
+        results = []
+        for row in range(len(hidden)):
+            keep = attention_mask[row].astype(bool) & ~np.isin(input_ids[row], self.special_ids)
+            token_ids, inverse = np.unique(input_ids[row][keep], return_inverse=True)
+            token_weights = np.zeros(len(token_ids), dtype=np.float32)
+            np.maximum.at(token_weights, inverse, weights[row][keep])
+            nonzero = token_weights > 0
+            results.append((token_ids[nonzero].astype(np.int32), token_weights[nonzero]))
+        return results
+
+    def colbert(self, hidden: np.ndarray, attention_mask: np.ndarray) -> List[np.ndarray]:
+        """
+        L2-normalized multi-vectors of every token after CLS.
+
+        Returns:
+            Per text, a float32 array of shape (tokens - 1, dim)
+        """
+        vectors = hidden[:, 1:] @ self.colbert_weight + self.colbert_bias
+        norms = np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+        vectors = (vectors / norms).astype(np.float32, copy=False)
+
+        counts = attention_mask[:, 1:].sum(axis=1)
+        return [vectors[row, :int(counts[row])] for row in range(len(hidden))]
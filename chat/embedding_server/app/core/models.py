@@ -3,7 +3,8 @@ Model configuration and settings.
 """
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from .config import settings
 
 
 class EmbeddingModelConfig(BaseModel):
@@ -14,6 +15,7 @@ class EmbeddingModelConfig(BaseModel):
     device: str = "cpu"
     max_length: int = 512
     normalize_embeddings: bool = True
+    backend: Optional[str] = None  # None follows settings.embedding_backend
 
 
 class RerankModelConfig(BaseModel):
@@ -23,6 +25,7 @@ class RerankModelConfig(BaseModel):
     path: str = "ai_models/bge/bge-reranker-v2-m3-ko"
     device: str = "cpu"
     max_length: int = 512
+    backend: Optional[str] = None  # None follows settings.rerank_backend
 
 
 class ModelConfig(BaseModel):
@@ -31,7 +34,40 @@ class ModelConfig(BaseModel):
     embedding: EmbeddingModelConfig = EmbeddingModelConfig()
     rerank: RerankModelConfig = RerankModelConfig()
     
+    # Additional models loaded on demand (see app/core/registry.py)
+    embedding_models: List[EmbeddingModelConfig] = []
+    rerank_models: List[RerankModelConfig] = []
+    memory_budget_bytes: int = 0
+    
     # Common settings
     batch_size: int = 32
     use_cache: bool = True
     cache_dir: Optional[str] = None
+
+
+# Global model configuration instance
+model_config = ModelConfig(
+    embedding=EmbeddingModelConfig(
+        name=settings.embedding_model_name,
+        path=settings.embedding_model_path,
+        device=settings.device,
+        max_length=settings.max_length
+    ),
+    rerank=RerankModelConfig(
+        name=settings.rerank_model_name,
+        path=settings.rerank_model_path,
+        device=settings.device,
+        max_length=settings.max_length
+    ),
+    embedding_models=[
+        EmbeddingModelConfig(name=name, path=path, device=settings.device, max_length=settings.max_length)
+        for name, path in settings.extra_embedding_models.items()
+    ],
+    rerank_models=[
+        RerankModelConfig(name=name, path=path, device=settings.device, max_length=settings.max_length)
+        for name, path in settings.extra_rerank_models.items()
+    ],
+    memory_budget_bytes=settings.model_memory_budget_bytes,
+    batch_size=settings.batch_size,
+    cache_dir=settings.model_cache_dir
+)
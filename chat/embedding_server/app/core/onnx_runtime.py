@@ -0,0 +1,189 @@
+"""
+ONNX Runtime export, optimization and session helpers for CPU inference.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import settings
+from .exceptions import ModelLoadError
+
+
+# Tasks that can be exported: sentence embedding or cross-encoder scoring
+ONNX_TASKS = ("embedding", "rerank")
+_MODEL_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def artifact_dir(model_path: str) -> str:
+    """
+    Directory holding the ONNX artifacts of a model.
+
+    Artifacts live in ``<model_path>/onnx``. When the model directory is
+    read-only (e.g. a ``:ro`` volume) they go under ``model_cache_dir``.
+    """
+    directory = os.path.join(model_path, "onnx")
+    if os.access(model_path, os.W_OK) or os.path.isdir(directory):
+        return directory
+    if not settings.model_cache_dir:
+        raise ModelLoadError(
+            f"Model path is read-only and MODEL_CACHE_DIR is not set: {model_path}"
+        )
+    model_hash = hashlib.blake2b(os.path.abspath(model_path).encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(settings.model_cache_dir, "onnx", f"{os.path.basename(model_path)}-{model_hash}")
+
+
+@contextmanager
+def _export_lock(directory: str):
+    """Exclusive lock so concurrent workers export a model only once."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "lock"), "a+") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _export(model_path: str, task: str, output_path: str):
+    """Export the PyTorch model to ONNX with dynamic batch and sequence axes."""
+    import torch
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model_class = AutoModelForSequenceClassification if task == "rerank" else AutoModel
+    model = model_class.from_pretrained(model_path).eval()
+
+    if task == "rerank":
+        sample = tokenizer(["query", "query"], ["a document", "another document"], padding=True, return_tensors="pt")
+        output_name, output_axes = "logits", {0: "batch"}
+    else:
+        sample = tokenizer(["a sentence", "another sentence"], padding=True, return_tensors="pt")
+        output_name, output_axes = "last_hidden_state", {0: "batch", 1: "sequence"}
+
+    input_names = [name for name in _MODEL_INPUTS if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = output_axes
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            ({name: sample[name] for name in input_names},),
+            output_path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            do_constant_folding=True
+        )
+
+
+def _optimize(input_path: str, output_path: str, model_path: str):
+    """Apply transformer graph fusions (attention, LayerNorm, GELU)."""
+    from onnxruntime.transformers.optimizer import optimize_model
+
+    with open(os.path.join(model_path, "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    optimized = optimize_model(
+        input_path,
+        model_type="bert",
+        num_heads=config.get("num_attention_heads", 0),
+        hidden_size=config.get("hidden_size", 0)
+    )
+    optimized.save_model_to_file(output_path, use_external_data_format=True)
+
+
+def _quantize(input_path: str, output_path: str):
+    """Dynamic int8 quantization of the weights (activations stay float)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(input_path, output_path, weight_type=QuantType.QInt8)
+
+
+def prepare_model(model_path: str, task: str, quantize: Optional[bool] = None) -> str:
+    """
+    Export, optimize and optionally quantize a model, once.
+
+    Each step writes its artifact under a temporary name and renames it
+    into place, so a crash never leaves a truncated model behind and
+    later starts reuse the cached files.
+
+    Args:
+        model_path: Hugging Face model directory
+        task: "embedding" or "rerank"
+        quantize: Apply dynamic int8 quantization (defaults to settings.onnx_quantize)
+
+    Returns:
+        Path of the ONNX model to load
+    """
+    if task not in ONNX_TASKS:
+        raise ModelLoadError(f"Unsupported ONNX task: {task}")
+    quantize = settings.onnx_quantize if quantize is None else quantize
+
+    directory = artifact_dir(model_path)
+    exported_path = os.path.join(directory, "model.onnx")
+    optimized_path = os.path.join(directory, "model.opt.onnx")
+    quantized_path = os.path.join(directory, "model.opt.int8.onnx")
+    target_path = quantized_path if quantize else optimized_path
+
+    if os.path.exists(target_path):
+        return target_path
+
+    with _export_lock(directory):
+        steps = [
+            (exported_path, lambda tmp: _export(model_path, task, tmp)),
+            (optimized_path, lambda tmp: _optimize(exported_path, tmp, model_path)),
+        ]
+        if quantize:
+            steps.append((quantized_path, lambda tmp: _quantize(optimized_path, tmp)))
+
+        for path, build in steps:
+            if os.path.exists(path):
+                continue
+            print(f"Building ONNX artifact: {path}")
+            tmp_path = path[:-len(".onnx")] + ".tmp.onnx"
+            build(tmp_path)
+            os.replace(tmp_path, path)
+
+    return target_path
+
+
+def artifact_nbytes(onnx_path: str) -> int:
+    """Size of an ONNX model file plus its external weight data files."""
+    directory = os.path.dirname(onnx_path)
+    stem = os.path.basename(onnx_path)[:-len("onnx")]
+    total = os.path.getsize(onnx_path)
+    for name in os.listdir(directory):
+        if name.startswith(stem) and name.endswith(".data"):
+            total += os.path.getsize(os.path.join(directory, name))
+    return total
+
+
+def create_session(onnx_path: str):
+    """
+    Create a CPU inference session with all graph optimizations enabled.
+
+    Intra-op threads follow ``onnx_threads``, falling back to
+    ``torch_num_threads`` so both backends share one thread budget.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    threads = settings.onnx_threads or settings.torch_num_threads
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    return ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def run_session(session, encoded: Dict[str, np.ndarray]) -> np.ndarray:
+    """Run a session on tokenizer output, feeding only the inputs it declares."""
+    input_names: List[str] = [model_input.name for model_input in session.get_inputs()]
+    feed = {name: np.asarray(encoded[name], dtype=np.int64) for name in input_names}
+    return session.run(None, feed)[0]
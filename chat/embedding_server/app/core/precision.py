@@ -0,0 +1,103 @@
+"""
+Reduced-precision modes for the PyTorch CPU backends.
+"""
+
+import contextlib
+from typing import Any, ContextManager
+
+
+# Supported precision modes
+PRECISION_MODES = ("fp32", "int8", "bf16")
+
+
+def bf16_supported() -> bool:
+    """Check whether the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def _select_quantized_engine(torch) -> bool:
+    """Pick an available int8 kernel backend, preferring x86/fbgemm."""
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return True
+    return False
+
+
+def apply_precision(module: Any, mode: str) -> str:
+    """
+    Convert a torch module to a reduced-precision mode in place.
+
+    ``int8`` applies dynamic quantization to every ``nn.Linear`` (weights
+    stored as int8, activations quantized on the fly). ``bf16`` casts the
+    weights to bfloat16; forwards must then run under
+    ``precision_context``. Unsupported modes fall back to fp32.
+
+    Args:
+        module: Model to convert
+        mode: "fp32", "int8" or "bf16"
+
+    Returns:
+        The mode actually in effect
+    """
+    if mode == "fp32":
+        return "fp32"
+    if mode not in PRECISION_MODES:
+        print(f"Unknown precision mode {mode!r}, using fp32")
+        return "fp32"
+
+    try:
+        import torch
+
+        if mode == "int8":
+            if not _select_quantized_engine(torch):
+                print("No quantized engine available, using fp32")
+                return "fp32"
+            torch.ao.quantization.quantize_dynamic(
+                module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+            return "int8"
+
+        if not bf16_supported():
+            print("CPU lacks native bfloat16 support, using fp32")
+            return "fp32"
+        module.to(torch.bfloat16)
+        return "bf16"
+
+    except Exception as e:
+        print(f"Failed to apply {mode} precision, using fp32: {str(e)}")
+        return "fp32"
+
+
+def precision_context(mode: str) -> ContextManager:
+    """Inference context for a precision mode (bfloat16 autocast for bf16)."""
+    if mode != "bf16":
+        return contextlib.nullcontext()
+
+    import torch
+    return torch.autocast("cpu", dtype=torch.bfloat16)
+
+
+def module_nbytes(module: Any) -> int:
+    """
+    Bytes held by a torch module's weights and buffers.
+
+    Counts the state dict, which includes the packed int8 weights of
+    dynamically quantized layers that ``parameters()`` does not report.
+    """
+    import torch
+
+    def nbytes(value: Any) -> int:
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(nbytes(item) for item in value)
+        return 0
+
+    return sum(nbytes(value) for value in module.state_dict(keep_vars=True).values())
@@ -0,0 +1,139 @@
+"""
+Pre-fork multi-worker launcher sharing model weights copy-on-write.
+"""
+
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Any, Dict
+
+from .config import settings
+from .executor import inference_executor
+from .lifecycle import model_loader
+from .registry import model_registry
+
+
+# Backends whose runtime threads do not survive fork; workers load these themselves
+_FORK_UNSAFE_BACKENDS = {"onnx"}
+
+
+def _preload_models():
+    """
+    Load fork-safe models in the parent before forking.
+
+    Torch weights live in plain heap memory that every forked worker
+    shares copy-on-write as long as nobody writes to it, so a model
+    loaded here is resident once for all workers. The parent never runs
+    a forward pass, which keeps the OpenMP thread pool from starting
+    before fork.
+    """
+    backends = {"embedding": settings.embedding_backend, "rerank": settings.rerank_backend}
+    for service in model_loader.services:
+        if backends[service] in _FORK_UNSAFE_BACKENDS:
+            print(f"Not preloading {service} model: {backends[service]} backend is not fork-safe")
+            continue
+        model_registry.load(service)
+
+    # Move everything allocated so far out of the collector's view, so
+    # collections in the workers do not touch (and copy) these pages
+    gc.collect()
+    gc.freeze()
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker_threads(workers: int) -> int:
+    """Torch intra-op threads per worker (explicit or an even share of the cores)."""
+    if settings.worker_torch_threads > 0:
+        return settings.worker_torch_threads
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _run_worker(app: Any, sock: socket.socket, worker_id: int, threads: int, log_level: str):
+    """Worker process body: set its thread budget and serve on the shared socket."""
+    import uvicorn
+
+    settings.worker_id = worker_id
+    settings.torch_num_threads = threads
+    inference_executor.torch_threads = threads
+
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def run_prefork(app: Any, workers: int, host: str, port: int, log_level: str = "info"):
+    """
+    Serve an ASGI app from ``workers`` forked processes.
+
+    Models are loaded once in the parent and shared copy-on-write; each
+    worker gets its own torch thread budget and runs its own event loop
+    on the shared listening socket. Workers that exit unexpectedly are
+    re-forked from the parent, which still holds the loaded weights.
+
+    Args:
+        app: ASGI application
+        workers: Number of worker processes
+        host: Bind address
+        port: Bind port
+        log_level: Uvicorn log level
+    """
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    _preload_models()
+
+    sock = _bind_socket(host, port)
+    threads = _worker_threads(workers)
+    print(f"Starting {workers} workers on {host}:{port} ({threads} torch threads each)")
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                _run_worker(app, sock, worker_id, threads, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        worker_id = children.pop(pid, None)
+        if worker_id is None or stopping:
+            continue
+        print(f"Worker {worker_id} (pid {pid}) exited with status {status}, restarting")
+        time.sleep(1.0)
+        spawn(worker_id)
+
+    sock.close()
@@ -0,0 +1,298 @@
+"""
+Registry of named models, loaded on demand under a RAM budget.
+"""
+
+import asyncio
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .embedding_model import EmbeddingModel, embedding_model
+from .exceptions import ConfigurationError, ValidationError
+from .models import ModelConfig, model_config
+from .rerank_model import RerankModel, rerank_model
+
+
+# Model kinds served by the registry
+MODEL_KINDS = ("embedding", "rerank")
+
+# Weight file extensions counted when estimating a model's size before loading
+_WEIGHT_EXTENSIONS = (".safetensors", ".bin", ".pt")
+
+
+def weights_nbytes(model_path: str) -> int:
+    """On-disk size of a model's weight files (ONNX artifacts excluded)."""
+    total = 0
+    for root, dirs, files in os.walk(model_path):
+        dirs[:] = [name for name in dirs if name != "onnx"]
+        for name in files:
+            if name.endswith(_WEIGHT_EXTENSIONS):
+                total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class _Entry:
+    """A registered model with its usage and memory accounting."""
+
+    def __init__(self, kind: str, model: Any, pinned: bool):
+        self.kind = kind
+        self.model = model
+        self.pinned = pinned
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_time: Optional[float] = None
+        self.resident_bytes = 0
+        self.last_used: Optional[float] = None
+        self.in_flight = 0
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Named embedding and rerank models sharing one memory budget.
+
+    The default model of each kind is pinned: it is loaded at startup by
+    ``ModelLoader`` and never evicted. Additional models from
+    ``ModelConfig`` load on their first request; when loading one would
+    exceed ``memory_budget_bytes``, the least recently used unpinned
+    models are unloaded first. A budget of 0 disables eviction.
+
+    ``acquire`` counts the model as in use until the matching ``release``;
+    models in use are never evicted, so a request cannot lose its model
+    halfway through.
+    """
+
+    def __init__(self, config: ModelConfig, defaults: Dict[str, Any]):
+        self.memory_budget_bytes = max(0, config.memory_budget_bytes)
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._defaults = {kind: model.name for kind, model in defaults.items()}
+        self._lock = threading.Lock()
+        self._eviction_listeners: List[Callable[[str, Any], None]] = []
+
+        for kind, model in defaults.items():
+            self.register(kind, model, pinned=True)
+        for embedding_config in config.embedding_models:
+            self.register("embedding", EmbeddingModel(embedding_config))
+        for rerank_config in config.rerank_models:
+            self.register("rerank", RerankModel(rerank_config))
+
+    def register(self, kind: str, model: Any, pinned: bool = False):
+        """Add a model under its configured name."""
+        if kind not in MODEL_KINDS:
+            raise ConfigurationError(f"Unknown model kind: {kind}")
+        key = (kind, model.name)
+        if key in self._entries:
+            raise ConfigurationError(f"Duplicate {kind} model name: {model.name}")
+        self._entries[key] = _Entry(kind, model, pinned)
+
+    def names(self, kind: str) -> List[str]:
+        """Names of the registered models of a kind, default first."""
+        names = [name for entry_kind, name in self._entries if entry_kind == kind]
+        return sorted(names, key=lambda name: (name != self._defaults.get(kind), name))
+
+    def _entry(self, kind: str, name: Optional[str]) -> _Entry:
+        """Look up a model, ``None`` selecting the default of its kind."""
+        entry = self._entries.get((kind, name or self._defaults.get(kind)))
+        if entry is None:
+            raise ValidationError(
+                f"Unknown {kind} model: {name} (available: {', '.join(self.names(kind))})"
+            )
+        return entry
+
+    def get(self, kind: str, name: Optional[str] = None) -> Any:
+        """Registered model by name, without loading it."""
+        return self._entry(kind, name).model
+
+    def add_eviction_listener(self, listener: Callable[[str, Any], None]):
+        """Call ``listener(kind, model)`` after a model is evicted."""
+        self._eviction_listeners.append(listener)
+
+    def _touch(self, entry: _Entry) -> bool:
+        """
+        Count a hit, mark the model as most recently used and in use.
+
+        Returns:
+            Whether the model is loaded (and, being in use, stays loaded)
+        """
+        with self._lock:
+            entry.hits += 1
+            entry.in_flight += 1
+            entry.last_used = time.time()
+            self._entries.move_to_end((entry.kind, entry.model.name))
+            return entry.model.is_loaded()
+
+    def acquire(self, kind: str, name: Optional[str] = None) -> Any:
+        """
+        Model for a request, loading it first if needed.
+
+        The model is not evicted until ``release`` is called for it.
+
+        Args:
+            kind: "embedding" or "rerank"
+            name: Model name (None for the default model)
+
+        Returns:
+            The loaded model
+
+        Raises:
+            ValidationError: If no model has this name
+        """
+        entry = self._entry(kind, name)
+        if not self._touch(entry):
+            try:
+                self._load(entry)
+            except BaseException:
+                self._release(entry)
+                raise
+        return entry.model
+
+    async def acquire_async(self, kind: str, name: Optional[str] = None) -> Any:
+        """``acquire`` without blocking the event loop on a model load."""
+        entry = self._entry(kind, name)
+        if not self._touch(entry):
+            try:
+                await asyncio.to_thread(self._load, entry)
+            except BaseException:
+                self._release(entry)
+                raise
+        return entry.model
+
+    def release(self, kind: str, model: Any):
+        """Mark a model returned by ``acquire`` as no longer in use."""
+        self._release(self._entry(kind, model.name))
+
+    def _release(self, entry: _Entry):
+        """Drop one in-use count of a model."""
+        with self._lock:
+            entry.in_flight = max(0, entry.in_flight - 1)
+
+    @asynccontextmanager
+    async def lease_async(self, kind: str, name: Optional[str] = None) -> AsyncIterator[Any]:
+        """``acquire_async`` and ``release`` around a block."""
+        model = await self.acquire_async(kind, name)
+        try:
+            yield model
+        finally:
+            self.release(kind, model)
+
+    def load(self, kind: str, name: Optional[str] = None):
+        """Load a model (startup path; not counted as a hit)."""
+        self._load(self._entry(kind, name))
+
+    def _load(self, entry: _Entry):
+        """Load a model, evicting others first to stay within the budget."""
+        with entry.load_lock:
+            if entry.model.is_loaded():
+                return
+
+            model_path = entry.model.model_path
+            estimate = weights_nbytes(model_path) if os.path.isdir(model_path) else 0
+            self._evict(estimate, keep=entry)
+
+            start_time = time.time()
+            entry.model.load()
+            with self._lock:
+                entry.loads += 1
+                entry.load_time = time.time() - start_time
+                entry.resident_bytes = self._measure(entry.model) or estimate
+
+        # The estimate can be off (e.g. int8 weights); settle the budget again
+        self._evict(0, keep=entry)
+
+    @staticmethod
+    def _measure(model: Any) -> int:
+        """Resident bytes reported by a loaded model's backend (0 when unknown)."""
+        try:
+            return model.resident_bytes()
+        except Exception as e:
+            print(f"Failed to measure {model.name} model size: {str(e)}")
+            return 0
+
+    def _evict(self, incoming_bytes: int, keep: _Entry):
+        """Unload least recently used idle unpinned models until ``incoming_bytes`` fit."""
+        if self.memory_budget_bytes <= 0:
+            return
+
+        with self._lock:
+            used = sum(entry.resident_bytes for entry in self._entries.values() if entry.model.is_loaded())
+            candidates = [
+                entry for entry in self._entries.values()
+                if entry is not keep and not entry.pinned and entry.in_flight == 0 and entry.model.is_loaded()
+            ]
+
+        evicted = []
+        for entry in candidates:
+            if used + incoming_bytes <= self.memory_budget_bytes:
+                break
+            # A model being loaded by another request is skipped, not waited for
+            if not entry.load_lock.acquire(blocking=False):
+                continue
+            try:
+                with self._lock:
+                    # Re-check: a request may have acquired the model meanwhile
+                    if entry.in_flight > 0 or not entry.model.is_loaded():
+                        continue
+                    print(f"Evicting {entry.kind} model {entry.model.name} ({entry.resident_bytes} bytes)")
+                    entry.model.unload()
+                    used -= entry.resident_bytes
+                    entry.evictions += 1
+                    entry.resident_bytes = 0
+                # Listeners run before the model can be reloaded
+                for listener in self._eviction_listeners:
+                    try:
+                        listener(entry.kind, entry.model)
+                    except Exception as e:
+                        print(f"Eviction listener failed for {entry.model.name}: {str(e)}")
+                evicted.append(entry)
+            finally:
+                entry.load_lock.release()
+        if evicted:
+            gc.collect()
+
+        if used + incoming_bytes > self.memory_budget_bytes:
+            print(
+                f"Model memory budget exceeded: {used + incoming_bytes} of "
+                f"{self.memory_budget_bytes} bytes (remaining models are pinned or in use)"
+            )
+
+    def resident_bytes(self) -> int:
+        """Bytes held by all loaded models."""
+        with self._lock:
+            return sum(entry.resident_bytes for entry in self._entries.values() if entry.model.is_loaded())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model load time, resident bytes, hits and evictions."""
+        with self._lock:
+            models: Dict[str, Dict[str, Any]] = {kind: {} for kind in MODEL_KINDS}
+            for (kind, name), entry in self._entries.items():
+                models[kind][name] = {
+                    "loaded": entry.model.is_loaded(),
+                    "default": name == self._defaults.get(kind),
+                    "pinned": entry.pinned,
+                    "path": entry.model.config.path,
+                    "load_time": entry.load_time,
+                    "resident_bytes": entry.resident_bytes if entry.model.is_loaded() else 0,
+                    "hits": entry.hits,
+                    "loads": entry.loads,
+                    "evictions": entry.evictions,
+                    "in_flight": entry.in_flight,
+                    "last_used": entry.last_used
+                }
+
+        return {
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "resident_bytes": self.resident_bytes(),
+            "models": models
+        }
+
+
+# Global instance
+model_registry = ModelRegistry(
+    model_config,
+    defaults={"embedding": embedding_model, "rerank": rerank_model}
+)
@@ -1,128 +1,442 @@
 """
-BGE rerank model management with singleton pattern.
+Rerank model management and inference backends.
 """
 
 import os
-from typing import List, Tuple, Optional
-from sentence_transformers import CrossEncoder
+import threading
+from typing import Dict, List, Tuple, Optional, Sequence, Type
+import numpy as np
 from .config import settings
-from .exceptions import ModelLoadError, ModelNotLoadedError
+from .exceptions import ConfigurationError, ModelLoadError, ModelNotLoadedError
+from .models import RerankModelConfig, model_config
+from .bucketing import padded_tokens, sliding_windows, token_budget_batches
+
+
+# Special tokens around a (query, passage) pair, e.g. <s> q </s></s> p </s>
+_PAIR_SPECIAL_TOKENS = 4
+
+# Smallest passage budget, even next to a very long query
+_MIN_PASSAGE_TOKENS = 32
+
+
+class RerankBackend:
+    """
+    Inference backend scoring (query, document) pairs.
+    
+    Backends own the loaded model and its tokenizer; batching and length
+    bucketing are done by ``RerankModel``.
+    """
+    
+    name = "base"
+    precision = "fp32"
+    
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+    
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """
+        Score pairs as one forward batch.
+        
+        Args:
+            pairs: List of (query, document) pairs
+        
+        Returns:
+            float32 array of relevance scores in [0, 1]
+        """
+        raise NotImplementedError
+    
+    def tokenize(self, pairs: List[Tuple[str, str]]) -> Dict[str, List[List[int]]]:
+        """Unpadded input features of each (query, document) pair, truncated as ``predict`` would."""
+        return dict(self.tokenizer(
+            [query for query, _ in pairs],
+            [document for _, document in pairs],
+            truncation=True,
+            max_length=settings.max_length
+        ))
+    
+    def predict_features(self, pairs: List[Tuple[str, str]], features: Dict[str, List[List[int]]]) -> np.ndarray:
+        """Score one batch already tokenized by ``tokenize``."""
+        return self.predict(pairs)
+    
+    def token_lengths(self, pairs: List[Tuple[str, str]]) -> List[int]:
+        """Token count of each (query, document) pair after truncation."""
+        return [len(ids) for ids in self.tokenize(pairs)["input_ids"]]
+    
+    def token_offsets(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """Character span of every token of each text, without truncation or special tokens."""
+        encoded = self.tokenizer(
+            texts,
+            add_special_tokens=False,
+            truncation=False,
+            return_offsets_mapping=True
+        )
+        return [[tuple(span) for span in offsets] for offsets in encoded["offset_mapping"]]
+    
+    def resident_bytes(self) -> int:
+        """Bytes held by the loaded weights (0 when unknown)."""
+        return 0
+
+
+class CrossEncoderBackend(RerankBackend):
+    """
+    Backend calling sentence-transformers ``CrossEncoder.predict``, or its
+    underlying model on batches tokenized once by ``RerankModel``.
+    
+    Runs in the ``torch_precision`` mode (fp32, dynamic int8 or bf16),
+    falling back to fp32 when the mode is not supported.
+    """
+    
+    name = "cross_encoder"
+    
+    def __init__(self, model_path: str, precision: Optional[str] = None):
+        super().__init__(model_path)
+        from sentence_transformers import CrossEncoder
+        from .precision import apply_precision
+        
+        self.model = CrossEncoder(
+            model_path,
+            device=settings.device,
+            max_length=settings.max_length
+        )
+        self.tokenizer = self.model.tokenizer
+        self.precision = apply_precision(self.model.model, precision or settings.torch_precision)
+    
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        from .precision import precision_context
+        
+        with precision_context(self.precision):
+            scores = self.model.predict(
+                [list(pair) for pair in pairs],
+                batch_size=len(pairs),
+                convert_to_tensor=True,
+                show_progress_bar=False
+            )
+        return scores.float().cpu().numpy().ravel()
+    
+    def predict_features(self, pairs: List[Tuple[str, str]], features: Dict[str, List[List[int]]]) -> np.ndarray:
+        import torch
+        from .precision import precision_context
+        
+        model = self.model.model
+        batch = self.tokenizer.pad(features, padding=True, return_tensors="pt").to(model.device)
+        with torch.inference_mode(), precision_context(self.precision):
+            logits = model(**batch, return_dict=True).logits
+        # CrossEncoder's default activation: sigmoid for single-logit models
+        scores = torch.sigmoid(logits) if logits.shape[1] == 1 else logits
+        return scores.float().cpu().numpy().ravel()
+    
+    def resident_bytes(self) -> int:
+        from .precision import module_nbytes
+        
+        return module_nbytes(self.model.model)
+
+
+class OnnxRerankBackend(RerankBackend):
+    """
+    ONNX Runtime CPU backend.
+    
+    Uses the exported sequence-classification graph and applies the same
+    sigmoid as ``CrossEncoder`` for single-logit models.
+    """
+    
+    name = "onnx"
+    
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        from transformers import AutoTokenizer
+        from .onnx_runtime import create_session, prepare_model
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.onnx_path = prepare_model(model_path, "rerank")
+        self.session = create_session(self.onnx_path)
+        self.precision = "int8" if settings.onnx_quantize else "fp32"
+    
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        encoded = self.tokenizer(
+            [query for query, _ in pairs],
+            [document for _, document in pairs],
+            padding=True,
+            truncation=True,
+            max_length=settings.max_length,
+            return_tensors="np"
+        )
+        return self._run(encoded, len(pairs))
+    
+    def predict_features(self, pairs: List[Tuple[str, str]], features: Dict[str, List[List[int]]]) -> np.ndarray:
+        return self._run(self.tokenizer.pad(features, padding=True, return_tensors="np"), len(pairs))
+    
+    def _run(self, encoded, count: int) -> np.ndarray:
+        """Sigmoid of the first logit for padded features."""
+        from .onnx_runtime import run_session
+        
+        logits = run_session(self.session, encoded).reshape(count, -1)[:, 0]
+        return (1.0 / (1.0 + np.exp(-logits))).astype(np.float32)
+    
+    def resident_bytes(self) -> int:
+        from .onnx_runtime import artifact_nbytes
+        
+        return artifact_nbytes(self.onnx_path)
+
+
+# Available rerank backends by name
+RERANK_BACKENDS: Dict[str, Type[RerankBackend]] = {
+    CrossEncoderBackend.name: CrossEncoderBackend,
+    OnnxRerankBackend.name: OnnxRerankBackend,
+}
 
 
 class RerankModel:
-    """Singleton class for managing BGE rerank model."""
+    """
+    One rerank model described by a ``RerankModelConfig``.
+    
+    Several instances can be served side by side; ``model_registry``
+    (see ``registry.py``) owns them and decides which ones stay loaded.
+    """
+    
+    def __init__(self, config: Optional[RerankModelConfig] = None):
+        self.config = config or model_config.rerank
+        self._backend: Optional[RerankBackend] = None
+        self._is_loaded = False
+        self._load_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+        self._tokens = 0
+        self._padded_tokens = 0
     
-    _instance = None
-    _model = None
-    _is_loaded = False
+    @property
+    def name(self) -> str:
+        """Name requests use to select this model."""
+        return self.config.name
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(RerankModel, cls).__new__(cls)
-        return cls._instance
+    @property
+    def model_path(self) -> str:
+        """Model directory, resolved against the app root."""
+        return os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
+            self.config.path
+        )
     
-    def __init__(self):
-        if not self._is_loaded:
-            self._load_model()
+    def load(self):
+        """
+        Load the model unless it is already loaded.
+        
+        Nothing is loaded at import time; the server calls this from a
+        background task at startup. Concurrent calls load only once.
+        """
+        with self._load_lock:
+            if not self._is_loaded:
+                self._load_model()
     
     def _load_model(self):
-        """Load the BGE rerank model."""
+        """Load the rerank model."""
         try:
-            model_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
-                settings.rerank_model_path
-            )
+            model_path = self.model_path
             
             if not os.path.exists(model_path):
                 raise ModelLoadError(f"Model path does not exist: {model_path}")
             
-            print(f"Loading BGE rerank model from: {model_path}")
+            backend_name = self.config.backend or settings.rerank_backend
+            backend_class = RERANK_BACKENDS.get(backend_name)
+            if backend_class is None:
+                raise ConfigurationError(f"Unknown rerank backend: {backend_name}")
             
-            self._model = CrossEncoder(
-                model_path,
-                device=settings.device,
-                max_length=settings.max_length
-            )
+            print(f"Loading {self.name} rerank model from: {model_path} (backend: {backend_class.name})")
+            
+            self._backend = backend_class(model_path)
             
             self._is_loaded = True
-            print("BGE rerank model loaded successfully")
+            self._load_error = None
+            print(f"{self.name} rerank model loaded successfully")
             
         except Exception as e:
-            print(f"Failed to load BGE rerank model: {str(e)}")
+            self._load_error = str(e)
+            print(f"Failed to load {self.name} rerank model: {str(e)}")
             raise ModelLoadError(f"Model loading failed: {str(e)}")
     
-    def rerank(
-        self, 
-        query: str, 
-        documents: List[str],
-        top_k: Optional[int] = None
-    ) -> List[Tuple[int, float]]:
+    def unload(self):
         """
-        Rerank documents based on query relevance.
+        Release the loaded backend.
+        
+        Forwards already running keep their own reference to the backend
+        and finish normally; the memory is freed once they return.
+        """
+        with self._load_lock:
+            self._backend = None
+            self._is_loaded = False
+    
+    def resident_bytes(self) -> int:
+        """Bytes held by the loaded weights (0 when not loaded or unknown)."""
+        backend = self._backend
+        return backend.resident_bytes() if backend is not None else 0
+    
+    def score_pairs(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """
+        Score (query, document) pairs in length-bucketed predict batches.
+        
+        Pairs are tokenized once, grouped by token length under the
+        ``rerank_max_batch_tokens`` padded budget, and each group's token
+        ids are scored without tokenizing again. Scores are returned in
+        input order.
         
         Args:
-            query: The search query
-            documents: List of documents to rerank
-            top_k: Number of top results to return (None for all)
+            pairs: List of (query, document) pairs
             
         Returns:
-            List of tuples (document_index, score) sorted by relevance
+            float32 array with the relevance score of each pair
         """
-        if not self._is_loaded:
-            raise ModelNotLoadedError("Rerank model is not loaded")
+        backend = self._backend
+        if backend is None:
+            raise ModelNotLoadedError(f"Rerank model {self.name} is not loaded")
         
         try:
-            # Prepare pairs for cross-encoder
-            pairs = [[query, doc] for doc in documents]
+            if not pairs:
+                return np.zeros(0, dtype=np.float32)
             
-            # Get scores
-            scores = self._model.predict(pairs)
-            
-            # Create (index, score) pairs and sort by score
-            indexed_scores = list(enumerate(scores))
-            indexed_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            # Return top_k results if specified
-            if top_k is not None:
-                return indexed_scores[:top_k]
-            
-            return indexed_scores
+            features = backend.tokenize(pairs)
+            lengths = [len(ids) for ids in features["input_ids"]]
+            batches = token_budget_batches(
+                lengths,
+                settings.rerank_max_batch_tokens,
+                settings.rerank_max_batch_pairs
+            )
+            self._tokens += int(sum(lengths))
+            self._padded_tokens += padded_tokens(lengths, batches)
             
+            scores = np.empty(len(pairs), dtype=np.float32)
+            for batch in batches:
+                scores[batch] = backend.predict_features(
+                    [pairs[i] for i in batch],
+                    {key: [values[i] for i in batch] for key, values in features.items()}
+                )
+            return scores
         except Exception as e:
-            print(f"Failed to rerank documents: {str(e)}")
-            raise ModelLoadError(f"Reranking failed: {str(e)}")
+            print(f"Failed to score pairs: {str(e)}")
+            raise ModelLoadError(f"Pair scoring failed: {str(e)}")
     
-    def rerank_batch(
-        self, 
-        queries: List[str], 
-        documents: List[str],
+    @staticmethod
+    def rank_scores(
+        scores: Sequence[float],
         top_k: Optional[int] = None
-    ) -> List[List[Tuple[int, float]]]:
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Rerank documents for multiple queries.
+        Select and sort the top scoring documents.
+        
+        Uses ``argpartition`` to find the top_k candidates in linear time
+        and only sorts those k winners.
         
         Args:
-            queries: List of search queries
-            documents: List of documents to rerank
-            top_k: Number of top results to return for each query
+            scores: Relevance score for each document
+            top_k: Number of top results to return (None for all)
             
         Returns:
-            List of rerank results for each query
+            Tuple of (document indices, scores) sorted by relevance
         """
-        if not self._is_loaded:
-            raise ModelNotLoadedError("Rerank model is not loaded")
+        scores = np.asarray(scores, dtype=np.float64)
+        count = len(scores)
+        k = count if top_k is None else min(top_k, count)
         
-        try:
-            results = []
-            for query in queries:
-                query_results = self.rerank(query, documents, top_k)
-                results.append(query_results)
-            
-            return results
-            
-        except Exception as e:
-            print(f"Failed to rerank batch: {str(e)}")
-            raise ModelLoadError(f"Batch reranking failed: {str(e)}")
+        if k < count:
+            indices = np.argpartition(-scores, k - 1)[:k]
+        else:
+            indices = np.arange(count)
+        
+        indices = indices[np.argsort(-scores[indices], kind="stable")]
+        return indices, scores[indices]
+    
+    def token_lengths(self, pairs: List[Tuple[str, str]]) -> List[int]:
+        """Token count of each (query, document) pair after truncation."""
+        backend = self._backend
+        if backend is None:
+            raise ModelNotLoadedError(f"Rerank model {self.name} is not loaded")
+        return backend.token_lengths(pairs)
+    
+    @staticmethod
+    def estimate_pair_tokens(pair: Tuple[str, str]) -> int:
+        """
+        Estimate the padded token count of a (query, document) pair.
+        
+        Uses a character-based approximation so request scheduling does not
+        tokenize; ``score_pairs`` buckets by exact token counts. The result
+        is capped at ``max_length``.
+        """
+        query, document = pair
+        estimate = (len(query) + len(document)) // settings.rerank_chars_per_token + 4
+        return min(settings.max_length, estimate)
+    
+    def split_passages(
+        self,
+        query: str,
+        documents: List[str],
+        window_tokens: Optional[int] = None,
+        overlap_tokens: int = 0
+    ) -> List[List[Tuple[int, int, int]]]:
+        """
+        Split documents into overlapping passages that fit next to the query.
+        
+        The passage budget is ``max_length`` minus the query tokens and the
+        pair's special tokens, so no (query, passage) pair is truncated.
+        
+        Args:
+            query: The search query
+            documents: Documents to split
+            window_tokens: Tokens per passage (capped at the budget)
+            overlap_tokens: Tokens shared by consecutive passages
+        
+        Returns:
+            Per document, a list of (start_char, end_char, token_count) passages
+        """
+        backend = self._backend
+        if backend is None:
+            raise ModelNotLoadedError(f"Rerank model {self.name} is not loaded")
+        
+        offsets = backend.token_offsets([query] + documents)
+        budget = max(_MIN_PASSAGE_TOKENS, self.config.max_length - len(offsets[0]) - _PAIR_SPECIAL_TOKENS)
+        window_tokens = min(window_tokens or budget, budget)
+        return [
+            sliding_windows(document_offsets, len(document), window_tokens, overlap_tokens)
+            for document, document_offsets in zip(documents, offsets[1:])
+        ]
+    
+    @staticmethod
+    def aggregate_passages(scores: Sequence[float], aggregation: str = "max", top_n: int = 3) -> float:
+        """
+        Document score from its passage scores.
+        
+        Args:
+            scores: Scores of the passages scored so far
+            aggregation: "max" or "mean_top_n" (mean of the ``top_n`` best)
+            top_n: Passages averaged by "mean_top_n"
+        
+        Returns:
+            Document relevance score
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        if aggregation == "mean_top_n" and len(scores) > 1:
+            n = min(top_n, len(scores))
+            return float(np.partition(scores, len(scores) - n)[-n:].mean())
+        return float(scores.max())
+    
+    @property
+    def model_id(self) -> str:
+        """
+        Stable identifier of the model, used for cache keys.
+        
+        Includes the backend and its effective precision (the configured
+        one until the model is loaded), so results of different runtimes,
+        precisions and ONNX quantization never share cache or disk-store
+        entries.
+        """
+        backend = self._backend
+        if backend is not None:
+            backend_name, precision = backend.name, backend.precision
+        else:
+            backend_name = self.config.backend or settings.rerank_backend
+            if backend_name == "onnx":
+                precision = "int8" if settings.onnx_quantize else "fp32"
+            elif backend_name == "cross_encoder":
+                precision = settings.torch_precision
+            else:
+                precision = "fp32"
+        return f"{self.config.name}:{self.config.path}:{backend_name}:{precision}"
     
     def is_loaded(self) -> bool:
         """Check if the model is loaded."""
@@ -131,13 +445,20 @@ class RerankModel:
     def get_model_info(self) -> dict:
         """Get model information."""
         return {
-            "name": "bge-reranker-v2-m3-ko",
-            "path": settings.rerank_model_path,
-            "device": settings.device,
-            "max_length": settings.max_length,
-            "is_loaded": self._is_loaded
+            "name": self.config.name,
+            "path": self.config.path,
+            "device": self.config.device,
+            "backend": self._backend.name if self._backend is not None else None,
+            "precision": self._backend.precision if self._backend is not None else None,
+            "max_length": self.config.max_length,
+            "max_batch_tokens": settings.rerank_max_batch_tokens,
+            "padding_efficiency": (
+                self._tokens / self._padded_tokens if self._padded_tokens else 1.0
+            ),
+            "is_loaded": self._is_loaded,
+            "load_error": self._load_error
         }
 
 
-# Global instance
-rerank_model = RerankModel()
+# Default rerank model (registered in model_registry)
+rerank_model = RerankModel(model_config.rerank)
@@ -0,0 +1,809 @@
+"""
+Memory-mapped vector collections with IVF and HNSW search.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import settings
+from .exceptions import ValidationError
+from ..utils.quantization import quantize_int8
+
+
+# Storage element types and index kinds
+COLLECTION_DTYPES = ("float16", "int8")
+COLLECTION_INDEXES = ("ivf", "hnsw", "flat")
+
+# Collection names double as directory names
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Rows scored per matrix product when scanning
+_SCAN_ROWS = 65536
+
+# Lloyd iterations when training IVF centroids
+_KMEANS_ITERATIONS = 10
+
+
+def validate_collection_name(name: str) -> str:
+    """Reject names that are not safe as a single directory name."""
+    if not _NAME_PATTERN.match(name or ""):
+        raise ValidationError("Collection names are 1-64 letters, digits, '_' or '-'")
+    return name
+
+
+def _id_hash(record_id: Any) -> int:
+    """Stable 64-bit hash of a record id, shared by all workers."""
+    return int.from_bytes(hashlib.blake2b(str(record_id).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hnsw_available() -> bool:
+    """Check whether the optional hnswlib package is installed."""
+    try:
+        import hnswlib  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best ``k`` (rows, scores) by descending score."""
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[best], rows[best]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+
+def train_centroids(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means over L2-normalized vectors.
+
+    Args:
+        vectors: float32 training sample of shape (count, dimension)
+        nlist: Number of centroids
+        seed: Random seed for initialization and empty-cluster reseeding
+
+    Returns:
+        float32 unit-norm centroids of shape (nlist, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    nlist = max(1, min(nlist, len(vectors)))
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(_KMEANS_ITERATIONS):
+        assign = assign_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=nlist)
+
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    return centroids
+
+
+def assign_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each vector, as int32."""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _SCAN_ROWS):
+        chunk = np.asarray(vectors[start:start + _SCAN_ROWS], dtype=np.float32)
+        assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assign
+
+
+class VectorCollection:
+    """
+    Append-only vector collection persisted as memory-mapped files.
+
+    The collection directory holds ``meta.json``, the quantized vectors
+    (``vectors.f16``, or ``vectors.i8`` with per-row ``scales.f32``) and
+    ``records.jsonl``, one ``{"id", "row", "metadata"}`` line per stored
+    row. Upserting an existing id appends a new row and tombstones the
+    old one. Writers append under an exclusive file lock, records last,
+    so a record never points past its data; readers memory-map the
+    vectors and tail the record log, so workers sharing the directory
+    see each other's writes.
+
+    ``save`` checkpoints the per-row record offsets, the tombstones and a
+    sorted table of id hashes to ``index.npz``. Opening a collection loads
+    that checkpoint and only replays records written after it; metadata
+    is read from the log by offset when results are returned.
+
+    Search scores candidates exactly against the stored vectors:
+
+    - ``flat`` scans every row.
+    - ``ivf`` scans the ``nprobe`` inverted lists nearest to the query.
+      Centroids are trained with spherical k-means (``train_ivf``, run in
+      the background by the service) once the collection reaches
+      ``collection_ivf_train_size`` rows and retrained when it grows by
+      ``collection_ivf_retrain_growth``. Until then rows are scanned.
+      Assignments are persisted in ``ivf-*/assign.i32``, so reloading
+      does not retrain.
+    - ``hnsw`` uses an hnswlib graph (optional dependency) that upserts
+      extend as they write. It is saved to ``hnsw.bin`` by ``save``; other
+      workers and later loads insert the rows added since before their
+      next search. Without hnswlib, rows are scanned. hnswlib keeps a
+      float32 copy of every vector plus its links in memory, so HNSW does
+      not get the float16/int8 storage reduction: resident memory is more
+      than twice the float16 vector file, which stays on disk only to
+      extend the graphs of other workers. HNSW collections therefore
+      always store float16 and reject an explicit ``dtype``.
+
+    Vectors are expected to be L2-normalized; scores are inner products.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Any] = {}
+        self._meta_inode: Optional[int] = None
+        self._records_offset = 0
+        self._rows = 0
+        # Rows of ids recorded after the checkpoint; older ids are looked up by hash
+        self._id_rows: Dict[str, int] = {}
+        self._id_hashes: Optional[np.ndarray] = None
+        self._id_hash_rows: Optional[np.ndarray] = None
+        self._record_offsets = np.zeros(0, dtype=np.int64)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._live = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+
+        # IVF state
+        self._ivf_generation: Optional[str] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._assigned = 0
+
+        # HNSW state
+        self._hnsw = None
+        self._hnsw_rows = 0
+
+        # Statistics
+        self.searches = 0
+        self.upserts = 0
+
+        with self._lock:
+            self._load_checkpoint()
+            self._refresh()
+
+    # ------------------------------------------------------------------
+    # Creation
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def create(cls, path: str, model: str, dtype: Optional[str] = None, index: str = "ivf") -> "VectorCollection":
+        """
+        Create an empty collection directory.
+
+        Args:
+            path: Collection directory (must not exist)
+            model: Embedding model name used for upserts and queries
+            dtype: "float16" or "int8" storage (None for float16; ivf and flat only)
+            index: "ivf", "hnsw" or "flat"
+
+        Returns:
+            The opened collection
+        """
+        if index == "hnsw" and dtype is not None:
+            raise ValidationError(
+                "HNSW collections do not take a dtype: the graph keeps its own float32 copy of every vector"
+            )
+        dtype = dtype or "float16"
+        if dtype not in COLLECTION_DTYPES:
+            raise ValidationError(f"Unsupported collection dtype: {dtype}")
+        if index not in COLLECTION_INDEXES:
+            raise ValidationError(f"Unsupported collection index: {index}")
+        if index == "hnsw" and not hnsw_available():
+            raise ValidationError("HNSW collections require the hnswlib package")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.makedirs(path)
+        except FileExistsError:
+            raise ValidationError(f"Collection already exists: {os.path.basename(path)}")
+
+        open(os.path.join(path, "records.jsonl"), "wb").close()
+        cls._write_meta(path, {
+            "name": os.path.basename(path),
+            "model": model,
+            "dtype": dtype,
+            "index": index,
+            "dim": None,
+            "ivf": None,
+            "ivf_trained_rows": 0,
+            "created_at": time.time()
+        })
+        return cls(path)
+
+    # ------------------------------------------------------------------
+    # File layout helpers
+    # ------------------------------------------------------------------
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.path, *parts)
+
+    @staticmethod
+    def _write_meta(path: str, meta: Dict[str, Any]):
+        """Atomically replace ``meta.json``."""
+        tmp_path = os.path.join(path, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+    @property
+    def _vectors_file(self) -> str:
+        return self._path("vectors.i8" if self.dtype == "int8" else "vectors.f16")
+
+    @property
+    def model(self) -> str:
+        return self._meta["model"]
+
+    @property
+    def dtype(self) -> str:
+        return self._meta["dtype"]
+
+    @property
+    def index(self) -> str:
+        return self._meta["index"]
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._meta.get("dim")
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by all processes writing the collection."""
+        with open(self._path("lock"), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _refresh(self):
+        """Pick up metadata changes and rows appended by other workers."""
+        inode = os.stat(self._path("meta.json")).st_ino
+        if inode != self._meta_inode:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                self._meta = json.load(f)
+            self._meta_inode = inode
+
+        self._read_records()
+        self._map_vectors()
+
+        if self.index == "ivf" and self._meta.get("ivf"):
+            self._refresh_ivf()
+        elif self.index == "hnsw" and self._hnsw is None and self._rows and hnsw_available():
+            self._open_hnsw()
+
+    def _read_records(self):
+        """Tail the record log, tombstoning rows whose id was upserted again."""
+        records_path = self._path("records.jsonl")
+        if os.path.getsize(records_path) <= self._records_offset:
+            return
+
+        with open(records_path, "rb") as f:
+            f.seek(self._records_offset)
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete == 0:
+            return
+
+        offsets, rows = [], []
+        position = self._records_offset
+        for line in data[:complete].splitlines(keepends=True):
+            record = json.loads(line)
+            offsets.append(position)
+            rows.append(record["row"])
+            position += len(line)
+
+            previous = self._lookup_row(record["id"])
+            if previous is not None:
+                self._grow(previous + 1)
+                if not self._deleted[previous]:
+                    self._deleted[previous] = True
+                    self._live -= 1
+            self._id_rows[record["id"]] = record["row"]
+            self._live += 1
+
+        self._grow(max(rows) + 1)
+        self._record_offsets[rows] = offsets
+        self._rows = max(self._rows, max(rows) + 1)
+        self._records_offset += complete
+
+    def _lookup_row(self, record_id: Any) -> Optional[int]:
+        """Current row of an id, or None if it is not stored."""
+        row = self._id_rows.get(record_id)
+        if row is not None or self._id_hashes is None:
+            return row
+
+        # Checkpointed ids: confirm hash matches against the stored record
+        target = _id_hash(record_id)
+        position = int(np.searchsorted(self._id_hashes, target))
+        while position < len(self._id_hashes) and self._id_hashes[position] == target:
+            row = int(self._id_hash_rows[position])
+            if not self._deleted[row] and self.get_records([row])[0]["id"] == record_id:
+                return row
+            position += 1
+        return None
+
+    def _load_checkpoint(self):
+        """Restore the record index saved by ``save`` instead of replaying the whole log."""
+        checkpoint_path = self._path("index.npz")
+        if not os.path.exists(checkpoint_path):
+            return
+
+        with np.load(checkpoint_path) as checkpoint:
+            records_offset = int(checkpoint["records_offset"])
+            if records_offset > os.path.getsize(self._path("records.jsonl")):
+                return
+            rows = int(checkpoint["rows"])
+            self._grow(rows)
+            self._record_offsets[:rows] = checkpoint["record_offsets"]
+            self._deleted[:rows] = checkpoint["deleted"]
+            self._id_hashes = checkpoint["id_hashes"]
+            self._id_hash_rows = checkpoint["id_hash_rows"]
+
+        self._rows = rows
+        self._live = rows - int(np.count_nonzero(self._deleted[:rows]))
+        self._records_offset = records_offset
+
+    def _save_checkpoint(self):
+        """Write the record index up to the current log offset; must hold both locks."""
+        hashes = np.fromiter((_id_hash(record_id) for record_id in self._id_rows), dtype=np.uint64, count=len(self._id_rows))
+        rows = np.fromiter(self._id_rows.values(), dtype=np.int64, count=len(self._id_rows))
+        if self._id_hashes is not None:
+            # Checkpointed ids not replaced since
+            live = ~self._deleted[self._id_hash_rows]
+            hashes = np.concatenate([self._id_hashes[live], hashes])
+            rows = np.concatenate([self._id_hash_rows[live], rows])
+        order = np.argsort(hashes, kind="stable")
+
+        tmp_path = self._path("index.npz.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                records_offset=np.int64(self._records_offset),
+                rows=np.int64(self._rows),
+                record_offsets=self._record_offsets[:self._rows],
+                deleted=self._deleted[:self._rows],
+                id_hashes=hashes[order],
+                id_hash_rows=rows[order]
+            )
+        os.replace(tmp_path, self._path("index.npz"))
+
+        self._id_hashes, self._id_hash_rows = hashes[order], rows[order]
+        self._id_rows = {}
+
+    def _grow(self, rows: int):
+        """Grow the per-row arrays (by doubling) to hold ``rows`` rows."""
+        if rows <= len(self._deleted):
+            return
+        capacity = max(rows, 2 * len(self._deleted), 1024)
+        self._deleted = np.concatenate([self._deleted, np.zeros(capacity - len(self._deleted), dtype=bool)])
+        self._record_offsets = np.concatenate([
+            self._record_offsets, np.zeros(capacity - len(self._record_offsets), dtype=np.int64)
+        ])
+
+    def _map_vectors(self):
+        """Memory-map the vector (and scale) files, remapping when they have grown."""
+        if self._rows == 0 or (self._vectors is not None and len(self._vectors) >= self._rows):
+            return
+        dtype = np.int8 if self.dtype == "int8" else np.dtype("<f2")
+        self._vectors = np.memmap(self._vectors_file, dtype=dtype, mode="r", shape=(self._rows, self.dim))
+        if self.dtype == "int8":
+            self._scales = np.memmap(self._path("scales.f32"), dtype="<f4", mode="r", shape=(self._rows,))
+
+    def _dequantize(self, rows) -> np.ndarray:
+        """float32 vectors of the given rows (a slice or sorted row indices)."""
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            vectors *= np.asarray(self._scales[rows], dtype=np.float32)[:, np.newaxis]
+        return vectors
+
+    def _refresh_ivf(self):
+        """Load new centroids, or extend the inverted lists with new assignments."""
+        generation = self._meta["ivf"]
+        if generation != self._ivf_generation:
+            self._centroids = np.fromfile(self._path(generation, "centroids.f32"), dtype="<f4").reshape(-1, self.dim)
+            self._lists = [np.zeros(0, dtype=np.int64) for _ in range(len(self._centroids))]
+            self._assigned = 0
+            self._ivf_generation = generation
+
+        assign_path = self._path(generation, "assign.i32")
+        assigned = min(os.path.getsize(assign_path) // 4, self._rows)
+        if assigned <= self._assigned:
+            return
+
+        assign = np.fromfile(assign_path, dtype="<i4", count=assigned - self._assigned, offset=self._assigned * 4)
+        rows = np.arange(self._assigned, assigned, dtype=np.int64)
+        order = np.argsort(assign, kind="stable")
+        lists, starts = np.unique(assign[order], return_index=True)
+        for list_id, chunk in zip(lists, np.split(rows[order], starts[1:])):
+            self._lists[list_id] = np.concatenate([self._lists[list_id], chunk])
+        self._assigned = assigned
+
+    def _open_hnsw(self):
+        """Load the saved HNSW graph, or start an empty one."""
+        import hnswlib
+
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        capacity = max(1024, 2 * self._rows)
+        if os.path.exists(self._path("hnsw.bin")):
+            index.load_index(self._path("hnsw.bin"), max_elements=capacity)
+            # Rows replaced after the graph was saved
+            for row in np.flatnonzero(self._deleted[:index.get_current_count()]):
+                try:
+                    index.mark_deleted(int(row))
+                except RuntimeError:
+                    pass
+        else:
+            index.init_index(
+                max_elements=capacity,
+                ef_construction=settings.collection_hnsw_ef_construction,
+                M=settings.collection_hnsw_m
+            )
+        self._hnsw = index
+        self._hnsw_rows = index.get_current_count()
+
+    def _extend_hnsw(self):
+        """Insert rows added since the graph was built; must hold ``_lock``."""
+        index = self._hnsw
+        if index.get_max_elements() < self._rows:
+            index.resize_index(max(self._rows, 2 * index.get_max_elements()))
+
+        for start in range(self._hnsw_rows, self._rows, _SCAN_ROWS):
+            end = min(start + _SCAN_ROWS, self._rows)
+            index.add_items(self._dequantize(slice(start, end)), np.arange(start, end))
+        for row in np.flatnonzero(self._deleted[self._hnsw_rows:self._rows]) + self._hnsw_rows:
+            index.mark_deleted(int(row))
+        # Rows of the graph tombstoned since the last extension
+        for row in np.flatnonzero(self._deleted[:self._hnsw_rows]):
+            try:
+                index.mark_deleted(int(row))
+            except RuntimeError:
+                pass
+        self._hnsw_rows = self._rows
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef: Optional[int] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Nearest stored rows for each query vector.
+
+        Args:
+            queries: float32 query vectors of shape (count, dimension)
+            top_k: Results per query
+            nprobe: Inverted lists scanned per query (IVF)
+            ef: Candidate list size (HNSW)
+
+        Returns:
+            Per query, (row, score) pairs by descending score
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        with self._lock:
+            self._refresh()
+            if self._live == 0:
+                return [[] for _ in queries]
+            if queries.shape[1] != self.dim:
+                raise ValidationError(
+                    f"Query dimension {queries.shape[1]} does not match collection dimension {self.dim}"
+                )
+            self.searches += len(queries)
+
+            top_k = min(top_k, self._live)
+            if self._hnsw is not None:
+                self._extend_hnsw()
+                self._hnsw.set_ef(max(ef or settings.collection_hnsw_ef_search, top_k))
+                labels, distances = self._hnsw.knn_query(queries, k=top_k)
+                return [
+                    [(int(row), float(1.0 - distance)) for row, distance in zip(row_labels, row_distances)]
+                    for row_labels, row_distances in zip(labels, distances)
+                ]
+
+            rows, deleted = self._rows, self._deleted[:self._rows].copy()
+            centroids, lists = self._centroids, list(self._lists)
+            assigned = self._assigned
+
+        if centroids is None:
+            return self._scan(queries, top_k, rows, deleted)
+
+        nprobe = min(nprobe or settings.collection_ivf_nprobe, len(centroids))
+        probes = np.argsort(-(queries @ centroids.T), axis=1)[:, :nprobe]
+        results = []
+        for query, query_probes in zip(queries, probes):
+            candidates = np.concatenate(
+                [lists[list_id] for list_id in query_probes] + [np.arange(assigned, rows)]
+            )
+            candidates = np.sort(candidates[~deleted[candidates]])
+            if len(candidates) == 0:
+                results.append([])
+                continue
+            scores = self._dequantize(candidates) @ query
+            best_rows, best_scores = _top_k(scores, candidates, top_k)
+            results.append(list(zip(best_rows.tolist(), best_scores.tolist())))
+        return results
+
+    def _scan(self, queries: np.ndarray, top_k: int, rows: int, deleted: np.ndarray) -> List[List[Tuple[int, float]]]:
+        """Exact search over every live row, in chunks."""
+        best_rows = [np.zeros(0, dtype=np.int64) for _ in queries]
+        best_scores = [np.zeros(0, dtype=np.float32) for _ in queries]
+
+        for start in range(0, rows, _SCAN_ROWS):
+            end = min(start + _SCAN_ROWS, rows)
+            scores = queries @ self._dequantize(slice(start, end)).T
+            scores[:, deleted[start:end]] = -np.inf
+            chunk_rows = np.arange(start, end)
+            for i in range(len(queries)):
+                best_rows[i], best_scores[i] = _top_k(
+                    np.concatenate([best_scores[i], scores[i]]),
+                    np.concatenate([best_rows[i], chunk_rows]),
+                    top_k
+                )
+
+        return [
+            [(row, score) for row, score in zip(rows_i.tolist(), scores_i.tolist()) if score != -np.inf]
+            for rows_i, scores_i in zip(best_rows, best_scores)
+        ]
+
+    def get_records(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """Stored ``{"id", "row", "metadata"}`` records of the given rows."""
+        offsets = self._record_offsets[list(rows)].tolist()
+        records = []
+        with open(self._path("records.jsonl"), "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                records.append(json.loads(f.readline()))
+        return records
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, metadata: Optional[Sequence[Optional[dict]]] = None) -> int:
+        """
+        Append vectors, replacing any rows stored under the same ids.
+
+        Args:
+            ids: Record ids (the last occurrence wins within a call)
+            vectors: L2-normalized float32 vectors of shape (count, dimension)
+            metadata: Optional JSON-serializable metadata per record
+
+        Returns:
+            Number of rows in the collection after the upsert
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        metadata = list(metadata) if metadata is not None else [None] * len(ids)
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self.dim is None:
+                self._meta["dim"] = vectors.shape[1]
+                self._write_meta(self.path, self._meta)
+                self._refresh()
+            elif vectors.shape[1] != self.dim:
+                raise ValidationError(
+                    f"Vector dimension {vectors.shape[1]} does not match collection dimension {self.dim}"
+                )
+
+            # Encode everything before touching the files
+            start_row = self._rows
+            lines = [
+                json.dumps({"id": record_id, "row": start_row + i, "metadata": meta}, ensure_ascii=False) + "\n"
+                for i, (record_id, meta) in enumerate(zip(ids, metadata))
+            ]
+            if self.dtype == "int8":
+                codes, scales = quantize_int8(vectors)
+            else:
+                codes, scales = vectors.astype("<f2"), None
+            assign = assign_centroids(vectors, self._centroids) if self._centroids is not None else None
+
+            # Drop rows an interrupted upsert wrote without committing records
+            self._truncate(self._vectors_file, start_row * self.dim * codes.itemsize)
+            if scales is not None:
+                self._truncate(self._path("scales.f32"), start_row * 4)
+            if assign is not None:
+                assign_path = self._path(self._ivf_generation, "assign.i32")
+                self._truncate(assign_path, start_row * 4)
+                self._assign_rows(assign_path, self._centroids, os.path.getsize(assign_path) // 4, start_row)
+
+            # Vectors, scales and IVF assignments first; records commit the rows
+            self._append(self._vectors_file, codes)
+            if scales is not None:
+                self._append(self._path("scales.f32"), scales.astype("<f4"))
+            if assign is not None:
+                self._append(self._path(self._ivf_generation, "assign.i32"), assign)
+
+            with open(self._path("records.jsonl"), "ab") as f:
+                f.write("".join(lines).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._refresh()
+            self.upserts += len(ids)
+
+            if self._hnsw is not None:
+                self._extend_hnsw()
+            return self._rows
+
+    def _assign_rows(self, path: str, centroids: np.ndarray, start: int, end: int):
+        """Append the IVF assignments of stored rows ``[start, end)``."""
+        for chunk_start in range(start, end, _SCAN_ROWS):
+            chunk_end = min(chunk_start + _SCAN_ROWS, end)
+            self._append(path, assign_centroids(self._dequantize(slice(chunk_start, chunk_end)), centroids))
+
+    @staticmethod
+    def _truncate(path: str, size: int):
+        """Cut a data file back to ``size`` bytes if it holds uncommitted rows."""
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    @staticmethod
+    def _append(path: str, array: np.ndarray):
+        """Append an array's raw bytes to a file."""
+        with open(path, "ab") as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def needs_training(self) -> bool:
+        """Check whether the IVF centroids are missing or outgrown."""
+        if self.index != "ivf" or self._live < settings.collection_ivf_train_size:
+            return False
+        trained_rows = self._meta.get("ivf_trained_rows") or 0
+        return not self._meta.get("ivf") or self._live >= trained_rows * settings.collection_ivf_retrain_growth
+
+    @contextmanager
+    def _training_lock(self):
+        """Non-blocking lock held by the one thread (in any worker) training the index."""
+        with open(self._path("train.lock"), "a+") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def train_ivf(self, force: bool = False) -> bool:
+        """
+        Train centroids on a sample of live rows and switch to them.
+
+        k-means and assigning the existing rows run without the collection
+        locks, so searches and upserts keep using the current generation
+        meanwhile (rows it has not assigned are scanned). Only assigning
+        the rows written during training and switching ``meta.json`` to the
+        new generation hold the locks.
+
+        Args:
+            force: Train even when the current centroids are not outgrown
+
+        Returns:
+            Whether a new generation was switched in (False when another
+            thread or worker is already training)
+        """
+        with self._training_lock() as acquired:
+            if not acquired:
+                return False
+
+            with self._lock:
+                self._refresh()
+                if self._live == 0 or not (force or self.needs_training()):
+                    return False
+                rows = self._rows
+                live_rows = np.flatnonzero(~self._deleted[:rows])
+
+            nlist = settings.collection_ivf_nlist or int(np.sqrt(len(live_rows)))
+            nlist = max(1, min(nlist, len(live_rows)))
+            print(f"Training IVF index of collection {self.name}: {nlist} lists over {len(live_rows)} rows")
+            start_time = time.time()
+
+            rng = np.random.default_rng(len(live_rows))
+            sample_size = min(len(live_rows), max(nlist * settings.collection_ivf_train_per_list, 10000))
+            sample = np.sort(rng.choice(live_rows, sample_size, replace=False))
+            centroids = train_centroids(self._dequantize(sample), nlist)
+
+            generation = f"ivf-{os.getpid()}-{os.urandom(4).hex()}"
+            assign_path = self._path(generation, "assign.i32")
+            os.makedirs(self._path(generation))
+            self._append(self._path(generation, "centroids.f32"), centroids.astype("<f4"))
+            self._assign_rows(assign_path, centroids, 0, rows)
+
+            with self._lock, self._file_lock():
+                self._refresh()
+                # Rows committed while training
+                self._assign_rows(assign_path, centroids, rows, self._rows)
+
+                old_generation = self._meta.get("ivf")
+                self._meta.update({"ivf": generation, "ivf_trained_rows": len(live_rows)})
+                self._write_meta(self.path, self._meta)
+                self._refresh()
+                if old_generation:
+                    shutil.rmtree(self._path(old_generation), ignore_errors=True)
+
+        print(f"Trained IVF index of collection {self.name} in {time.time() - start_time:.1f}s")
+        return True
+
+    def build(self):
+        """(Re)train the IVF centroids or bring the HNSW graph up to date, then save."""
+        with self._lock:
+            self._refresh()
+            if self._live == 0:
+                raise ValidationError(f"Collection {self.name} is empty")
+
+        if self.index == "ivf":
+            if not self.train_ivf(force=True):
+                raise ValidationError(f"The IVF index of collection {self.name} is already being trained")
+        self.save()
+
+    def save(self):
+        """Checkpoint the record index and the HNSW graph so the next load only reads newer rows."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._rows:
+                self._save_checkpoint()
+            if self._hnsw is not None:
+                self._extend_hnsw()
+                self._save_hnsw()
+
+    def _save_hnsw(self):
+        tmp_path = self._path("hnsw.bin.tmp")
+        self._hnsw.save_index(tmp_path)
+        os.replace(tmp_path, self._path("hnsw.bin"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get collection statistics."""
+        with self._lock:
+            self._refresh()
+            vectors_bytes = 0
+            if os.path.exists(self._vectors_file):
+                vectors_bytes = os.path.getsize(self._vectors_file)
+            return {
+                "name": self.name,
+                "model": self.model,
+                "dtype": self.dtype,
+                "index": self.index,
+                "dimension": self.dim,
+                "count": self._live,
+                "rows": self._rows,
+                "vectors_bytes": vectors_bytes,
+                "ivf_lists": len(self._centroids) if self._centroids is not None else 0,
+                "ivf_trained_rows": self._meta.get("ivf_trained_rows") or 0,
+                "hnsw_rows": self._hnsw_rows if self._hnsw is not None else 0,
+                "searches": self.searches,
+                "upserts": self.upserts,
+                "created_at": self._meta.get("created_at")
+            }
@@ -0,0 +1,242 @@
+"""
+In-process vector collections embedded and searched in the same request.
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.registry import model_registry
+from ..core.vector_collection import VectorCollection, validate_collection_name
+from ..core.exceptions import EmbeddingError, ValidationError
+from .embedding_service import EmbeddingService
+
+
+# Texts per embedding call (the embedding service's request limit)
+_EMBED_BATCH_TEXTS = 100
+
+
+class CollectionManager:
+    """
+    Named vector collections stored under ``collections_dir``.
+
+    Each collection is bound to one embedding model at creation; upserts
+    embed the item texts and searches embed the query texts with that
+    model in the same request, so clients never handle vectors. Vectors
+    are stored and searched by ``VectorCollection``. Collections created
+    by another worker are opened on first use.
+    """
+
+    def __init__(self, collections_dir: Optional[str] = None):
+        self.collections_dir = collections_dir or settings.collections_dir
+        self._collections: Dict[str, VectorCollection] = {}
+        self._lock = threading.Lock()
+        self._training: Dict[str, asyncio.Task] = {}
+        self.embedding_service = EmbeddingService()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.collections_dir, validate_collection_name(name))
+
+    # ------------------------------------------------------------------
+    # Collection management
+    # ------------------------------------------------------------------
+
+    def create(self, name: str, model: Optional[str] = None, dtype: Optional[str] = None, index: str = "ivf") -> VectorCollection:
+        """
+        Create an empty collection.
+
+        Args:
+            name: Collection name
+            model: Registry embedding model name (None for the default model)
+            dtype: "float16" or "int8" vector storage (None for float16; ivf and flat only)
+            index: "ivf", "hnsw" or "flat"
+
+        Returns:
+            The created collection
+        """
+        model_name = model_registry.get("embedding", model).name
+        collection = VectorCollection.create(self._path(name), model_name, dtype, index)
+        with self._lock:
+            self._collections[name] = collection
+        print(f"Created {collection.dtype} {index} collection {name} (model: {model_name})")
+        return collection
+
+    def get(self, name: str) -> Optional[VectorCollection]:
+        """Get a collection by name, opening it from disk if needed."""
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is not None:
+                return collection
+
+            path = self._path(name)
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                return None
+            collection = VectorCollection(path)
+            self._collections[name] = collection
+            return collection
+
+    def list_collections(self) -> List[VectorCollection]:
+        """All collections on disk, by name."""
+        if not os.path.isdir(self.collections_dir):
+            return []
+        names = sorted(os.listdir(self.collections_dir))
+        return [collection for collection in map(self.get, names) if collection is not None]
+
+    def delete(self, name: str) -> bool:
+        """Delete a collection and its files."""
+        path = self._path(name)
+        with self._lock:
+            self._collections.pop(name, None)
+            if not os.path.isdir(path):
+                return False
+            shutil.rmtree(path)
+        print(f"Deleted collection {name}")
+        return True
+
+    def close(self):
+        """Checkpoint collections so the next start neither replays their logs nor rebuilds HNSW graphs."""
+        with self._lock:
+            collections = list(self._collections.values())
+        for collection in collections:
+            try:
+                collection.save()
+            except Exception as e:
+                print(f"Failed to save collection {collection.name}: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Embedding and search
+    # ------------------------------------------------------------------
+
+    async def _embed(self, collection: VectorCollection, texts: List[str]) -> np.ndarray:
+        """Embed texts with the collection's model, in batches the embedding service accepts."""
+        batches = []
+        for start in range(0, len(texts), _EMBED_BATCH_TEXTS):
+            result = await self.embedding_service.get_embeddings_async(
+                texts[start:start + _EMBED_BATCH_TEXTS], model=collection.model
+            )
+            batches.append(result["embeddings"])
+        return np.concatenate(batches) if len(batches) > 1 else batches[0]
+
+    async def upsert_async(self, collection: VectorCollection, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Embed and store items, replacing items with the same id.
+
+        Args:
+            collection: Target collection
+            items: Dicts with ``id``, ``text`` and optional ``metadata``
+
+        Returns:
+            Dictionary with the upserted count, collection size and timing
+        """
+        start_time = time.time()
+        vectors = await self._embed(collection, [item["text"] for item in items])
+
+        try:
+            rows = await asyncio.to_thread(
+                collection.upsert,
+                [item["id"] for item in items],
+                vectors,
+                [item.get("metadata") for item in items]
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise EmbeddingError(f"Upsert into collection {collection.name} failed: {str(e)}")
+
+        if collection.needs_training():
+            self._schedule_training(collection)
+
+        processing_time = time.time() - start_time
+        print(f"Upserted {len(items)} items into collection {collection.name} (time: {processing_time:.3f}s)")
+        return {
+            "upserted": len(items),
+            "rows": rows,
+            "processing_time": processing_time
+        }
+
+    def _schedule_training(self, collection: VectorCollection):
+        """Train a collection's IVF index in the background, once at a time."""
+        task = self._training.get(collection.name)
+        if task is None or task.done():
+            self._training[collection.name] = asyncio.get_running_loop().create_task(self._train(collection))
+
+    async def _train(self, collection: VectorCollection):
+        """Background IVF training; failures are logged, searches keep scanning."""
+        try:
+            await asyncio.to_thread(collection.train_ivf)
+        except Exception as e:
+            print(f"Failed to train IVF index of collection {collection.name}: {str(e)}")
+
+    async def search_async(
+        self,
+        collection: VectorCollection,
+        queries: List[str],
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef: Optional[int] = None,
+        include_metadata: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Embed query texts and return the nearest items of a collection.
+
+        Args:
+            collection: Collection to search
+            queries: Query texts
+            top_k: Results per query
+            nprobe: Inverted lists scanned per query (IVF collections)
+            ef: Candidate list size (HNSW collections)
+            include_metadata: Return each item's stored metadata
+
+        Returns:
+            Dictionary with per-query results (id, score, metadata) and timing
+        """
+        start_time = time.time()
+        vectors = await self._embed(collection, queries)
+
+        try:
+            matches = await asyncio.to_thread(collection.search, vectors, top_k, nprobe, ef)
+            rows = [row for query_matches in matches for row, _ in query_matches]
+            records = await asyncio.to_thread(collection.get_records, rows)
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise EmbeddingError(f"Search in collection {collection.name} failed: {str(e)}")
+
+        results, position = [], 0
+        for query_matches in matches:
+            query_results = []
+            for _, score in query_matches:
+                record = records[position]
+                position += 1
+                query_results.append({
+                    "id": record["id"],
+                    "score": score,
+                    "metadata": record.get("metadata") if include_metadata else None
+                })
+            results.append(query_results)
+
+        processing_time = time.time() - start_time
+        print(f"Searched collection {collection.name} for {len(queries)} queries (time: {processing_time:.3f}s)")
+        return {
+            "results": results,
+            "processing_time": processing_time
+        }
+
+    async def build_async(self, collection: VectorCollection) -> Dict[str, Any]:
+        """Retrain or save a collection's index off the event loop."""
+        start_time = time.time()
+        await asyncio.to_thread(collection.build)
+        return {
+            "processing_time": time.time() - start_time,
+            **await asyncio.to_thread(collection.get_stats)
+        }
+
+
+# Global instance
+collection_manager = CollectionManager()
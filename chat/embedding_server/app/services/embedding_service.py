@@ -2,10 +2,101 @@
 Embedding service for business logic.
 """
 
+import asyncio
+import json
 import time
-from typing import List, Dict, Any
-from ..core.embedding_model import embedding_model
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import numpy as np
+from ..core.config import settings
+from ..core.models import model_config
+from ..core.batching import DynamicBatcher
+from ..core.cache import EmbeddingCache
+from ..core.disk_cache import DiskEmbeddingStore
+from ..core.executor import inference_executor
+from ..core.embedding_model import EmbeddingModel, embedding_model
+from ..core.m3_heads import M3_OUTPUTS
+from ..core.registry import model_registry
 from ..core.exceptions import EmbeddingError, ValidationError
+from ..utils.encoding import encode_embeddings, to_array
+from ..utils.quantization import quantize
+
+
+def _create_batcher(model: EmbeddingModel) -> DynamicBatcher:
+    """Micro-batcher coalescing concurrent embedding requests for one model."""
+    return DynamicBatcher(
+        forward=model.get_embeddings,
+        max_batch_size=settings.batch_size,
+        max_wait_ms=settings.batch_max_wait_ms,
+        name="embedding" if model is embedding_model else f"embedding:{model.name}"
+    )
+
+
+# Shared micro-batcher of the default model
+embedding_batcher = _create_batcher(embedding_model)
+
+# Micro-batchers by model name, created on first use
+embedding_batchers: Dict[str, DynamicBatcher] = {embedding_model.name: embedding_batcher}
+
+# Shared in-process cache of embedding vectors
+embedding_cache = (
+    EmbeddingCache(settings.embedding_cache_max_bytes)
+    if model_config.use_cache and settings.embedding_cache_max_bytes > 0
+    else None
+)
+
+# Persistent embedding store shared by the workers on this host
+embedding_store = (
+    DiskEmbeddingStore(
+        root=model_config.cache_dir,
+        model_id=embedding_model.model_id,
+        max_bytes=settings.embedding_disk_cache_max_bytes
+    )
+    if embedding_cache is not None and model_config.cache_dir
+    else None
+)
+
+# Persistent stores by model name, created on first use
+embedding_stores: Dict[str, Optional[DiskEmbeddingStore]] = {embedding_model.name: embedding_store}
+
+
+def get_embedding_batcher(model: EmbeddingModel) -> DynamicBatcher:
+    """Micro-batcher of a registry model."""
+    batcher = embedding_batchers.get(model.name)
+    if batcher is None:
+        batcher = embedding_batchers.setdefault(model.name, _create_batcher(model))
+    return batcher
+
+
+def _drop_batcher(kind: str, model: EmbeddingModel):
+    """Discard an evicted model's micro-batcher; it is recreated on next use."""
+    if kind == "embedding":
+        batcher = embedding_batchers.pop(model.name, None)
+        if batcher is not None:
+            batcher.close()
+
+
+model_registry.add_eviction_listener(_drop_batcher)
+
+
+def get_embedding_store(model: EmbeddingModel) -> Optional[DiskEmbeddingStore]:
+    """
+    Persistent store of a registry model (None when disk caching is off).
+    
+    The store is reopened when the model's identifier changes, e.g. once
+    loading settles the effective precision.
+    """
+    store = embedding_stores.get(model.name)
+    if model.name not in embedding_stores or (store is not None and store.model_id != model.model_id):
+        embedding_stores[model.name] = (
+            DiskEmbeddingStore(
+                root=model_config.cache_dir,
+                model_id=model.model_id,
+                max_bytes=settings.embedding_disk_cache_max_bytes
+            )
+            if embedding_store is not None
+            else None
+        )
+    return embedding_stores[model.name]
 
 
 class EmbeddingService:
@@ -13,8 +104,11 @@ class EmbeddingService:
     
     def __init__(self):
         self.model = embedding_model
+        self.batcher = embedding_batcher
+        self.cache = embedding_cache
+        self.store = embedding_store
     
-    def validate_text(self, text: str) -> bool:
+    def validate_text(self, text: str, max_length: int = 10000) -> bool:
         """Validate input text."""
         if not text or not isinstance(text, str):
             return False
@@ -22,12 +116,12 @@ class EmbeddingService:
         if len(text.strip()) == 0:
             return False
         
-        if len(text) > 10000:  # Max length limit
+        if len(text) > max_length:  # Max length limit
             return False
         
         return True
     
-    def validate_texts(self, texts: List[str]) -> bool:
+    def validate_texts(self, texts: List[str], max_length: int = 10000) -> bool:
         """Validate list of texts."""
         if not texts or not isinstance(texts, list):
             return False
@@ -36,22 +130,75 @@ class EmbeddingService:
             return False
         
         for text in texts:
-            if not self.validate_text(text):
+            if not self.validate_text(text, max_length):
                 return False
         
         return True
     
-    def get_embedding(self, text: str) -> Dict[str, Any]:
+    async def _resolve_model(self, model: Optional[str]) -> EmbeddingModel:
+        """Registry model for a request, loaded on demand; unknown names raise ValidationError."""
+        try:
+            return await model_registry.acquire_async("embedding", model)
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise EmbeddingError(f"Failed to load embedding model {model}: {str(e)}")
+    
+    async def _embed(self, texts: List[str], model: EmbeddingModel) -> np.ndarray:
+        """Embed texts as a float32 array, serving repeated texts from the cache."""
+        if self.cache is None:
+            return await self._compute(texts, model)
+        
+        store = get_embedding_store(model)
+        keys, vectors, misses = self.cache.lookup(model.model_id, texts)
+        
+        if misses and store is not None:
+            # Second level: vectors persisted by this or another worker
+            stored = await asyncio.to_thread(store.get_many, [keys[i] for i in misses])
+            for i, vector in zip(misses, stored):
+                if vector is not None:
+                    vectors[i] = vector
+                    self.cache.put(keys[i], vector)
+            misses = [i for i in misses if vectors[i] is None]
+        
+        if misses:
+            # Encode each distinct missing text once
+            unique_misses = {}
+            for i in misses:
+                unique_misses.setdefault(keys[i], texts[i])
+            
+            computed = await self._compute(list(unique_misses.values()), model)
+            fresh = dict(zip(unique_misses.keys(), computed))
+            for key, embedding in fresh.items():
+                self.cache.put(key, embedding)
+            for i in misses:
+                vectors[i] = fresh[keys[i]]
+            
+            if store is not None:
+                await asyncio.to_thread(store.put_many, list(fresh.keys()), list(fresh.values()))
+        
+        return np.stack(vectors)
+    
+    async def _compute(self, texts: List[str], model: EmbeddingModel) -> np.ndarray:
+        """Embed texts through the model's shared micro-batcher."""
+        if settings.enable_dynamic_batching:
+            return np.stack(await get_embedding_batcher(model).submit(texts))
+        
+        return await inference_executor.run(model.get_embeddings, texts)
+    
+    async def get_embedding_async(self, text: str, model: Optional[str] = None) -> Dict[str, Any]:
         """
-        Generate embedding for a single text.
+        Generate embedding for a single text, batched with concurrent requests.
         
         Args:
             text: Input text to embed
+            model: Registry model name (None for the default model)
             
         Returns:
             Dictionary containing embedding and metadata
         """
         start_time = time.time()
+        embedder = await self._resolve_model(model)
         
         try:
             # Validate input
@@ -59,7 +206,7 @@ class EmbeddingService:
                 raise ValidationError("Invalid input text")
             
             # Generate embedding
-            embedding = self.model.get_embedding(text)
+            embedding = (await self._embed([text], embedder))[0]
             
             # Calculate processing time
             processing_time = time.time() - start_time
@@ -71,25 +218,31 @@ class EmbeddingService:
                 "text_length": len(text),
                 "embedding_dimension": len(embedding),
                 "processing_time": processing_time,
-                "model_info": self.model.get_model_info()
+                "model_info": embedder.get_model_info()
             }
             
+        except ValidationError:
+            raise
         except Exception as e:
             processing_time = time.time() - start_time
             print(f"Failed to generate embedding: {str(e)} (time: {processing_time:.3f}s)")
             raise EmbeddingError(f"Embedding generation failed: {str(e)}")
+        finally:
+            model_registry.release("embedding", embedder)
     
-    def get_embeddings(self, texts: List[str]) -> Dict[str, Any]:
+    async def get_embeddings_async(self, texts: List[str], model: Optional[str] = None) -> Dict[str, Any]:
         """
-        Generate embeddings for multiple texts.
+        Generate embeddings for multiple texts, batched with concurrent requests.
         
         Args:
             texts: List of input texts to embed
+            model: Registry model name (None for the default model)
             
         Returns:
             Dictionary containing embeddings and metadata
         """
         start_time = time.time()
+        embedder = await self._resolve_model(model)
         
         try:
             # Validate input
@@ -97,7 +250,7 @@ class EmbeddingService:
                 raise ValidationError("Invalid input texts")
             
             # Generate embeddings
-            embeddings = self.model.get_embeddings(texts)
+            embeddings = await self._embed(texts, embedder)
             
             # Calculate processing time
             processing_time = time.time() - start_time
@@ -107,20 +260,353 @@ class EmbeddingService:
             return {
                 "embeddings": embeddings,
                 "text_count": len(texts),
-                "embedding_dimension": len(embeddings[0]) if embeddings else 0,
+                "embedding_dimension": embeddings.shape[1] if len(embeddings) else 0,
                 "processing_time": processing_time,
-                "model_info": self.model.get_model_info()
+                "model_info": embedder.get_model_info()
             }
             
+        except ValidationError:
+            raise
         except Exception as e:
             processing_time = time.time() - start_time
             print(f"Failed to generate embeddings: {str(e)} (time: {processing_time:.3f}s)")
             raise EmbeddingError(f"Embeddings generation failed: {str(e)}")
+        finally:
+            model_registry.release("embedding", embedder)
+    
+    async def get_long_embeddings_async(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        window_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        pooling: str = "mean",
+        return_windows: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Embed texts longer than the model's max_length via sliding token windows.
+        
+        All windows of all texts are embedded together as one packed batch
+        (length-bucketed and cached like ordinary texts), then pooled back
+        into one vector per text.
+        
+        Args:
+            texts: List of input texts
+            model: Registry model name (None for the default model)
+            window_tokens: Tokens per window (defaults to the model's limit)
+            overlap_tokens: Tokens shared by consecutive windows
+            pooling: "mean" (token-weighted) or "max"
+            return_windows: Also return each window's span and vector
+            
+        Returns:
+            Dictionary containing pooled embeddings, window counts,
+            optional windows and metadata
+        """
+        start_time = time.time()
+        embedder = await self._resolve_model(model)
+        
+        if overlap_tokens is None:
+            overlap_tokens = settings.long_text_overlap_tokens
+        
+        try:
+            # Validate input
+            if not self.validate_texts(texts, settings.long_text_max_chars):
+                raise ValidationError("Invalid input texts")
+            
+            if window_tokens is not None and overlap_tokens >= window_tokens:
+                raise ValidationError("overlap_tokens must be smaller than window_tokens")
+            
+            # Tokenize once to find the window boundaries
+            text_windows = await asyncio.to_thread(
+                embedder.split_windows, texts, window_tokens, overlap_tokens
+            )
+            window_count = sum(len(windows) for windows in text_windows)
+            if window_count > settings.long_text_max_windows:
+                raise ValidationError(
+                    f"Input needs {window_count} windows (max {settings.long_text_max_windows})"
+                )
+            
+            # Embed every window of every text in one packed batch
+            window_texts = [
+                text[start:end]
+                for text, windows in zip(texts, text_windows)
+                for start, end, _ in windows
+            ]
+            vectors = await self._embed(window_texts, embedder)
+            
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            windows_out = [] if return_windows else None
+            offset = 0
+            for i, windows in enumerate(text_windows):
+                text_vectors = vectors[offset:offset + len(windows)]
+                offset += len(windows)
+                if len(windows) == 1:
+                    embeddings[i] = text_vectors[0]
+                else:
+                    embeddings[i] = embedder.pool_windows(
+                        text_vectors, [tokens for _, _, tokens in windows], pooling
+                    )
+                if windows_out is not None:
+                    windows_out.append([
+                        {"start": start, "end": end, "tokens": tokens, "embedding": vector}
+                        for (start, end, tokens), vector in zip(windows, text_vectors)
+                    ])
+            
+            # Calculate processing time
+            processing_time = time.time() - start_time
+            
+            print(
+                f"Generated long-text embeddings for {len(texts)} texts "
+                f"({window_count} windows, time: {processing_time:.3f}s)"
+            )
+            
+            return {
+                "embeddings": embeddings,
+                "windows": windows_out,
+                "window_counts": [len(windows) for windows in text_windows],
+                "text_count": len(texts),
+                "embedding_dimension": embeddings.shape[1],
+                "pooling": pooling,
+                "processing_time": processing_time,
+                "model_info": embedder.get_model_info()
+            }
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            processing_time = time.time() - start_time
+            print(f"Failed to generate long-text embeddings: {str(e)} (time: {processing_time:.3f}s)")
+            raise EmbeddingError(f"Long-text embedding generation failed: {str(e)}")
+        finally:
+            model_registry.release("embedding", embedder)
+    
+    async def get_multi_embeddings_async(
+        self,
+        texts: List[str],
+        outputs: List[str],
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate dense, sparse and/or multi-vector outputs in one encoder pass.
+        
+        Args:
+            texts: List of input texts
+            outputs: Subset of "dense", "sparse" and "colbert"
+            model: Registry model name (None for the default model)
+            
+        Returns:
+            Dictionary with one per-text list per requested output and metadata
+        """
+        start_time = time.time()
+        embedder = await self._resolve_model(model)
+        
+        try:
+            # Validate input
+            if not self.validate_texts(texts):
+                raise ValidationError("Invalid input texts")
+            
+            outputs = list(dict.fromkeys(outputs))
+            if not outputs or any(output not in M3_OUTPUTS for output in outputs):
+                raise ValidationError(f"outputs must be a non-empty subset of {', '.join(M3_OUTPUTS)}")
+            
+            results = await inference_executor.run(embedder.get_multi_embeddings, texts, outputs)
+            
+            # Calculate processing time
+            processing_time = time.time() - start_time
+            
+            print(
+                f"Generated {'/'.join(outputs)} embeddings for {len(texts)} texts "
+                f"(time: {processing_time:.3f}s)"
+            )
+            
+            return {
+                **results,
+                "outputs": outputs,
+                "text_count": len(texts),
+                "processing_time": processing_time,
+                "model_info": embedder.get_model_info()
+            }
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            processing_time = time.time() - start_time
+            print(f"Failed to generate multi embeddings: {str(e)} (time: {processing_time:.3f}s)")
+            raise EmbeddingError(f"Multi embedding generation failed: {str(e)}")
+        finally:
+            model_registry.release("embedding", embedder)
+    
+    def _parse_stream_line(self, line: bytes, index: int) -> Tuple[Any, Optional[str], Optional[str]]:
+        """
+        Parse one NDJSON input line.
+        
+        Lines are either a JSON string or an object with ``text`` and an
+        optional ``id``.
+        
+        Returns:
+            Tuple of (id, text, error message)
+        """
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            return None, None, f"Invalid JSON: {str(e)}"
+        
+        if isinstance(record, str):
+            record_id, text = index, record
+        elif isinstance(record, dict):
+            record_id, text = record.get("id", index), record.get("text")
+        else:
+            return None, None, "Expected a JSON string or object"
+        
+        if not self.validate_text(text):
+            return record_id, None, "Invalid input text"
+        return record_id, text, None
+    
+    def _encode_stream_batch(
+        self,
+        ids: List[Any],
+        indices: List[int],
+        embeddings: np.ndarray,
+        encoding_format: str,
+        dtype: str,
+        quantization: str
+    ) -> bytes:
+        """Encode one embedded batch as NDJSON output lines."""
+        if quantization == "none":
+            array, scales = to_array(embeddings, dtype), None
+        else:
+            array, scales = quantize(to_array(embeddings), quantization)
+        encoded = encode_embeddings(array, encoding_format)
+        
+        lines = []
+        for position, (record_id, index) in enumerate(zip(ids, indices)):
+            record = {"index": index, "id": record_id, "embedding": encoded[position]}
+            if scales is not None:
+                record["scale"] = float(scales[position])
+            lines.append(json.dumps(record, ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+    
+    async def stream_embeddings(
+        self,
+        chunks: AsyncIterator[bytes],
+        encoding_format: str = "float",
+        dtype: str = "float32",
+        quantization: str = "none",
+        max_line_bytes: int = 1024 * 1024,
+        model: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Embed an NDJSON stream of texts, yielding NDJSON results as they are computed.
+        
+        Input is consumed only as fast as output is written, and at most one
+        batch is embedded while the next one is being read, so memory stays
+        constant regardless of input size.
+        
+        Args:
+            chunks: Request body chunks (NDJSON, one text per line)
+            encoding_format: "float" or "base64"
+            dtype: "float32" or "float16"
+            quantization: "none", "int8" or "binary"
+            max_line_bytes: Maximum size of a single input line
+            model: Registry model name (None for the default model)
+            
+        Yields:
+            NDJSON lines with ``index``, ``id`` and ``embedding`` (or
+            ``error``), followed by a final summary line
+        """
+        start_time = time.time()
+        batch_size = max(1, settings.batch_size)
+        
+        buffer = b""
+        index = 0
+        count = 0
+        errors = 0
+        batch_ids: List[Any] = []
+        batch_indices: List[int] = []
+        batch_texts: List[str] = []
+        in_flight: Optional[Tuple[asyncio.Task, List[Any], List[int]]] = None
+        embedder: Optional[EmbeddingModel] = None
+        
+        async def flush_in_flight() -> bytes:
+            task, ids, indices = in_flight
+            embeddings = await task
+            return self._encode_stream_batch(ids, indices, embeddings, encoding_format, dtype, quantization)
+        
+        async def lines() -> AsyncIterator[bytes]:
+            nonlocal buffer
+            async for chunk in chunks:
+                # Split each chunk once; only the unterminated tail is carried over
+                *complete, buffer = (buffer + chunk).split(b"\n")
+                for line in complete:
+                    yield line
+                if len(buffer) > max_line_bytes:
+                    raise ValidationError("Input line exceeds maximum size")
+            if buffer:
+                yield buffer
+                buffer = b""
+        
+        try:
+            embedder = await self._resolve_model(model)
+            
+            async for line in lines():
+                if not line.strip():
+                    continue
+                
+                record_id, text, error = self._parse_stream_line(line, index)
+                if error is not None:
+                    errors += 1
+                    yield (json.dumps({"index": index, "id": record_id, "error": error}) + "\n").encode("utf-8")
+                else:
+                    batch_ids.append(record_id)
+                    batch_indices.append(index)
+                    batch_texts.append(text)
+                index += 1
+                
+                if len(batch_texts) >= batch_size:
+                    # Embed this batch while the next one is read
+                    if in_flight is not None:
+                        yield await flush_in_flight()
+                    in_flight = (asyncio.ensure_future(self._embed(batch_texts, embedder)), batch_ids, batch_indices)
+                    count += len(batch_texts)
+                    batch_ids, batch_indices, batch_texts = [], [], []
+            
+            if in_flight is not None:
+                yield await flush_in_flight()
+                in_flight = None
+            if batch_texts:
+                embeddings = await self._embed(batch_texts, embedder)
+                count += len(batch_texts)
+                yield self._encode_stream_batch(
+                    batch_ids, batch_indices, embeddings, encoding_format, dtype, quantization
+                )
+            
+            processing_time = time.time() - start_time
+            print(f"Streamed embeddings for {count} texts (errors: {errors}, time: {processing_time:.3f}s)")
+            
+            yield (json.dumps({
+                "done": True,
+                "text_count": count,
+                "error_count": errors,
+                "processing_time": processing_time
+            }) + "\n").encode("utf-8")
+            
+        except Exception as e:
+            print(f"Failed to stream embeddings: {str(e)}")
+            yield (json.dumps({"done": False, "error": f"Streaming embedding failed: {str(e)}"}) + "\n").encode("utf-8")
+        finally:
+            if in_flight is not None and not in_flight[0].done():
+                in_flight[0].cancel()
+            if embedder is not None:
+                model_registry.release("embedding", embedder)
     
     def get_model_status(self) -> Dict[str, Any]:
         """Get current model status."""
         return {
             "is_loaded": self.model.is_loaded(),
             "model_info": self.model.get_model_info(),
+            "batching": self.batcher.get_stats(),
+            "cache": self.cache.get_stats() if self.cache is not None else None,
+            "disk_cache": get_embedding_store(self.model).get_stats() if self.store is not None else None,
+            "models": model_registry.get_stats()["models"]["embedding"],
             "service_status": "running"
         }
@@ -0,0 +1,457 @@
+"""
+Background bulk embedding jobs with resumable memory-mapped output.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from ..core.config import settings
+from ..core.admission import admission_controller
+from ..core.executor import inference_executor
+from ..core.registry import model_registry
+from ..core.exceptions import EmbeddingError, ValidationError
+
+
+class JobState(BaseModel):
+    """Persisted state of a bulk embedding job."""
+
+    job_id: str
+    status: str = "queued"  # queued, running, completed, failed, cancelled
+    input_path: str
+    input_format: str = "jsonl"  # jsonl or parquet
+    text_field: str = "text"
+    id_field: Optional[str] = "id"
+    batch_size: int = 32
+    model: Optional[str] = None  # registry model name, None for the default model
+    total_rows: Optional[int] = None
+    completed_rows: int = 0
+    skipped_rows: int = 0
+    embedding_dimension: Optional[int] = None
+    ids_offset: int = 0
+    output_dir: str
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+    finished_at: Optional[float] = None
+
+    @property
+    def embeddings_path(self) -> str:
+        return os.path.join(self.output_dir, "embeddings.npy")
+
+    @property
+    def ids_path(self) -> str:
+        return os.path.join(self.output_dir, "ids.jsonl")
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.output_dir, "state.json")
+
+    @property
+    def cancel_path(self) -> str:
+        return os.path.join(self.output_dir, "cancel")
+
+
+def _iter_jsonl(state: JobState) -> Iterator[Tuple[Any, Optional[str]]]:
+    """Yield (id, text) rows from a JSONL file."""
+    with open(state.input_path, "r", encoding="utf-8") as f:
+        for row, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield row, None
+                continue
+            if isinstance(record, str):
+                yield row, record
+            elif isinstance(record, dict):
+                record_id = record.get(state.id_field, row) if state.id_field else row
+                yield record_id, record.get(state.text_field)
+            else:
+                yield row, None
+
+
+def _iter_parquet(state: JobState) -> Iterator[Tuple[Any, Optional[str]]]:
+    """Yield (id, text) rows from a Parquet file."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValidationError("Parquet input requires the pyarrow package")
+
+    parquet_file = pq.ParquetFile(state.input_path)
+    columns = [state.text_field]
+    if state.id_field and state.id_field in parquet_file.schema_arrow.names:
+        columns.append(state.id_field)
+
+    row = 0
+    for batch in parquet_file.iter_batches(batch_size=state.batch_size, columns=columns):
+        data = batch.to_pydict()
+        texts = data[state.text_field]
+        ids = data.get(state.id_field) if state.id_field else None
+        for i, text in enumerate(texts):
+            yield (ids[i] if ids is not None else row), text
+            row += 1
+
+
+def _count_rows(state: JobState) -> int:
+    """Count input rows without loading the file."""
+    if state.input_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValidationError("Parquet input requires the pyarrow package")
+        return pq.ParquetFile(state.input_path).metadata.num_rows
+
+    count = 0
+    with open(state.input_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return count
+
+
+class JobManager:
+    """
+    Run bulk embedding jobs in the background at low priority.
+
+    Jobs read texts from a local JSONL or Parquet file and write vectors
+    into a memory-mapped ``embeddings.npy`` plus an ``ids.jsonl`` id
+    column; rows ``[0, completed_rows)`` are valid and aligned with the
+    ids (rows without usable text are skipped). Progress is checkpointed
+    after every batch, so a job interrupted by a crash resumes from its
+    last completed batch on the next start. Each batch is embedded in
+    forwards of ``job_forward_batch_size`` texts, and before each forward
+    the worker yields to interactive traffic until the admission queue is
+    empty, so a request waits for at most one small forward.
+
+    A job runs in the worker that accepted it, but its state lives in
+    ``jobs_dir``: any worker reads progress from ``state.json`` and cancels
+    by creating a ``cancel`` marker the running worker checks before every
+    batch.
+    """
+
+    def __init__(self, jobs_dir: Optional[str] = None):
+        self.jobs_dir = jobs_dir or settings.jobs_dir
+        self._jobs: Dict[str, JobState] = {}
+        self._queue: Deque[str] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _save(self, state: JobState):
+        """Atomically persist job state."""
+        state.updated_at = time.time()
+        tmp_path = state.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(state.model_dump_json())
+        os.replace(tmp_path, state.state_path)
+
+    def recover(self) -> int:
+        """
+        Load persisted jobs and requeue unfinished ones.
+
+        Returns:
+            Number of jobs requeued
+        """
+        if not os.path.isdir(self.jobs_dir):
+            return 0
+
+        requeued = 0
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            state_path = os.path.join(self.jobs_dir, job_id, "state.json")
+            try:
+                with open(state_path, "r", encoding="utf-8") as f:
+                    state = JobState.model_validate_json(f.read())
+            except (OSError, ValueError):
+                continue
+
+            self._jobs[state.job_id] = state
+            if state.status in ("queued", "running"):
+                state.status = "queued"
+                self._queue.append(state.job_id)
+                requeued += 1
+        return requeued
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        input_path: str,
+        input_format: str = "jsonl",
+        text_field: str = "text",
+        id_field: Optional[str] = "id",
+        batch_size: Optional[int] = None,
+        model: Optional[str] = None
+    ) -> JobState:
+        """
+        Create a job and queue it for the background worker.
+
+        Args:
+            input_path: Local path of the JSONL or Parquet input
+            input_format: "jsonl" or "parquet"
+            text_field: Field holding the text
+            id_field: Field holding the record id (row number if missing)
+            batch_size: Texts per batch (defaults to settings.batch_size)
+            model: Registry model name (None for the default model)
+
+        Returns:
+            The created job state
+        """
+        if input_format not in ("jsonl", "parquet"):
+            raise ValidationError(f"Unsupported input format: {input_format}")
+        if not os.path.isfile(input_path):
+            raise ValidationError(f"Input file does not exist: {input_path}")
+        model_registry.get("embedding", model)
+
+        job_id = uuid.uuid4().hex
+        output_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(output_dir, exist_ok=True)
+
+        now = time.time()
+        state = JobState(
+            job_id=job_id,
+            input_path=os.path.abspath(input_path),
+            input_format=input_format,
+            text_field=text_field,
+            id_field=id_field,
+            batch_size=max(1, batch_size or settings.batch_size),
+            model=model,
+            output_dir=output_dir,
+            created_at=now,
+            updated_at=now
+        )
+        self._save(state)
+
+        self._jobs[job_id] = state
+        self._queue.append(job_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return state
+
+    def get(self, job_id: str) -> Optional[JobState]:
+        """Get a job by id, falling back to state persisted by another worker."""
+        state = self._jobs.get(job_id)
+        if state is not None:
+            return state
+
+        state_path = os.path.join(self.jobs_dir, os.path.basename(job_id), "state.json")
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                return JobState.model_validate_json(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def list_jobs(self) -> List[JobState]:
+        """List the jobs of all workers, newest first."""
+        job_ids = set(self._jobs)
+        if os.path.isdir(self.jobs_dir):
+            job_ids.update(os.listdir(self.jobs_dir))
+        states = [state for state in map(self.get, job_ids) if state is not None]
+        return sorted(states, key=lambda state: state.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[JobState]:
+        """Cancel a queued or running job, whichever worker runs it."""
+        state = self.get(job_id)
+        if state is None:
+            return None
+        if state.status in ("queued", "running"):
+            if job_id in self._queue:
+                self._queue.remove(job_id)
+                state.status = "cancelled"
+                state.finished_at = time.time()
+                self._save(state)
+            else:
+                # Picked up by the worker running the job before its next batch
+                open(state.cancel_path, "a").close()
+        return state
+
+    def describe(self, state: JobState) -> Dict[str, Any]:
+        """Job state with derived progress fields."""
+        info = state.model_dump()
+        info["progress"] = (
+            (state.completed_rows + state.skipped_rows) / state.total_rows
+            if state.total_rows else 0.0
+        )
+        info["embeddings_path"] = state.embeddings_path
+        info["ids_path"] = state.ids_path
+        return info
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background worker on the running loop."""
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background worker; running jobs resume on next start."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _run(self):
+        """Process queued jobs one at a time."""
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            state = self._jobs[self._queue.popleft()]
+            try:
+                await self._process(state)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Embedding job {state.job_id} failed: {str(e)}")
+                state.status = "failed"
+                state.error = str(e)
+                state.finished_at = time.time()
+                await asyncio.to_thread(self._save, state)
+
+    async def _yield_to_interactive(self):
+        """Wait while interactive requests are queued for admission."""
+        while True:
+            stats = admission_controller.get_stats()
+            if stats["queue_depth"] == 0 and stats["active"] < stats["max_concurrent_requests"]:
+                return
+            await asyncio.sleep(settings.job_idle_wait_ms / 1000.0)
+
+    async def _process(self, state: JobState):
+        """Run a job from its last checkpoint to completion."""
+        state.status = "running"
+        if state.total_rows is None:
+            state.total_rows = await asyncio.to_thread(_count_rows, state)
+        await asyncio.to_thread(self._save, state)
+
+        # Drop id lines written after the last checkpoint
+        if os.path.exists(state.ids_path):
+            with open(state.ids_path, "r+b") as f:
+                f.truncate(state.ids_offset)
+
+        reader = _iter_parquet(state) if state.input_format == "parquet" else _iter_jsonl(state)
+        rows_seen = 0
+        resume_from = state.completed_rows + state.skipped_rows
+        embeddings: Optional[np.ndarray] = None
+
+        def next_batch() -> List[Tuple[Any, Optional[str]]]:
+            nonlocal rows_seen
+            batch = []
+            for record in reader:
+                rows_seen += 1
+                if rows_seen <= resume_from:
+                    continue
+                batch.append(record)
+                if len(batch) >= state.batch_size:
+                    break
+            return batch
+
+        while True:
+            if os.path.exists(state.cancel_path):
+                state.status = "cancelled"
+                state.finished_at = time.time()
+                await asyncio.to_thread(self._save, state)
+                return
+
+            batch = await asyncio.to_thread(next_batch)
+            if not batch:
+                break
+
+            valid = [(record_id, text) for record_id, text in batch if isinstance(text, str) and text.strip()]
+            state.skipped_rows += len(batch) - len(valid)
+            if not valid:
+                await asyncio.to_thread(self._save, state)
+                continue
+
+            texts = [text for _, text in valid]
+            forward_size = max(1, settings.job_forward_batch_size)
+            vectors = []
+            for start in range(0, len(texts), forward_size):
+                await self._yield_to_interactive()
+                # Hold the model per forward so a long job does not pin it
+                async with model_registry.lease_async("embedding", state.model) as embedder:
+                    vectors.append(await inference_executor.run(
+                        embedder.get_embeddings, texts[start:start + forward_size]
+                    ))
+            array = np.concatenate(vectors).astype(np.float32, copy=False)
+
+            if embeddings is None:
+                embeddings = await asyncio.to_thread(self._open_output, state, array.shape[1])
+
+            await asyncio.to_thread(self._write_batch, state, embeddings, valid, array)
+
+        state.status = "completed"
+        state.finished_at = time.time()
+        await asyncio.to_thread(self._save, state)
+        print(f"Embedding job {state.job_id} completed ({state.completed_rows} rows)")
+
+    def _open_output(self, state: JobState, dimension: int) -> np.ndarray:
+        """Create or reopen the memory-mapped output array."""
+        if state.embedding_dimension is not None and os.path.exists(state.embeddings_path):
+            if state.embedding_dimension != dimension:
+                raise EmbeddingError("Embedding dimension changed while resuming job")
+            return np.lib.format.open_memmap(state.embeddings_path, mode="r+")
+
+        state.embedding_dimension = dimension
+        return np.lib.format.open_memmap(
+            state.embeddings_path,
+            mode="w+",
+            dtype=np.float32,
+            shape=(state.total_rows, dimension)
+        )
+
+    def _write_batch(
+        self,
+        state: JobState,
+        embeddings: np.ndarray,
+        records: List[Tuple[Any, str]],
+        array: np.ndarray
+    ):
+        """Write one batch and checkpoint the job."""
+        start = state.completed_rows
+        embeddings[start:start + len(array)] = array
+        embeddings.flush()
+
+        with open(state.ids_path, "ab") as f:
+            for record_id, _ in records:
+                f.write((json.dumps(record_id, ensure_ascii=False) + "\n").encode("utf-8"))
+            state.ids_offset = f.tell()
+
+        state.completed_rows += len(array)
+        self._save(state)
+
+    def get_stats(self) -> dict:
+        """Get job queue statistics."""
+        statuses: Dict[str, int] = {}
+        for state in self._jobs.values():
+            statuses[state.status] = statuses.get(state.status, 0) + 1
+        return {
+            "jobs_dir": self.jobs_dir,
+            "queued": len(self._queue),
+            "jobs": statuses
+        }
+
+
+# Global instance
+job_manager = JobManager()
@@ -2,17 +2,72 @@
 Rerank service for business logic.
 """
 
+import asyncio
 import time
-from typing import List, Dict, Any, Optional
-from ..core.rerank_model import rerank_model
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from ..core.config import settings
+from ..core.models import model_config
+from ..core.batching import DynamicBatcher
+from ..core.cache import ScoreCache
+from ..core.executor import inference_executor
+from ..core.registry import model_registry
+from ..core.rerank_model import RerankModel, rerank_model
 from ..core.exceptions import RerankError, ValidationError
 
 
+def _create_batcher(model: RerankModel) -> DynamicBatcher:
+    """Scheduler merging (query, document) pairs across concurrent requests for one model."""
+    return DynamicBatcher(
+        forward=model.score_pairs,
+        max_batch_size=settings.rerank_max_batch_pairs,
+        max_wait_ms=settings.batch_max_wait_ms,
+        name="rerank" if model is rerank_model else f"rerank:{model.name}",
+        cost=model.estimate_pair_tokens,
+        max_batch_cost=settings.rerank_max_batch_tokens
+    )
+
+
+# Shared scheduler of the default model
+rerank_batcher = _create_batcher(rerank_model)
+
+# Schedulers by model name, created on first use
+rerank_batchers: Dict[str, DynamicBatcher] = {rerank_model.name: rerank_batcher}
+
+# Shared cache of (query, document) scores
+rerank_cache = (
+    ScoreCache(settings.rerank_cache_max_bytes, settings.rerank_cache_ttl_seconds)
+    if model_config.use_cache and settings.rerank_cache_max_bytes > 0
+    else None
+)
+
+
+def get_rerank_batcher(model: RerankModel) -> DynamicBatcher:
+    """Scheduler of a registry model."""
+    batcher = rerank_batchers.get(model.name)
+    if batcher is None:
+        batcher = rerank_batchers.setdefault(model.name, _create_batcher(model))
+    return batcher
+
+
+def _drop_batcher(kind: str, model: RerankModel):
+    """Discard an evicted model's scheduler; it is recreated on next use."""
+    if kind == "rerank":
+        batcher = rerank_batchers.pop(model.name, None)
+        if batcher is not None:
+            batcher.close()
+
+
+model_registry.add_eviction_listener(_drop_batcher)
+
+
 class RerankService:
     """Service class for reranking operations."""
     
     def __init__(self):
         self.model = rerank_model
+        self.batcher = rerank_batcher
+        self.cache = rerank_cache
     
     def validate_query(self, query: str) -> bool:
         """Validate input query."""
@@ -60,24 +115,95 @@ class RerankService:
         
         return True
     
-    def rerank_documents(
+    def _format_results(
+        self,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        documents: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Build result dictionaries straight from ranked index and score arrays."""
+        return [
+            {
+                "document_index": doc_idx,
+                "document": documents[doc_idx],
+                "relevance_score": score,
+                "rank": rank
+            }
+            for rank, (doc_idx, score) in enumerate(zip(indices.tolist(), scores.tolist()), start=1)
+        ]
+    
+    async def _resolve_model(self, model: Optional[str]) -> RerankModel:
+        """Registry model for a request, loaded on demand; unknown names raise ValidationError."""
+        try:
+            return await model_registry.acquire_async("rerank", model)
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise RerankError(f"Failed to load rerank model {model}: {str(e)}")
+    
+    async def _score(self, pairs: List[Tuple[str, str]], model: RerankModel) -> Tuple[np.ndarray, int]:
+        """
+        Score pairs, sending only uncached pairs to the model.
+        
+        Returns:
+            Tuple of (float32 score per pair, number of cache hits)
+        """
+        if self.cache is None:
+            return await self._compute(pairs, model), 0
+        
+        keys, cached, misses = self.cache.lookup(model.model_id, pairs)
+        scores = np.array([0.0 if score is None else score for score in cached], dtype=np.float32)
+        
+        if misses:
+            # Score each distinct missing pair once
+            unique_misses = {}
+            for i in misses:
+                unique_misses.setdefault(keys[i], pairs[i])
+            
+            computed = await self._compute(list(unique_misses.values()), model)
+            self.cache.put_many(list(unique_misses.keys()), computed)
+            positions = {key: position for position, key in enumerate(unique_misses)}
+            scores[misses] = computed[[positions[keys[i]] for i in misses]]
+        
+        return scores, len(pairs) - len(misses)
+    
+    async def _compute(self, pairs: List[Tuple[str, str]], model: RerankModel) -> np.ndarray:
+        """Score pairs through the model's shared rerank scheduler."""
+        if not settings.enable_dynamic_batching:
+            return await inference_executor.run(model.score_pairs, pairs)
+        
+        # Submit in length order so consecutive scheduler batches pad little
+        order = np.array(
+            sorted(range(len(pairs)), key=lambda i: model.estimate_pair_tokens(pairs[i])),
+            dtype=np.int64
+        )
+        sorted_scores = await get_rerank_batcher(model).submit([pairs[i] for i in order])
+        
+        scores = np.empty(len(pairs), dtype=np.float32)
+        scores[order] = sorted_scores
+        return scores
+    
+    async def rerank_documents_async(
         self, 
         query: str, 
         documents: List[str],
-        top_k: Optional[int] = None
+        top_k: Optional[int] = None,
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Rerank documents based on query relevance.
+        Rerank documents, sharing forward passes with concurrent requests.
         
         Args:
             query: Search query
             documents: List of documents to rerank
             top_k: Number of top results to return
+            model: Registry model name (None for the default model)
             
         Returns:
             Dictionary containing reranked results and metadata
         """
         start_time = time.time()
+        reranker = await self._resolve_model(model)
         
         try:
             # Validate inputs
@@ -91,55 +217,58 @@ class RerankService:
                 raise ValidationError("Invalid top_k parameter")
             
             # Perform reranking
-            reranked_results = self.model.rerank(query, documents, top_k)
+            scores, cache_hits = await self._score([(query, doc) for doc in documents], reranker)
+            indices, top_scores = reranker.rank_scores(scores, top_k)
             
             # Calculate processing time
             processing_time = time.time() - start_time
             
-            # Format results
-            formatted_results = []
-            for doc_idx, score in reranked_results:
-                formatted_results.append({
-                    "document_index": doc_idx,
-                    "document": documents[doc_idx],
-                    "relevance_score": float(score),
-                    "rank": len(formatted_results) + 1
-                })
-            
             print(f"Reranked {len(documents)} documents for query (time: {processing_time:.3f}s)")
             
             return {
                 "query": query,
                 "total_documents": len(documents),
-                "results": formatted_results,
+                "results": self._format_results(indices, top_scores, documents),
                 "top_k": top_k,
                 "processing_time": processing_time,
-                "model_info": self.model.get_model_info()
+                "cache_hits": cache_hits,
+                "cache_misses": len(documents) - cache_hits,
+                "model_info": reranker.get_model_info()
             }
             
+        except ValidationError:
+            raise
         except Exception as e:
             processing_time = time.time() - start_time
             print(f"Failed to rerank documents: {str(e)} (time: {processing_time:.3f}s)")
             raise RerankError(f"Reranking failed: {str(e)}")
+        finally:
+            model_registry.release("rerank", reranker)
     
-    def rerank_batch(
+    async def rerank_batch_async(
         self, 
         queries: List[str], 
-        documents: List[str],
-        top_k: Optional[int] = None
+        documents: Optional[List[str]] = None,
+        top_k: Optional[int] = None,
+        query_documents: Optional[List[List[str]]] = None,
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Rerank documents for multiple queries.
+        Rerank documents for multiple queries through the shared scheduler.
         
         Args:
             queries: List of search queries
-            documents: List of documents to rerank
+            documents: Documents shared by all queries
             top_k: Number of top results to return for each query
+            query_documents: Per-query document lists, aligned with queries
+                (used instead of ``documents``)
+            model: Registry model name (None for the default model)
             
         Returns:
             Dictionary containing batch rerank results and metadata
         """
         start_time = time.time()
+        reranker = await self._resolve_model(model)
         
         try:
             # Validate inputs
@@ -153,57 +282,223 @@ class RerankService:
                 if not self.validate_query(query):
                     raise ValidationError(f"Invalid query: {query}")
             
-            if not self.validate_documents(documents):
-                raise ValidationError("Invalid documents")
+            if (documents is None) == (query_documents is None):
+                raise ValidationError("Provide either documents or query_documents")
             
-            if not self.validate_top_k(top_k, len(documents)):
-                raise ValidationError("Invalid top_k parameter")
+            if query_documents is None:
+                query_documents = [documents] * len(queries)
+            elif len(query_documents) != len(queries):
+                raise ValidationError("query_documents must have one list per query")
+            
+            for docs in query_documents:
+                if not self.validate_documents(docs):
+                    raise ValidationError("Invalid documents")
+                
+                if not self.validate_top_k(top_k, len(docs)):
+                    raise ValidationError("Invalid top_k parameter")
             
-            # Perform batch reranking
-            batch_results = self.model.rerank_batch(queries, documents, top_k)
+            # Submit all pairs at once so they share forward passes
+            pairs = [
+                (query, doc)
+                for query, docs in zip(queries, query_documents)
+                for doc in docs
+            ]
+            scores, cache_hits = await self._score(pairs, reranker)
             
             # Calculate processing time
             processing_time = time.time() - start_time
             
-            # Format batch results
+            # Regroup scores and format batch results
             formatted_batch_results = []
-            for query_idx, query_results in enumerate(batch_results):
-                query = queries[query_idx]
-                formatted_results = []
-                
-                for doc_idx, score in query_results:
-                    formatted_results.append({
-                        "document_index": doc_idx,
-                        "document": documents[doc_idx],
-                        "relevance_score": float(score),
-                        "rank": len(formatted_results) + 1
-                    })
-                
+            offset = 0
+            for query, docs in zip(queries, query_documents):
+                query_scores = scores[offset:offset + len(docs)]
+                offset += len(docs)
                 formatted_batch_results.append({
                     "query": query,
-                    "results": formatted_results
+                    "results": self._format_results(
+                        *reranker.rank_scores(query_scores, top_k),
+                        docs
+                    )
                 })
             
-            print(f"Batch reranked {len(documents)} documents for {len(queries)} queries (time: {processing_time:.3f}s)")
+            total_documents = len(documents) if documents is not None else sum(
+                len(docs) for docs in query_documents
+            )
+            
+            print(f"Batch reranked {len(pairs)} pairs for {len(queries)} queries (time: {processing_time:.3f}s)")
             
             return {
                 "total_queries": len(queries),
-                "total_documents": len(documents),
+                "total_documents": total_documents,
                 "batch_results": formatted_batch_results,
                 "top_k": top_k,
                 "processing_time": processing_time,
-                "model_info": self.model.get_model_info()
+                "cache_hits": cache_hits,
+                "cache_misses": len(pairs) - cache_hits,
+                "model_info": reranker.get_model_info()
             }
             
+        except ValidationError:
+            raise
         except Exception as e:
             processing_time = time.time() - start_time
             print(f"Failed to batch rerank: {str(e)} (time: {processing_time:.3f}s)")
             raise RerankError(f"Batch reranking failed: {str(e)}")
+        finally:
+            model_registry.release("rerank", reranker)
+    
+    async def rerank_passages_async(
+        self,
+        query: str,
+        documents: List[str],
+        top_k: Optional[int] = None,
+        model: Optional[str] = None,
+        window_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        aggregation: str = "max",
+        top_n: int = 3,
+        early_stop_threshold: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Rerank long documents by their best passages.
+        
+        Each document is split into overlapping passages that fit next to
+        the query, all (query, passage) pairs are scored in shared batches,
+        and each document gets the max or top-n mean of its passage scores.
+        With ``early_stop_threshold``, passages are scored in rounds (the
+        first passage of every document, then the second, ...) and a
+        document stops once one of its passages reaches the threshold.
+        
+        Args:
+            query: Search query
+            documents: List of documents to rerank
+            top_k: Number of top results to return
+            model: Registry model name (None for the default model)
+            window_tokens: Tokens per passage (defaults to what fits next to the query)
+            overlap_tokens: Tokens shared by consecutive passages
+            aggregation: "max" or "mean_top_n"
+            top_n: Passages averaged by "mean_top_n"
+            early_stop_threshold: Passage score that settles a document
+            
+        Returns:
+            Dictionary containing reranked results with their best passage and metadata
+        """
+        start_time = time.time()
+        reranker = await self._resolve_model(model)
+        
+        if overlap_tokens is None:
+            overlap_tokens = settings.rerank_passage_overlap_tokens
+        
+        try:
+            # Validate inputs
+            if not self.validate_query(query):
+                raise ValidationError("Invalid query")
+            
+            if not self.validate_documents(documents):
+                raise ValidationError("Invalid documents")
+            
+            if not self.validate_top_k(top_k, len(documents)):
+                raise ValidationError("Invalid top_k parameter")
+            
+            if window_tokens is not None and overlap_tokens >= window_tokens:
+                raise ValidationError("overlap_tokens must be smaller than window_tokens")
+            
+            # Tokenize once to find the passage boundaries
+            passages = await asyncio.to_thread(
+                reranker.split_passages, query, documents, window_tokens, overlap_tokens
+            )
+            passage_count = sum(len(doc_passages) for doc_passages in passages)
+            if passage_count > settings.rerank_max_passages:
+                raise ValidationError(
+                    f"Documents split into {passage_count} passages (max {settings.rerank_max_passages})"
+                )
+            
+            # Score all passages at once, or round by round when stopping early
+            passage_scores: List[List[Tuple[int, float]]] = [[] for _ in documents]
+            active = list(range(len(documents)))
+            depth = 0
+            cache_hits = 0
+            scored = 0
+            while active:
+                if early_stop_threshold is None:
+                    batch = [(doc_idx, j) for doc_idx in active for j in range(len(passages[doc_idx]))]
+                else:
+                    batch = [(doc_idx, depth) for doc_idx in active]
+                
+                pairs = []
+                for doc_idx, j in batch:
+                    start, end, _ = passages[doc_idx][j]
+                    pairs.append((query, documents[doc_idx][start:end]))
+                scores, hits = await self._score(pairs, reranker)
+                cache_hits += hits
+                scored += len(pairs)
+                
+                for (doc_idx, j), score in zip(batch, scores.tolist()):
+                    passage_scores[doc_idx].append((j, score))
+                
+                if early_stop_threshold is None:
+                    break
+                depth += 1
+                active = [
+                    doc_idx for doc_idx in active
+                    if depth < len(passages[doc_idx])
+                    and max(score for _, score in passage_scores[doc_idx]) < early_stop_threshold
+                ]
+            
+            document_scores = [
+                reranker.aggregate_passages([score for _, score in doc_scores], aggregation, top_n)
+                for doc_scores in passage_scores
+            ]
+            indices, top_scores = reranker.rank_scores(document_scores, top_k)
+            
+            # Calculate processing time
+            processing_time = time.time() - start_time
+            
+            results = self._format_results(indices, top_scores, documents)
+            for result in results:
+                doc_idx = result["document_index"]
+                best, best_score = max(passage_scores[doc_idx], key=lambda item: item[1])
+                start, end, _ = passages[doc_idx][best]
+                result["best_passage"] = {"start": start, "end": end, "score": best_score}
+                result["passage_count"] = len(passages[doc_idx])
+                result["passages_scored"] = len(passage_scores[doc_idx])
+            
+            print(
+                f"Passage reranked {len(documents)} documents for query "
+                f"({scored} of {passage_count} passages, time: {processing_time:.3f}s)"
+            )
+            
+            return {
+                "query": query,
+                "total_documents": len(documents),
+                "results": results,
+                "top_k": top_k,
+                "aggregation": aggregation,
+                "passage_count": passage_count,
+                "passages_scored": scored,
+                "processing_time": processing_time,
+                "cache_hits": cache_hits,
+                "cache_misses": scored - cache_hits,
+                "model_info": reranker.get_model_info()
+            }
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            processing_time = time.time() - start_time
+            print(f"Failed to rerank passages: {str(e)} (time: {processing_time:.3f}s)")
+            raise RerankError(f"Passage reranking failed: {str(e)}")
+        finally:
+            model_registry.release("rerank", reranker)
     
     def get_model_status(self) -> Dict[str, Any]:
         """Get current model status."""
         return {
             "is_loaded": self.model.is_loaded(),
             "model_info": self.model.get_model_info(),
+            "batching": self.batcher.get_stats(),
+            "cache": self.cache.get_stats() if self.cache is not None else None,
+            "models": model_registry.get_stats()["models"]["rerank"],
             "service_status": "running"
         }
@@ -0,0 +1,107 @@
+"""
+Compact binary encodings for embedding responses.
+"""
+
+import base64
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# Supported encodings
+ENCODING_FORMATS = ("float", "base64", "raw")
+EMBEDDING_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+
+
+def to_array(embeddings: Sequence[Sequence[float]], dtype: str = "float32") -> np.ndarray:
+    """
+    Convert embeddings to a contiguous little-endian 2-D array.
+
+    Args:
+        embeddings: Embedding array or vectors (no copy for float32 arrays)
+        dtype: Target dtype name ("float32" or "float16")
+
+    Returns:
+        Array of shape (count, dimension)
+    """
+    array = np.asarray(embeddings, dtype=np.float32)
+    if array.ndim == 1:
+        array = array[np.newaxis, :]
+    return np.ascontiguousarray(array, dtype=EMBEDDING_DTYPES[dtype])
+
+
+def encode_base64(array: np.ndarray) -> List[str]:
+    """Encode each row of an array as a base64 string of its raw bytes."""
+    return [base64.b64encode(row.tobytes()).decode("ascii") for row in array]
+
+
+def encode_embeddings(array: np.ndarray, encoding_format: str) -> Any:
+    """
+    Encode a 2-D embedding array for a JSON response.
+
+    Args:
+        array: Array of shape (count, dimension)
+        encoding_format: "float" for JSON numbers or "base64" for raw bytes
+
+    Returns:
+        List of vectors (float) or list of base64 strings (base64)
+    """
+    if encoding_format == "base64":
+        return encode_base64(array)
+    return array.tolist()
+
+
+def raw_headers(
+    array: np.ndarray,
+    dtype: str,
+    scales: Optional[np.ndarray] = None
+) -> Dict[str, str]:
+    """Headers describing a raw little-endian embedding payload."""
+    headers = {
+        "X-Embedding-Shape": ",".join(str(size) for size in array.shape),
+        "X-Embedding-Dtype": dtype,
+        "X-Embedding-Byte-Order": "little",
+    }
+    if scales is not None:
+        headers["X-Embedding-Scales"] = base64.b64encode(
+            np.asarray(scales, dtype="<f4").tobytes()
+        ).decode("ascii")
+    return headers
+
+
+def encode_sparse(token_ids: np.ndarray, weights: np.ndarray, encoding_format: str = "float") -> Dict[str, Any]:
+    """
+    Encode a sparse lexical vector as parallel token-id and weight arrays.
+
+    Args:
+        token_ids: Token ids of the non-zero entries
+        weights: Weight of each token id
+        encoding_format: "float" for JSON numbers or "base64" for raw
+            little-endian int32 ids and float32 weights
+
+    Returns:
+        ``indices`` and ``values``, in the same order
+    """
+    if encoding_format == "base64":
+        return {
+            "indices": base64.b64encode(np.ascontiguousarray(token_ids, dtype="<i4").tobytes()).decode("ascii"),
+            "values": base64.b64encode(np.ascontiguousarray(weights, dtype="<f4").tobytes()).decode("ascii"),
+        }
+    return {"indices": np.asarray(token_ids).tolist(), "values": np.asarray(weights).tolist()}
+
+
+def encode_multi_vector(vectors: np.ndarray) -> Dict[str, Any]:
+    """
+    Encode one text's multi-vectors as base64 little-endian float16.
+
+    Returns:
+        ``shape`` ([tokens, dimension]) and ``data`` (row-major bytes)
+    """
+    array = np.ascontiguousarray(vectors, dtype="<f2")
+    return {
+        "shape": list(array.shape),
+        "data": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
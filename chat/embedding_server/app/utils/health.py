@@ -4,40 +4,34 @@ Health check and status utilities.
 
 import time
 from typing import Dict, Any
-from ..core.embedding_model import embedding_model
-from ..core.rerank_model import rerank_model
+from ..core.lifecycle import SERVICE_MODELS, model_loader
+from ..core.executor import inference_executor
+from ..core.registry import model_registry
+from ..core.admission import admission_controller
+from ..services.job_service import job_manager
 from .monitoring import performance_monitor
 
 
 def check_model_health() -> Dict[str, Any]:
-    """Check health status of all models."""
+    """Check health status of the models of the enabled services."""
     models_health = {}
+    load_status = model_loader.get_status()["services"]
     
-    # Check embedding model
-    try:
-        embedding_info = embedding_model.get_model_info()
-        models_health["embedding"] = {
-            "status": "healthy" if embedding_info["is_loaded"] else "unhealthy",
-            "model_info": embedding_info
-        }
-    except Exception as e:
-        models_health["embedding"] = {
-            "status": "error",
-            "error": str(e)
-        }
-    
-    # Check rerank model
-    try:
-        rerank_info = rerank_model.get_model_info()
-        models_health["rerank"] = {
-            "status": "healthy" if rerank_info["is_loaded"] else "unhealthy",
-            "model_info": rerank_info
-        }
-    except Exception as e:
-        models_health["rerank"] = {
-            "status": "error",
-            "error": str(e)
-        }
+    for service in model_loader.services:
+        try:
+            model_info = SERVICE_MODELS[service].get_model_info()
+            state = load_status[service]["state"]
+            models_health[service] = {
+                "status": "healthy" if model_info["is_loaded"] else (
+                    "unhealthy" if state == "failed" else "loading"
+                ),
+                "model_info": model_info
+            }
+        except Exception as e:
+            models_health[service] = {
+                "status": "error",
+                "error": str(e)
+            }
     
     return models_health
 
@@ -90,7 +84,15 @@ def get_service_status() -> Dict[str, Any]:
         "endpoints": {
             "embedding": "/api/v1/embedding",
             "rerank": "/api/v1/rerank",
+            "jobs": "/api/v1/jobs",
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "status": "/status"
-        }
+        },
+        "executor": inference_executor.get_stats(),
+        "models": model_loader.get_status(),
+        "registry": model_registry.get_stats(),
+        "admission": admission_controller.get_stats(),
+        "jobs": job_manager.get_stats()
     }
@@ -0,0 +1,170 @@
+"""
+Parity check between the PyTorch and ONNX Runtime backends.
+
+Usage (from the embedding_server directory)::
+
+    python -m app.utils.onnx_parity [--task all] [--quantize] [--input samples.jsonl]
+
+Builds the ONNX artifacts if needed, runs both backends on the same
+inputs and exits non-zero when embedding cosine similarity or rerank
+ordering drift past the given thresholds.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+# Bundled evaluation set (queries with candidate documents)
+SAMPLES: List[Dict[str, Any]] = [
+    {
+        "query": "임베딩 서버의 배치 크기는 어떻게 설정하나요?",
+        "documents": [
+            "배치 크기는 환경 변수 BATCH_SIZE 또는 설정 파일의 batch_size 값으로 지정합니다.",
+            "서버는 기본적으로 8000번 포트에서 실행됩니다.",
+            "리랭커는 질의와 문서 쌍의 관련도를 0과 1 사이의 점수로 계산합니다.",
+            "모델 파일은 ai_models 디렉터리에 마운트합니다.",
+        ],
+    },
+    {
+        "query": "What does the rerank endpoint return?",
+        "documents": [
+            "The rerank endpoint returns documents sorted by relevance score with their original index.",
+            "Embeddings are L2-normalized float32 vectors.",
+            "Docker Compose starts the server with a health check.",
+            "The cache stores vectors keyed by a hash of the normalized text.",
+        ],
+    },
+    {
+        "query": "서울의 겨울 날씨",
+        "documents": [
+            "서울의 겨울은 춥고 건조하며 1월 평균 기온은 영하로 내려갑니다.",
+            "부산은 해양성 기후로 겨울에도 비교적 온화합니다.",
+            "Seoul winters are cold and dry, with sub-zero January averages.",
+            "김치는 배추와 고춧가루로 만드는 한국의 전통 음식입니다.",
+        ],
+    },
+]
+
+
+def load_samples(path: str) -> List[Dict[str, Any]]:
+    """Read samples from JSONL lines of ``{"query": ..., "documents": [...]}``."""
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                samples.append(json.loads(line))
+    return samples
+
+
+def _spearman(a: np.ndarray, b: np.ndarray) -> float:
+    """Spearman rank correlation of two score vectors."""
+    if len(a) < 2:
+        return 1.0
+    rank_a = np.argsort(np.argsort(a)).astype(np.float64)
+    rank_b = np.argsort(np.argsort(b)).astype(np.float64)
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def compare_embeddings(reference, candidate, texts: List[str]) -> Dict[str, float]:
+    """
+    Cosine similarity between two embedding backends.
+
+    Args:
+        reference: Reference ``EmbeddingBackend`` (PyTorch fp32)
+        candidate: Candidate ``EmbeddingBackend`` (ONNX or reduced precision)
+        texts: Texts to embed
+
+    Returns:
+        Minimum and mean cosine similarity
+    """
+    expected = reference.encode(texts)
+    actual = candidate.encode(texts)
+    cosine = np.sum(expected * actual, axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    return {"min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
+
+
+def compare_rerank(reference, candidate, samples: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Score and ranking agreement between two rerank backends.
+
+    Args:
+        reference: Reference ``RerankBackend`` (PyTorch fp32)
+        candidate: Candidate ``RerankBackend`` (ONNX or reduced precision)
+        samples: Queries with candidate documents
+
+    Returns:
+        Maximum score difference, mean Spearman correlation, top-1 and
+        full-ranking agreement rates
+    """
+    max_diff, correlations, top1, exact = 0.0, [], 0, 0
+    for sample in samples:
+        pairs: List[Tuple[str, str]] = [(sample["query"], doc) for doc in sample["documents"]]
+        expected = reference.predict(pairs)
+        actual = candidate.predict(pairs)
+
+        max_diff = max(max_diff, float(np.abs(expected - actual).max()))
+        correlations.append(_spearman(expected, actual))
+        top1 += int(np.argmax(expected) == np.argmax(actual))
+        exact += int(np.array_equal(np.argsort(-expected), np.argsort(-actual)))
+
+    return {
+        "max_score_diff": max_diff,
+        "mean_spearman": float(np.mean(correlations)),
+        "top1_agreement": top1 / len(samples),
+        "rank_agreement": exact / len(samples),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare ONNX Runtime backends against PyTorch")
+    parser.add_argument("--task", choices=["embedding", "rerank", "all"], default="all")
+    parser.add_argument("--input", help="JSONL samples with query and documents")
+    parser.add_argument("--quantize", action="store_true", help="Check the int8-quantized ONNX model")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--min-top1-agreement", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    from ..core.config import settings
+    settings.onnx_quantize = args.quantize
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    samples = load_samples(args.input) if args.input else SAMPLES
+    report: Dict[str, Any] = {"quantized": args.quantize, "samples": len(samples)}
+    passed = True
+
+    if args.task in ("embedding", "all"):
+        from ..core.embedding_model import OnnxEmbeddingBackend, SentenceTransformerBackend
+
+        model_path = os.path.join(base_dir, settings.embedding_model_path)
+        texts = [sample["query"] for sample in samples]
+        texts += [doc for sample in samples for doc in sample["documents"]]
+        result = compare_embeddings(
+            SentenceTransformerBackend(model_path, precision="fp32"), OnnxEmbeddingBackend(model_path), texts
+        )
+        report["embedding"] = result
+        passed = passed and result["min_cosine"] >= args.min_cosine
+
+    if args.task in ("rerank", "all"):
+        from ..core.rerank_model import CrossEncoderBackend, OnnxRerankBackend
+
+        model_path = os.path.join(base_dir, settings.rerank_model_path)
+        result = compare_rerank(
+            CrossEncoderBackend(model_path, precision="fp32"), OnnxRerankBackend(model_path), samples
+        )
+        report["rerank"] = result
+        passed = passed and result["top1_agreement"] >= args.min_top1_agreement
+
+    report["passed"] = passed
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
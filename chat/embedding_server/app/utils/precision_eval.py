@@ -0,0 +1,87 @@
+"""
+Accuracy delta of reduced-precision torch modes on the bundled samples.
+
+Usage (from the embedding_server directory)::
+
+    python -m app.utils.precision_eval [--modes int8 bf16] [--task all] [--input samples.jsonl]
+
+Loads an fp32 reference and one backend per requested mode, then reports
+embedding cosine similarity, rerank ordering agreement and mean latency
+against fp32. Modes that are not supported fall back to fp32 and are
+reported with their effective precision.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from .onnx_parity import SAMPLES, compare_embeddings, compare_rerank, load_samples
+
+
+def _mean_latency(run: Callable[[], Any], repeats: int) -> float:
+    """Mean wall time of ``run`` in milliseconds after one warmup call."""
+    run()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        run()
+    return (time.perf_counter() - start) * 1000.0 / repeats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare torch precision modes against fp32")
+    parser.add_argument("--modes", nargs="+", choices=["int8", "bf16"], default=["int8", "bf16"])
+    parser.add_argument("--task", choices=["embedding", "rerank", "all"], default="all")
+    parser.add_argument("--input", help="JSONL samples with query and documents")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per backend")
+    args = parser.parse_args(argv)
+
+    from ..core.config import settings
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    samples = load_samples(args.input) if args.input else SAMPLES
+    report: Dict[str, Any] = {"samples": len(samples)}
+
+    if args.task in ("embedding", "all"):
+        from ..core.embedding_model import SentenceTransformerBackend
+
+        model_path = os.path.join(base_dir, settings.embedding_model_path)
+        texts: List[str] = [sample["query"] for sample in samples]
+        texts += [doc for sample in samples for doc in sample["documents"]]
+
+        reference = SentenceTransformerBackend(model_path, precision="fp32")
+        results = {"fp32": {"latency_ms": _mean_latency(lambda: reference.encode(texts), args.repeats)}}
+        for mode in args.modes:
+            candidate = SentenceTransformerBackend(model_path, precision=mode)
+            result = compare_embeddings(reference, candidate, texts)
+            result["effective_precision"] = candidate.precision
+            result["latency_ms"] = _mean_latency(lambda: candidate.encode(texts), args.repeats)
+            results[mode] = result
+            del candidate
+        report["embedding"] = results
+
+    if args.task in ("rerank", "all"):
+        from ..core.rerank_model import CrossEncoderBackend
+
+        model_path = os.path.join(base_dir, settings.rerank_model_path)
+        pairs = [(sample["query"], doc) for sample in samples for doc in sample["documents"]]
+
+        reference = CrossEncoderBackend(model_path, precision="fp32")
+        results = {"fp32": {"latency_ms": _mean_latency(lambda: reference.predict(pairs), args.repeats)}}
+        for mode in args.modes:
+            candidate = CrossEncoderBackend(model_path, precision=mode)
+            result = compare_rerank(reference, candidate, samples)
+            result["effective_precision"] = candidate.precision
+            result["latency_ms"] = _mean_latency(lambda: candidate.predict(pairs), args.repeats)
+            results[mode] = result
+            del candidate
+        report["rerank"] = results
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Server-side quantization of embedding vectors.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# Supported quantization modes
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+
+def quantize_int8(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-vector int8 quantization.
+
+    Each vector is scaled so its largest magnitude maps to 127; the vector
+    is recovered approximately as ``codes * scale``.
+
+    Args:
+        embeddings: Float array of shape (count, dimension)
+
+    Returns:
+        Tuple of (int8 codes, float32 scale per vector)
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    max_abs = np.abs(embeddings).max(axis=1)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(embeddings / scales[:, np.newaxis]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def quantize_binary(embeddings: np.ndarray) -> np.ndarray:
+    """
+    1-bit sign quantization packed 8 dimensions per byte.
+
+    Bit ``i`` is set when dimension ``i`` is positive (big-endian bit order
+    within each byte, as ``numpy.packbits``), so vectors can be compared by
+    Hamming distance.
+
+    Args:
+        embeddings: Float array of shape (count, dimension)
+
+    Returns:
+        uint8 array of shape (count, ceil(dimension / 8))
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return np.packbits(embeddings > 0, axis=1)
+
+
+def quantize(
+    embeddings: np.ndarray,
+    mode: str
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantize embeddings with the given mode.
+
+    Args:
+        embeddings: Float array of shape (count, dimension)
+        mode: "none", "int8" or "binary"
+
+    Returns:
+        Tuple of (quantized array, per-vector scales or None)
+    """
+    if mode == "int8":
+        return quantize_int8(embeddings)
+    if mode == "binary":
+        return quantize_binary(embeddings), None
+    if mode == "none":
+        return np.asarray(embeddings, dtype=np.float32), None
+    raise ValueError(f"Unknown quantization mode: {mode}")
@@ -3,14 +3,24 @@ Main FastAPI application entry point.
 Manages routers and middleware only.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.core.executor import inference_executor
+from app.core.admission import admission_controller
+from app.core.lifecycle import model_loader
 from app.utils.logger import setup_logger
-from app.api import embedding_router, rerank_router
+from app.api import embedding_router, rerank_router, jobs_router, collections_router
+from app.core.embedding_model import embedding_model
+from app.services.embedding_service import embedding_batchers, embedding_cache, embedding_store, get_embedding_store
+from app.services.rerank_service import rerank_batchers
+from app.services.job_service import job_manager
+from app.services.collection_service import collection_manager
 from app.utils.health import get_system_health, get_service_status
 
 
@@ -18,6 +28,39 @@ from app.utils.health import get_system_health, get_service_status
 logger = setup_logger()
 
 
+async def start_services():
+    """Load models in the background, then start the work that needs them."""
+    logger.info(f"Loading models for services: {', '.join(model_loader.services)}")
+    await model_loader.load_all()
+    
+    for service, status in model_loader.get_status()["services"].items():
+        if status["state"] == "ready":
+            warmup_time = status["warmup_time"] or 0.0
+            logger.info(
+                f"Loaded {service} model in {status['load_time']:.1f}s "
+                f"(warmup {warmup_time:.1f}s, {len(status['warmup'])} batches)"
+            )
+        else:
+            logger.error(f"Failed to load {service} model: {status['error']}")
+    
+    if not model_loader.is_loaded("embedding"):
+        return
+    
+    if embedding_store is not None and embedding_cache is not None:
+        store = get_embedding_store(embedding_model)
+        warmed = await run_in_threadpool(
+            store.warm, embedding_cache, settings.embedding_disk_cache_warm_bytes
+        )
+        logger.info(f"Warm-loaded {warmed} cached embeddings from {store.root}")
+    
+    # With several workers only the first one resumes persisted jobs
+    if settings.worker_id == 0:
+        requeued = await run_in_threadpool(job_manager.recover)
+        if requeued:
+            logger.info(f"Resuming {requeued} unfinished embedding jobs")
+    job_manager.start()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management."""
@@ -25,10 +68,20 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Embedding & Rerank Server...")
     logger.info(f"Server running on {settings.host}:{settings.port}")
     
+    # Accept connections right away; readiness reports when models are warm
+    startup_task = asyncio.create_task(start_services())
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Embedding & Rerank Server...")
+    if not startup_task.done():
+        startup_task.cancel()
+    await job_manager.stop()
+    await run_in_threadpool(collection_manager.close)
+    for batcher in [*embedding_batchers.values(), *rerank_batchers.values()]:
+        await batcher.stop()
+    inference_executor.shutdown()
 
 
 # Create FastAPI app
@@ -48,9 +101,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include API routers
-app.include_router(embedding_router, prefix="/api/v1")
-app.include_router(rerank_router, prefix="/api/v1")
+# Include API routers of the enabled services
+if settings.is_service_enabled("embedding"):
+    app.include_router(embedding_router, prefix="/api/v1")
+    app.include_router(jobs_router, prefix="/api/v1")
+    app.include_router(collections_router, prefix="/api/v1")
+if settings.is_service_enabled("rerank"):
+    app.include_router(rerank_router, prefix="/api/v1")
 
 
 # Root endpoint
@@ -62,7 +119,10 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
-        "status": "/status"
+        "liveness": "/health/live",
+        "readiness": "/health/ready",
+        "status": "/status",
+        "load": "/load"
     }
 
 
@@ -70,7 +130,23 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return get_system_health()
+    # System metrics sample CPU usage for a second; keep that off the loop
+    return await run_in_threadpool(get_system_health)
+
+
+# Liveness endpoint
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving HTTP."""
+    return {"status": "alive"}
+
+
+# Readiness endpoint
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 200 once every enabled model is loaded and warmed up, 503 before."""
+    status = model_loader.get_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
 
 # Status endpoint
@@ -80,6 +156,24 @@ async def status_check():
     return get_service_status()
 
 
+# Load endpoint for load balancers
+@app.get("/load")
+async def load_check():
+    """Queue depth and rejection counts for load shedding."""
+    stats = admission_controller.get_stats()
+    return JSONResponse(
+        status_code=503 if stats["overloaded"] else 200,
+        content={
+            "active": stats["active"],
+            "queue_depth": stats["queue_depth"],
+            "max_queue_size": stats["max_queue_size"],
+            "rejected_total": stats["rejected_total"],
+            "overloaded": stats["overloaded"],
+            "retry_after": stats["retry_after"]
+        }
+    )
+
+
 # API info endpoint
 @app.get("/api/info")
 async def api_info():
@@ -93,10 +187,20 @@ async def api_info():
                 "endpoints": [
                     "POST / - Single text embedding",
                     "POST /batch - Batch text embedding",
+                    "POST /stream - Streaming NDJSON bulk embedding",
                     "GET /status - Model status",
                     "GET /health - Service health"
                 ]
             },
+            "jobs": {
+                "base": "/api/v1/jobs",
+                "endpoints": [
+                    "POST / - Submit bulk embedding job",
+                    "GET / - List jobs",
+                    "GET /{job_id} - Job progress",
+                    "POST /{job_id}/cancel - Cancel job"
+                ]
+            },
             "rerank": {
                 "base": "/api/v1/rerank",
                 "endpoints": [
@@ -111,13 +215,24 @@ async def api_info():
 
 
 if __name__ == "__main__":
-    import uvicorn
-    
-    uvicorn.run(
-        "main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
-        log_level=settings.log_level.lower()
-    )
+    if settings.workers > 1 and not settings.debug:
+        from app.core.prefork import run_prefork
+        
+        run_prefork(
+            app,
+            workers=settings.workers,
+            host=settings.host,
+            port=settings.port,
+            log_level=settings.log_level.lower()
+        )
+    else:
+        import uvicorn
+        
+        uvicorn.run(
+            "main:app",
+            host=settings.host,
+            port=settings.port,
+            reload=settings.debug,
+            log_level=settings.log_level.lower()
+        )
 